@@ -0,0 +1,259 @@
+"""Throughput, memory and output of extract_sip_info per backend
+
+Generates a deterministic synthetic capture (see synthetic_pcap.py), runs
+every available backend on it in a fresh process per run, and reports
+SIP packets per second (as counted by the analyzer, so non-SIP frames do
+not inflate it), wall time, peak RSS (of the analyzer and of the
+tshark/worker processes it started), whether the report counters match
+what the generator wrote and whether all backends produce the same
+report. --transactions adds Call-ID/CSeq correlation to the timed runs.
+Results are saved as JSON; --compare prints the changes against
+the JSON of an earlier version.
+
+    python benchmarks/bench_analyzer.py --packets 500000 --json before.json
+    python benchmarks/bench_analyzer.py --packets 500000 --json after.json --compare before.json
+"""
+import argparse
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    # Windows; peak RSS is not reported
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sip_analyzer import BACKENDS  # noqa: E402
+from sip_dialogs import TRANSACTION_TABLE_SIZE  # noqa: E402
+from synthetic_pcap import DEFAULT_MIX, generate, parse_mix  # noqa: E402
+
+# Report lines that differ between runs on the same input
+VOLATILE_PREFIXES = ('Analysis Date:',)
+
+
+def backend_unavailable(backend):
+    """Why backend cannot run here, or None"""
+    if backend in ('pyshark', 'tshark-fields') and shutil.which('tshark') is None:
+        return "tshark not found"
+    if backend == 'pyshark' and importlib.util.find_spec('pyshark') is None:
+        return "pyshark not installed"
+    return None
+
+
+def report_digest(path):
+    """sha256 of a report without its volatile lines"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.decode('utf-8', 'replace').startswith(VOLATILE_PREFIXES):
+                digest.update(line)
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def peak_rss_kb(who):
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def run_child(backend, capture, output, chunks, transactions):
+    """Child side of one run: analyze the capture and print wall time, peak RSS and counters as JSON"""
+    from sip_analyzer import extract_sip_info
+    log = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log):
+            summary = extract_sip_info(capture, output, backend, progress=False, chunks=chunks,
+                                       transactions=transactions)
+    except SystemExit:
+        sys.stderr.write(log.getvalue())
+        raise
+    wall_time = time.perf_counter() - start
+    print(json.dumps({
+        'wall_time': wall_time,
+        'peak_rss_kb': peak_rss_kb(resource.RUSAGE_SELF) if resource else None,
+        'peak_child_rss_kb': peak_rss_kb(resource.RUSAGE_CHILDREN) if resource else None,
+        'summary': {key: value for key, value in summary.items() if key != 'file'},
+    }))
+
+
+def run_backend(backend, capture, workdir, chunks, repeat, transactions=None):
+    """Run one backend repeat times, each in a fresh interpreter, and return its result entry"""
+    output = os.path.join(workdir, f"{backend}-{chunks}.txt")
+    runs = []
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', backend, capture, output,
+                                  str(chunks), str(transactions or 0)], capture_output=True, text=True)
+        if process.returncode != 0:
+            return {'backend': backend, 'chunks': chunks,
+                    'error': (process.stderr or process.stdout).strip().splitlines()[-1:] or ['failed']}
+        runs.append(json.loads(process.stdout.strip().splitlines()[-1]))
+    return {
+        'backend': backend,
+        'chunks': chunks,
+        'wall_times': [run['wall_time'] for run in runs],
+        'peak_rss_kb': max(run['peak_rss_kb'] or 0 for run in runs) or None,
+        'peak_child_rss_kb': max(run['peak_child_rss_kb'] or 0 for run in runs) or None,
+        'summary': runs[-1]['summary'],
+        'report_sha256': report_digest(output),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def print_results(results):
+    print(f"{'backend':14} {'chunks':>6} {'wall s':>8} {'SIP pkt/s':>10} {'RSS MB':>7} {'child MB':>8}  output")
+    for result in results:
+        label = f"{result['backend']:14} {result['chunks']:6}"
+        if 'skipped' in result:
+            print(f"{label}  skipped: {result['skipped']}")
+        elif 'error' in result:
+            print(f"{label}  error: {' '.join(result['error'])}")
+        else:
+            rss = f"{result['peak_rss_kb'] / 1024:7.0f}" if result['peak_rss_kb'] else f"{'-':>7}"
+            child = f"{result['peak_child_rss_kb'] / 1024:8.0f}" if result['peak_child_rss_kb'] else f"{'-':>8}"
+            output = "counters OK" if result['counters_match'] else "COUNTERS DIFFER"
+            if result.get('same_report') is False:
+                output += ", REPORT DIFFERS"
+            print(f"{label} {result['wall_time']:8.2f} {result['packets_per_sec']:10.0f} {rss} {child}  {output}")
+
+
+def compare(baseline, current):
+    """Print wall time, RSS and report changes against an earlier results file"""
+    print(f"\nAgainst {baseline['environment'].get('commit') or 'baseline'} "
+          f"({baseline['environment']['created']}):")
+    if baseline['capture']['sha256'] != current['capture']['sha256']:
+        print("  warning: the synthetic capture differs (other generator settings or version)")
+    old_results = {(result['backend'], result['chunks']): result for result in baseline['results']}
+    for result in current['results']:
+        old = old_results.get((result['backend'], result['chunks']))
+        if old is None or 'wall_time' not in old or 'wall_time' not in result:
+            continue
+        change = (result['wall_time'] / old['wall_time'] - 1) * 100
+        line = (f"  {result['backend']:14} {result['chunks']:6}  wall {old['wall_time']:.2f} -> "
+                f"{result['wall_time']:.2f} s ({change:+.1f}%)")
+        if old['peak_rss_kb'] and result['peak_rss_kb']:
+            line += f", RSS {old['peak_rss_kb'] / 1024:.0f} -> {result['peak_rss_kb'] / 1024:.0f} MB"
+        if old['report_sha256'] != result['report_sha256']:
+            line += ", report changed"
+        print(line)
+
+
+def main():
+    if len(sys.argv) == 7 and sys.argv[1] == '--child':
+        run_child(sys.argv[2], sys.argv[3], sys.argv[4], int(sys.argv[5]), int(sys.argv[6]) or None)
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--packets', type=int, default=200000, help="frames in the synthetic capture")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help="SIP message weights, e.g. REGISTER=40,INVITE=20,OPTIONS=10,response=20")
+    parser.add_argument('--pani', type=float, default=0.7, help="share of REGISTER/INVITE with P-Access-Network-Info")
+    parser.add_argument('--cni', type=float, default=0.3, help="share of REGISTER/INVITE with Cellular-Network-Info")
+    parser.add_argument('--tcp', type=float, default=0.1, help="share of SIP messages over TCP")
+    parser.add_argument('--noise', type=float, default=0.1, help="share of non-SIP frames")
+    parser.add_argument('--format', choices=('pcap', 'pcapng'), default='pcap')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--chunks', type=int, nargs='+', default=[1],
+                        help="chunk counts to run the native backend with")
+    parser.add_argument('--transactions', action='store_true',
+                        help="also correlate REGISTER/INVITE transactions in the timed runs")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per backend; the fastest counts")
+    parser.add_argument('--workdir', help="keep the capture and reports here instead of a temporary directory")
+    parser.add_argument('--json', default='bench_analyzer.json', help="results file (default: %(default)s)")
+    parser.add_argument('--compare', metavar='JSON', help="results file of an earlier version to compare with")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='bench_analyzer-')
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        capture = os.path.join(workdir, f"synthetic.{args.format}")
+        settings = {'packets': args.packets, 'seed': args.seed, 'mix': args.mix, 'pani': args.pani,
+                    'cni': args.cni, 'tcp': args.tcp, 'noise': args.noise, 'format': args.format,
+                    'transactions': args.transactions}
+        expected = generate(capture, args.packets, args.seed, args.mix, args.pani, args.cni, args.tcp, args.noise,
+                            capture_format=args.format)
+        print(f"{args.packets} frames, {expected['total_packets']} SIP, {expected['register_count']} REGISTER, "
+              f"{expected['invite_count']} INVITE, {os.path.getsize(capture) / 1e6:.0f} MB {args.format}")
+
+        results = []
+        for backend in args.backends:
+            reason = backend_unavailable(backend)
+            # Chunking only applies to the native backend
+            for chunks in (args.chunks if backend == 'native' else [1]):
+                if reason is not None:
+                    results.append({'backend': backend, 'chunks': chunks, 'skipped': reason})
+                    continue
+                result = run_backend(backend, capture, workdir, chunks, args.repeat,
+                                     TRANSACTION_TABLE_SIZE if args.transactions else None)
+                if 'wall_times' in result:
+                    result['wall_time'] = min(result['wall_times'])
+                    # SIP packets, the analyzer's own total_packets counter
+                    result['packets_per_sec'] = result['summary']['total_packets'] / result['wall_time']
+                    result['counters_match'] = {key: result['summary'].get(key) for key in expected} == expected
+                results.append(result)
+
+        # Reports are compared with the first one whose counters are right
+        reference = next((result['report_sha256'] for result in results if result.get('counters_match')), None)
+        for result in results:
+            if reference is not None and 'report_sha256' in result:
+                result['same_report'] = result['report_sha256'] == reference
+
+        current = {
+            'environment': environment(),
+            'capture': {**settings, 'bytes': os.path.getsize(capture), 'sha256': file_digest(capture),
+                        'expected': expected},
+            'results': results,
+        }
+        print_results(results)
+        with open(args.json, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.json}")
+        if args.compare:
+            with open(args.compare) as f:
+                compare(json.load(f), current)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
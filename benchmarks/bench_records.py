@@ -0,0 +1,117 @@
+"""Per-message cost of message records and report formatting
+
+Compares the former dict records, split()-based parameter parsing and
+strftime timestamps against SipMessage, sip_parser.header_params and
+isoformat on synthetic REGISTERs: CPU time to build and format each
+message, and memory held per record.
+
+    python benchmarks/bench_records.py --messages 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sip_analyzer import format_message  # noqa: E402
+from sip_parser import SipMessage  # noqa: E402
+
+
+def legacy_format_header_params(lines, label, header):
+    """format_header_params as it was before header_params"""
+    if ';' in header:
+        lines.append(f"{label} Header Parameters:\n")
+        params = header.split(';')[1:]
+        for param in params:
+            param = param.strip()
+            if '=' in param:
+                key, value = param.split('=', 1)
+                lines.append(f"  {key.strip()}: {value.strip()}\n")
+            else:
+                lines.append(f"  {param}\n")
+
+
+def legacy_format_message(message_type, message):
+    """format_message as it was for dict records"""
+    timestamp = datetime.fromtimestamp(message['time']).strftime('%Y-%m-%d %H:%M:%S.%f')
+    lines = [f"\nMessage Type: {message_type}\n", f"Timestamp: {timestamp}\n"]
+    if message['to'] is not None:
+        lines.append(f"To: {message['to']}\n")
+        legacy_format_header_params(lines, "To", message['to'])
+    if message['from'] is not None:
+        lines.append(f"From: {message['from']}\n")
+        legacy_format_header_params(lines, "From", message['from'])
+    if message['route'] is not None:
+        lines.append(f"Route: {message['route']}\n")
+    if message['pani'] is not None:
+        lines.append(f"P-Access-Network-Info: {message['pani']}\n")
+    if message['cni'] is not None:
+        lines.append(f"Cellular-Network-Info: {message['cni']}\n")
+    lines.append("-" * 50 + "\n")
+    return ''.join(lines)
+
+
+def synthetic_headers(count, subscribers=50000, cells=2000):
+    """(to, from, pani) triples as seen from UEs re-registering on a few thousand cells"""
+    headers = []
+    for index in range(count):
+        subscriber = index % subscribers
+        headers.append((
+            f"<sip:+1555{subscriber:07d}@ims.example.com>",
+            f"<sip:+1555{subscriber:07d}@ims.example.com>;tag={index:x}",
+            f"3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=310410{subscriber % cells:09X}",
+        ))
+    return headers
+
+
+def dict_record(frame, to_header, from_header, pani):
+    return {'frame': frame, 'method': 'REGISTER', 'time': 1700000000.0, 'to': to_header, 'from': from_header,
+            'route': None, 'pani': pani, 'cni': None}
+
+
+def slots_record(frame, to_header, from_header, pani):
+    message = SipMessage(frame, 'REGISTER')
+    message.time = 1700000000.0
+    message.to = to_header
+    message.from_ = from_header
+    message.pani = pani
+    return message
+
+
+def time_per_message(headers, make_record, format_record):
+    start = time.perf_counter()
+    for frame, (to_header, from_header, pani) in enumerate(headers):
+        format_record("REGISTER", make_record(frame, to_header, from_header, pani))
+    return (time.perf_counter() - start) / len(headers)
+
+
+def bytes_per_record(headers, make_record):
+    tracemalloc.start()
+    records = [make_record(frame, *header) for frame, header in enumerate(headers)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1000000)
+    args = parser.parse_args()
+
+    headers = synthetic_headers(args.messages)
+    variants = (
+        ('dict + split', dict_record, legacy_format_message),
+        ('SipMessage + header_params', slots_record, format_message),
+    )
+    print(f"{args.messages} REGISTER messages")
+    for label, make_record, format_record in variants:
+        cpu = time_per_message(headers, make_record, format_record)
+        memory = bytes_per_record(headers, make_record)
+        print(f"{label:28} {cpu * 1e6:6.2f} us/message  {memory:6.0f} bytes/record")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Cost of the access network statistics per REGISTER/INVITE message
+
+Compares counting access types, cell IDs and minutes with one dict update
+per message against sip_stats.StatsCollector, which batches the values and
+counts them with NumPy, on synthetic REGISTERs from UEs spread over a few
+thousand cells.
+
+    python benchmarks/bench_stats.py --messages 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sip_parser import SipMessage, access_type  # noqa: E402
+from sip_stats import StatsCollector, cell_id, empty_stats  # noqa: E402
+
+ACCESS_TYPES = ('3GPP-E-UTRAN-FDD', '3GPP-E-UTRAN-TDD', '3GPP-NR-FDD', 'IEEE-802.11n')
+
+
+def synthetic_messages(count, cells=2000, seconds=3600):
+    random.seed(1)
+    messages = []
+    for frame in range(count):
+        message = SipMessage(frame, 'REGISTER')
+        message.time = 1700000000.0 + frame * seconds / count
+        cell = random.randrange(cells)
+        message.pani = f"{ACCESS_TYPES[cell % len(ACCESS_TYPES)]}; utran-cell-id-3gpp=310410{cell:09X}"
+        if frame % 3 == 0:
+            message.cni = f"3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=310410{cell:09X}; cell-info-age={frame % 60}"
+        messages.append(message)
+    return messages
+
+
+def per_message_counts(messages):
+    """The straightforward version: derive and count every field per message"""
+    stats = empty_stats()
+    for message in messages:
+        for name, value in (('pani_access_types', message.pani), ('cni_access_types', message.cni)):
+            if value:
+                key = access_type(value)
+                stats[name][key] = stats[name].get(key, 0) + 1
+        cell = (cell_id(message.pani) if message.pani else '') or (cell_id(message.cni) if message.cni else '')
+        if cell:
+            stats['cells'][cell] = stats['cells'].get(cell, 0) + 1
+        minute = datetime.fromtimestamp(message.time).strftime('%Y-%m-%d %H:%M')
+        stats['minutes'][minute] = stats['minutes'].get(minute, 0) + 1
+    return stats
+
+
+def batched_counts(messages):
+    collector = StatsCollector()
+    for message in messages:
+        collector.add(message)
+    return collector.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1000000)
+    args = parser.parse_args()
+
+    messages = synthetic_messages(args.messages)
+    print(f"{args.messages} REGISTER messages")
+    results = []
+    for label, count in (('dict update per message', per_message_counts), ('StatsCollector', batched_counts)):
+        start = time.perf_counter()
+        results.append(count(messages))
+        elapsed = time.perf_counter() - start
+        print(f"{label:24} {elapsed / args.messages * 1e6:6.2f} us/message")
+    if results[0] != results[1]:
+        print("Histograms differ!")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Deterministic synthetic SIP captures for benchmarks
+
+Writes a pcap or pcapng file of Ethernet/IPv4 frames carrying SIP over UDP
+or TCP (one message per segment), mixed with non-SIP UDP frames, and
+returns the counters a correct analysis reports for it. The same
+arguments always produce the same bytes.
+
+    python benchmarks/synthetic_pcap.py sip.pcap --packets 500000 --tcp 0.2
+"""
+import argparse
+import random
+import struct
+from collections import deque
+
+# Relative weights of the SIP messages generated; 'response' answers one of the
+# recent REGISTER/INVITE requests still waiting for a final response
+DEFAULT_MIX = {'REGISTER': 40, 'INVITE': 20, 'OPTIONS': 10, 'BYE': 5, 'ACK': 5, 'response': 70}
+
+# First frame timestamp and spacing between frames, in seconds
+BASE_TIME = 1700000000.0
+FRAME_INTERVAL = 0.001
+
+# Distinct UEs and cells the messages are spread over
+SUBSCRIBERS = 50000
+CELLS = 2000
+
+# REGISTER/INVITE requests that can still be answered; older ones never get a
+# final response and end up timed out or unfinished in transaction correlation
+PENDING_REQUESTS = 64
+
+# Share of REGISTERs answered with 401 Unauthorized instead of 200 OK
+CHALLENGE_RATE = 0.3
+
+ACCESS_TYPES = ('3GPP-E-UTRAN-FDD', '3GPP-E-UTRAN-TDD', '3GPP-NR-FDD', 'IEEE-802.11n')
+
+LINKTYPE_ETHERNET = 1
+SNAPLEN = 65535
+
+
+def parse_mix(text):
+    """{kind: weight} from 'REGISTER=40,INVITE=20,response=20'"""
+    mix = {}
+    for item in text.split(','):
+        kind, _, weight = item.partition('=')
+        try:
+            mix[kind.strip()] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid mix entry '{item}' (expected KIND=WEIGHT)")
+    return mix
+
+
+def _ethernet_ipv4(protocol, transport):
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(transport), 1, 0x4000, 64, protocol, 0,
+                     bytes((10, 0, 0, 1)), bytes((10, 0, 0, 2)))
+    return b'\x00\x00\x00\x00\x00\x02' + b'\x00\x00\x00\x00\x00\x01' + b'\x08\x00' + ip + transport
+
+
+def udp_frame(payload, sport=5060, dport=5060):
+    return _ethernet_ipv4(17, struct.pack('!HHHH', sport, dport, 8 + len(payload), 0) + payload)
+
+
+def tcp_frame(payload, seq, sport=5060, dport=5060):
+    return _ethernet_ipv4(6, struct.pack('!HHIIBBHHH', sport, dport, seq, 1, 5 << 4, 0x18, 65535, 0, 0) + payload)
+
+
+def sip_request(method, index, subscriber, pani, cni, compact):
+    user = f"+1555{subscriber:07d}"
+    cell = subscriber % CELLS
+    lines = [
+        f"{method} sip:ims.example.com SIP/2.0",
+        f"Via: SIP/2.0/UDP 10.0.0.1:5060;branch=z9hG4bK{index:x}",
+        f"{'t' if compact else 'To'}: <sip:{user}@ims.example.com>",
+        f"{'f' if compact else 'From'}: <sip:{user}@ims.example.com>;tag={index:x}",
+        f"{'i' if compact else 'Call-ID'}: {index:x}@ue.example.com",
+        f"CSeq: {index % 65536 + 1} {method}",
+        "Route: <sip:pcscf.ims.example.com;lr>",
+    ]
+    if pani:
+        lines.append(f"P-Access-Network-Info: {ACCESS_TYPES[cell % len(ACCESS_TYPES)]}; "
+                     f"utran-cell-id-3gpp=310410{cell:09X}")
+    if cni:
+        lines.append(f"Cellular-Network-Info: 3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=310410{cell:09X}; "
+                     f"cell-info-age={index % 60}")
+    lines.append(f"{'l' if compact else 'Content-Length'}: 0")
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+
+# Reason phrases of the response codes generated
+REASONS = {180: 'Ringing', 200: 'OK', 401: 'Unauthorized'}
+
+
+def sip_response(index, method, status=200):
+    """Response to the request generated as message index (same Via branch, Call-ID and CSeq)"""
+    return (f"SIP/2.0 {status} {REASONS[status]}\r\n"
+            f"Via: SIP/2.0/UDP 10.0.0.1:5060;branch=z9hG4bK{index:x}\r\n"
+            f"Call-ID: {index:x}@ue.example.com\r\n"
+            f"CSeq: {index % 65536 + 1} {method}\r\n"
+            f"Content-Length: 0\r\n\r\n").encode()
+
+
+def _pcap_writer(f):
+    f.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, SNAPLEN, LINKTYPE_ETHERNET))
+
+    def write(timestamp, data):
+        seconds = int(timestamp)
+        f.write(struct.pack('<IIII', seconds, round((timestamp - seconds) * 1e6), len(data), len(data)) + data)
+    return write
+
+
+def _pcapng_block(block_type, body):
+    length = 12 + len(body)
+    return struct.pack('<II', block_type, length) + body + struct.pack('<I', length)
+
+
+def _pcapng_writer(f):
+    f.write(_pcapng_block(0x0A0D0D0A, struct.pack('<IHHq', 0x1A2B3C4D, 1, 0, -1)))
+    f.write(_pcapng_block(1, struct.pack('<HHI', LINKTYPE_ETHERNET, 0, SNAPLEN)))
+
+    def write(timestamp, data):
+        microseconds = round(timestamp * 1e6)
+        body = struct.pack('<IIIII', 0, microseconds >> 32, microseconds & 0xffffffff, len(data), len(data))
+        f.write(_pcapng_block(6, body + data + b'\x00' * (-len(data) % 4)))
+    return write
+
+
+def generate(path, packets, seed=1, mix=None, pani=0.7, cni=0.3, tcp=0.1, noise=0.1, compact=0.1,
+             capture_format='pcap'):
+    """Write a capture of packets frames to path and return the counters its analysis must report
+
+    mix weights the SIP message kinds (DEFAULT_MIX); pani/cni are the
+    shares of REGISTER/INVITE carrying each header, tcp the share of SIP
+    messages sent over TCP, noise the share of frames that are not SIP,
+    compact the share of requests using compact header names. Responses
+    answer the oldest of the last PENDING_REQUESTS REGISTER/INVITE requests
+    still open, so they correlate by Call-ID/CSeq: an INVITE gets 180
+    Ringing, then 200 OK; a REGISTER gets 200 OK or, at CHALLENGE_RATE,
+    401. A response with no request open answers one never sent.
+    """
+    mix = mix or DEFAULT_MIX
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    rng = random.Random(seed)
+    expected = dict.fromkeys(('total_packets', 'register_count', 'invite_count', 'pani_register_count',
+                              'pani_invite_count', 'cni_register_count', 'cni_invite_count'), 0)
+    tcp_seq = 1
+    # [request index, method, ringing sent] of the requests a response can answer
+    pending = deque(maxlen=PENDING_REQUESTS)
+    with open(path, 'wb') as f:
+        write = (_pcapng_writer if capture_format == 'pcapng' else _pcap_writer)(f)
+        for index in range(packets):
+            timestamp = BASE_TIME + index * FRAME_INTERVAL
+            if rng.random() < noise:
+                # RTP-sized datagram between media ports
+                write(timestamp, udp_frame(rng.getrandbits(172 * 8).to_bytes(172, 'little'), 40000, 40002))
+                continue
+            kind = rng.choices(kinds, weights)[0]
+            subscriber = rng.randrange(SUBSCRIBERS)
+            if kind == 'response':
+                if pending:
+                    request = pending.popleft()
+                    request_index, method, ringing = request
+                    if method == 'INVITE' and not ringing:
+                        status = 180
+                        request[2] = True
+                        pending.appendleft(request)
+                    elif method == 'REGISTER' and rng.random() < CHALLENGE_RATE:
+                        status = 401
+                    else:
+                        status = 200
+                    payload = sip_response(request_index, method, status)
+                else:
+                    payload = sip_response(index, rng.choice(('REGISTER', 'INVITE')))
+            else:
+                has_pani = rng.random() < pani
+                has_cni = rng.random() < cni
+                payload = sip_request(kind, index, subscriber, has_pani, has_cni, rng.random() < compact)
+                if kind in ('REGISTER', 'INVITE'):
+                    suffix = kind.lower()
+                    expected[f'{suffix}_count'] += 1
+                    expected[f'pani_{suffix}_count'] += has_pani
+                    expected[f'cni_{suffix}_count'] += has_cni
+                    pending.append([index, kind, False])
+            expected['total_packets'] += 1
+            if rng.random() < tcp:
+                write(timestamp, tcp_frame(payload, tcp_seq))
+                tcp_seq += len(payload)
+            else:
+                write(timestamp, udp_frame(payload))
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--packets', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--mix', type=parse_mix, help="weights, e.g. REGISTER=40,INVITE=20,OPTIONS=10,response=20")
+    parser.add_argument('--pani', type=float, default=0.7)
+    parser.add_argument('--cni', type=float, default=0.3)
+    parser.add_argument('--tcp', type=float, default=0.1)
+    parser.add_argument('--noise', type=float, default=0.1)
+    parser.add_argument('--compact', type=float, default=0.1)
+    parser.add_argument('--format', choices=('pcap', 'pcapng'), default='pcap')
+    args = parser.parse_args()
+    expected = generate(args.path, args.packets, args.seed, args.mix, args.pani, args.cni, args.tcp, args.noise,
+                        args.compact, args.format)
+    print(' '.join(f"{key}={value}" for key, value in expected.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,595 @@
+import gzip
+import mmap
+import os
+import struct
+
+# Classic pcap magic numbers (microsecond and nanosecond resolution)
+PCAP_MAGIC_US = 0xA1B2C3D4
+PCAP_MAGIC_NS = 0xA1B23C4D
+
+# pcapng block types we care about
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_IDB = 0x00000001
+PCAPNG_PB = 0x00000002
+PCAPNG_SPB = 0x00000003
+PCAPNG_EPB = 0x00000006
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+PCAPNG_KNOWN_BLOCKS = (PCAPNG_SHB, PCAPNG_IDB, PCAPNG_PB, PCAPNG_SPB, 0x00000004, 0x00000005,
+                       PCAPNG_EPB, 0x00000007, 0x00000009, 0x0000000A, 0x00000BAD, 0x40000BAD)
+
+# Sanity limits used when resynchronizing on record boundaries
+MAX_FRAME_LEN = 262144
+RESYNC_WINDOW = 4 * 1024 * 1024
+
+# Suffixes of compressed captures that are decompressed on the fly
+COMPRESSED_EXTENSIONS = ('.gz', '.zst')
+
+# Largest pcapng block accepted from a stream (a frame plus block header and options)
+MAX_STREAM_BLOCK_LEN = MAX_FRAME_LEN + 65536
+
+# Link-layer types understood by transport_payload
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_RAW_ALT = 12
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+VLAN_ETHERTYPES = (0x8100, 0x88A8, 0x9100)
+
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+IPV6_EXTENSION_HEADERS = (0, 43, 60)
+IPV6_FRAGMENT_HEADER = 44
+IPV6_AH_HEADER = 51
+
+_U16 = struct.Struct('!H')
+
+
+class MultiSectionCapture(ValueError):
+    """A chunk of a pcapng capture reached a further section header"""
+
+
+def _count_pcap_frames(f, endian):
+    """Walk classic pcap record headers and count frames"""
+    count = 0
+    f.seek(24)
+    while True:
+        header = f.read(16)
+        if len(header) < 16:
+            break
+        incl_len = struct.unpack(endian + 'I', header[8:12])[0]
+        f.seek(incl_len, os.SEEK_CUR)
+        count += 1
+    return count
+
+
+def _count_pcapng_frames(f):
+    """Walk pcapng block headers and count packet blocks"""
+    count = 0
+    endian = '<'
+    while True:
+        header = f.read(12)
+        if len(header) < 12:
+            break
+        if struct.unpack('<I', header[:4])[0] == PCAPNG_SHB:
+            # Each section header carries its own byte order
+            endian = '<' if struct.unpack('<I', header[8:12])[0] == PCAPNG_BYTE_ORDER_MAGIC else '>'
+        block_type, block_len = struct.unpack(endian + 'II', header[:8])
+        if block_len < 12:
+            break
+        if block_type in (PCAPNG_EPB, PCAPNG_SPB, PCAPNG_PB):
+            count += 1
+        f.seek(block_len - 12, os.SEEK_CUR)
+    return count
+
+
+def count_frames(file_path):
+    """Count frames by walking record headers only, without dissecting anything"""
+    with open(file_path, 'rb') as f:
+        head = f.read(4)
+        if len(head) < 4:
+            return 0
+        if struct.unpack('<I', head)[0] in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+            return _count_pcap_frames(f, '<')
+        if struct.unpack('>I', head)[0] in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+            return _count_pcap_frames(f, '>')
+        if struct.unpack('<I', head)[0] == PCAPNG_SHB:
+            f.seek(0)
+            return _count_pcapng_frames(f)
+    return 0
+
+
+def _pcap_format(buf):
+    """Return (endian, timestamp units) for a classic pcap buffer, or None"""
+    magic = struct.unpack_from('<I', buf, 0)[0]
+    if magic in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+        return '<', 1000000 if magic == PCAP_MAGIC_US else 1000000000
+    magic = struct.unpack_from('>I', buf, 0)[0]
+    if magic in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+        return '>', 1000000 if magic == PCAP_MAGIC_US else 1000000000
+    return None
+
+
+def _iter_pcap_records(buf, endian, units, offset=24, end=None):
+    """Yield records from a classic pcap buffer between two record boundaries"""
+    linktype = struct.unpack_from(endian + 'I', buf, 20)[0] & 0x0FFFFFFF
+    record = struct.Struct(endian + 'IIII')
+    size = len(buf)
+    end = size if end is None else end
+    number = 0
+    while offset + 16 <= size and offset < end:
+        seconds, fraction, incl_len, _ = record.unpack_from(buf, offset)
+        offset += 16
+        if offset + incl_len > size:
+            break  # truncated last record
+        number += 1
+        yield number, (seconds * units + fraction) / units, linktype, offset, incl_len
+        offset += incl_len
+
+
+def _pcapng_tsresol(buf, offset, end, endian):
+    """Return timestamp units per second from the if_tsresol option of an IDB"""
+    option = struct.Struct(endian + 'HH')
+    while offset + 4 <= end:
+        code, length = option.unpack_from(buf, offset)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            value = buf[offset + 4]
+            return 2 ** (value & 0x7F) if value & 0x80 else 10 ** value
+        offset += 4 + ((length + 3) & ~3)
+    return 1000000
+
+
+def _pcapng_interfaces(buf):
+    """Read the byte order and interface table declared before the first packet"""
+    endian = '<'
+    interfaces = []
+    offset = 0
+    while offset + 12 <= len(buf):
+        if struct.unpack_from('<I', buf, offset)[0] == PCAPNG_SHB:
+            magic = struct.unpack_from('<I', buf, offset + 8)[0]
+            endian = '<' if magic == PCAPNG_BYTE_ORDER_MAGIC else '>'
+        block_type, block_len = struct.unpack_from(endian + 'II', buf, offset)
+        if block_type in (PCAPNG_EPB, PCAPNG_SPB, PCAPNG_PB) or block_len < 12:
+            break
+        if block_type == PCAPNG_IDB:
+            linktype = struct.unpack_from(endian + 'H', buf, offset + 8)[0]
+            interfaces.append((linktype, _pcapng_tsresol(buf, offset + 16, offset + block_len - 4, endian)))
+        offset += block_len
+    return endian, interfaces
+
+
+def _pcapng_block_packet(buf, offset, block_type, block_len, endian, interfaces):
+    """Return (timestamp, linktype, data_offset, caplen) for a packet block, else None
+
+    Interface description blocks are appended to interfaces.
+    """
+    if block_type == PCAPNG_IDB:
+        linktype = struct.unpack_from(endian + 'H', buf, offset + 8)[0]
+        units = _pcapng_tsresol(buf, offset + 16, offset + block_len - 4, endian)
+        interfaces.append((linktype, units))
+    elif block_type == PCAPNG_EPB:
+        interface, high, low, caplen = struct.unpack_from(endian + 'IIII', buf, offset + 8)
+        if interface < len(interfaces):
+            linktype, units = interfaces[interface]
+            return ((high << 32) | low) / units, linktype, offset + 28, caplen
+    elif block_type == PCAPNG_SPB:
+        if interfaces:
+            orig_len = struct.unpack_from(endian + 'I', buf, offset + 8)[0]
+            return 0.0, interfaces[0][0], offset + 12, min(orig_len, block_len - 16)
+    elif block_type == PCAPNG_PB:
+        interface, _, high, low, caplen = struct.unpack_from(endian + 'HHIII', buf, offset + 8)
+        if interface < len(interfaces):
+            linktype, units = interfaces[interface]
+            return ((high << 32) | low) / units, linktype, offset + 28, caplen
+    return None
+
+
+def _iter_pcapng_blocks(buf, offset=0, end=None, endian='<', interfaces=None, single_section=False):
+    """Yield (block_start, block_len, record) for every pcapng block
+
+    record is the packet record for packet blocks and None for metadata
+    blocks; interfaces are tracked per section. With single_section, a
+    section header past the start of buf raises MultiSectionCapture.
+    """
+    size = len(buf)
+    end = size if end is None else end
+    interfaces = list(interfaces or [])
+    number = 0
+    while offset + 12 <= size and offset < end:
+        if struct.unpack_from('<I', buf, offset)[0] == PCAPNG_SHB:
+            if single_section and offset:
+                raise MultiSectionCapture(f"Section header block at offset {offset}")
+            # Each section header carries its own byte order and interface table
+            magic = struct.unpack_from('<I', buf, offset + 8)[0]
+            endian = '<' if magic == PCAPNG_BYTE_ORDER_MAGIC else '>'
+            interfaces = []
+        block_type, block_len = struct.unpack_from(endian + 'II', buf, offset)
+        if block_len < 12 or offset + block_len > size:
+            break
+        record = None
+        packet = _pcapng_block_packet(buf, offset, block_type, block_len, endian, interfaces)
+        if packet is not None:
+            number += 1
+            record = (number, *packet)
+        yield offset, block_len, record
+        offset += block_len
+
+
+def _iter_pcapng_records(buf, offset=0, end=None, endian='<', interfaces=None, single_section=False):
+    """Yield records from a pcapng buffer, tracking interfaces per section"""
+    for _, _, record in _iter_pcapng_blocks(buf, offset, end, endian, interfaces, single_section):
+        if record is not None:
+            yield record
+
+
+def iter_records(buf, start=None, end=None):
+    """Yield (frame_number, timestamp, linktype, offset, caplen) for every frame in buf
+
+    buf can be any buffer (mmap, bytes); frame data is left in place and
+    addressed by offset so nothing is copied while walking the capture.
+    start/end restrict the walk to records beginning in that byte range;
+    start must be a record boundary (see split_capture). Frame numbers are
+    relative to start. Such a chunk of a pcapng capture is read with the
+    byte order and interfaces of the first section, so meeting a further
+    section header raises MultiSectionCapture.
+    """
+    if len(buf) < 4:
+        return iter(())
+    pcap_format = _pcap_format(buf)
+    if pcap_format:
+        return _iter_pcap_records(buf, *pcap_format, offset=start or 24, end=end)
+    if struct.unpack_from('<I', buf, 0)[0] == PCAPNG_SHB:
+        chunk = start is not None or end is not None
+        if not start:
+            return _iter_pcapng_records(buf, end=end, single_section=chunk)
+        endian, interfaces = _pcapng_interfaces(buf)
+        return _iter_pcapng_records(buf, start, end, endian, interfaces, single_section=True)
+    raise ValueError("Unsupported capture format (expected pcap or pcapng)")
+
+
+def _read_exact(f, size):
+    """Read size bytes from a stream; fewer means the stream ended"""
+    data = f.read(size)
+    while data and len(data) < size:
+        # Pipes may deliver less than asked for before the end
+        more = f.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+
+def iter_stream_records(f):
+    """Yield (frame_number, timestamp, linktype, data) from a pcap/pcapng byte stream
+
+    f is a binary file object that cannot seek (stdin, a named pipe). Only
+    one record is held in memory at a time. A record cut off by the end of
+    the stream ends the walk.
+    """
+    head = _read_exact(f, 4)
+    if len(head) < 4:
+        return
+    pcap_format = _pcap_format(head)
+    if pcap_format:
+        endian, units = pcap_format
+        header = head + _read_exact(f, 20)
+        if len(header) < 24:
+            return
+        linktype = struct.unpack_from(endian + 'I', header, 20)[0] & 0x0FFFFFFF
+        record = struct.Struct(endian + 'IIII')
+        number = 0
+        while True:
+            record_header = _read_exact(f, 16)
+            if len(record_header) < 16:
+                return
+            seconds, fraction, incl_len, _ = record.unpack(record_header)
+            if incl_len > MAX_FRAME_LEN:
+                raise ValueError(f"Corrupt pcap stream: record {number + 1} claims {incl_len} bytes")
+            data = _read_exact(f, incl_len)
+            if len(data) < incl_len:
+                return
+            number += 1
+            yield number, (seconds * units + fraction) / units, linktype, data
+    elif struct.unpack('<I', head)[0] == PCAPNG_SHB:
+        endian = '<'
+        interfaces = []
+        number = 0
+        while True:
+            header = head + _read_exact(f, 12 - len(head))
+            head = b''
+            if len(header) < 12:
+                return
+            if struct.unpack_from('<I', header, 0)[0] == PCAPNG_SHB:
+                magic = struct.unpack_from('<I', header, 8)[0]
+                endian = '<' if magic == PCAPNG_BYTE_ORDER_MAGIC else '>'
+                interfaces = []
+            block_type, block_len = struct.unpack_from(endian + 'II', header, 0)
+            if block_len < 12 or block_len > MAX_STREAM_BLOCK_LEN:
+                raise ValueError(f"Corrupt pcapng stream: block of {block_len} bytes")
+            block = header + _read_exact(f, block_len - 12)
+            if len(block) < block_len:
+                return
+            packet = _pcapng_block_packet(block, 0, block_type, block_len, endian, interfaces)
+            if packet is not None:
+                timestamp, linktype, offset, caplen = packet
+                number += 1
+                yield number, timestamp, linktype, block[offset:offset + caplen]
+    else:
+        raise ValueError("Unsupported capture format (expected pcap or pcapng)")
+
+
+def filter_capture(buf, out, keep):
+    """Copy a capture buffer to the binary file out, keeping frames where keep(record) is true
+
+    File headers, interface descriptions and other metadata blocks are
+    copied unchanged, so the result is a valid capture in the same format.
+    Returns the number of frames kept.
+    """
+    kept = 0
+    pcap_format = _pcap_format(buf) if len(buf) >= 4 else None
+    if pcap_format:
+        out.write(buf[:24])
+        for record in _iter_pcap_records(buf, *pcap_format):
+            if keep(record):
+                out.write(buf[record[3] - 16:record[3] + record[4]])
+                kept += 1
+    elif len(buf) >= 4 and struct.unpack_from('<I', buf, 0)[0] == PCAPNG_SHB:
+        for block_start, block_len, record in _iter_pcapng_blocks(buf):
+            if record is None or keep(record):
+                out.write(buf[block_start:block_start + block_len])
+                kept += record is not None
+    else:
+        raise ValueError("Unsupported capture format (expected pcap or pcapng)")
+    return kept
+
+
+def frame_end(buf, frame):
+    """Byte offset just past frame number frame, a record boundary, or None if there are fewer frames"""
+    pcap_format = _pcap_format(buf) if len(buf) >= 4 else None
+    if pcap_format:
+        for number, _, _, offset, caplen in _iter_pcap_records(buf, *pcap_format):
+            if number == frame:
+                return offset + caplen
+    elif len(buf) >= 4 and struct.unpack_from('<I', buf, 0)[0] == PCAPNG_SHB:
+        for block_start, block_len, record in _iter_pcapng_blocks(buf):
+            if record is not None and record[0] == frame:
+                return block_start + block_len
+    else:
+        raise ValueError("Unsupported capture format (expected pcap or pcapng)")
+    return None
+
+
+def capture_prefix(buf, offset):
+    """Header bytes that make the records from offset (a record boundary) on a valid capture
+
+    That is the file header for pcap, and for pcapng the section header
+    and interface descriptions of the section offset lies in.
+    """
+    pcap_format = _pcap_format(buf) if len(buf) >= 4 else None
+    if pcap_format:
+        return bytes(buf[:24])
+    if len(buf) >= 4 and struct.unpack_from('<I', buf, 0)[0] == PCAPNG_SHB:
+        endian = '<'
+        blocks = []
+        for block_start, block_len, _ in _iter_pcapng_blocks(buf, end=offset):
+            if struct.unpack_from('<I', buf, block_start)[0] == PCAPNG_SHB:
+                magic = struct.unpack_from('<I', buf, block_start + 8)[0]
+                endian = '<' if magic == PCAPNG_BYTE_ORDER_MAGIC else '>'
+                blocks = []
+            if struct.unpack_from(endian + 'I', buf, block_start)[0] in (PCAPNG_SHB, PCAPNG_IDB):
+                blocks.append(bytes(buf[block_start:block_start + block_len]))
+        return b''.join(blocks)
+    raise ValueError("Unsupported capture format (expected pcap or pcapng)")
+
+
+def _valid_pcap_chain(buf, offset, endian, units, snaplen, depth=8):
+    """Check that several consecutive pcap record headers are plausible from offset"""
+    size = len(buf)
+    for _ in range(depth):
+        if offset == size:
+            return True
+        if offset + 16 > size:
+            return False
+        _, fraction, incl_len, orig_len = struct.unpack_from(endian + 'IIII', buf, offset)
+        if fraction >= units or incl_len > snaplen or incl_len > orig_len or orig_len > MAX_FRAME_LEN:
+            return False
+        offset += 16 + incl_len
+    return offset <= size
+
+
+def _valid_pcapng_chain(buf, offset, endian, depth=4):
+    """Check that several consecutive pcapng blocks are well formed from offset"""
+    size = len(buf)
+    for _ in range(depth):
+        if offset == size:
+            return True
+        if offset + 12 > size:
+            return False
+        block_type, block_len = struct.unpack_from(endian + 'II', buf, offset)
+        if block_type not in PCAPNG_KNOWN_BLOCKS or block_len < 12 or block_len % 4:
+            return False
+        if offset + block_len > size:
+            return False
+        if struct.unpack_from(endian + 'I', buf, offset + block_len - 4)[0] != block_len:
+            return False
+        offset += block_len
+    return True
+
+
+def split_capture(buf, chunks):
+    """Split a capture buffer into up to chunks (start, end) byte ranges on record boundaries
+
+    Each split point is moved forward to the next offset where a chain of
+    record headers validates, so no frame is cut in half. Only the first
+    pcapng section header is read here; walking a chunk of a multi-section
+    file (e.g. concatenated captures) raises MultiSectionCapture instead.
+    """
+    size = len(buf)
+    if size < 4 or chunks <= 1:
+        return [(None, None)]
+    pcap_format = _pcap_format(buf)
+    if pcap_format:
+        endian, units = pcap_format
+        snaplen = struct.unpack_from(endian + 'I', buf, 16)[0] or MAX_FRAME_LEN
+        first, step = 24, 1
+        is_boundary = lambda offset: _valid_pcap_chain(buf, offset, endian, units, snaplen)
+    elif struct.unpack_from('<I', buf, 0)[0] == PCAPNG_SHB:
+        endian, _ = _pcapng_interfaces(buf)
+        first, step = 0, 4
+        is_boundary = lambda offset: _valid_pcapng_chain(buf, offset, endian)
+    else:
+        raise ValueError("Unsupported capture format (expected pcap or pcapng)")
+
+    boundaries = [first]
+    for index in range(1, chunks):
+        offset = max(size * index // chunks, boundaries[-1] + step)
+        offset -= (offset - first) % step
+        limit = min(size, offset + RESYNC_WINDOW)
+        while offset < limit and not is_boundary(offset):
+            offset += step
+        if offset < limit and offset > boundaries[-1]:
+            boundaries.append(offset)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def map_file(file_path):
+    """Memory-map a capture read-only; returns b'' for empty files"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def is_compressed(file_path):
+    return file_path.lower().endswith(COMPRESSED_EXTENSIONS)
+
+
+def open_capture(file_path):
+    """Open a capture for sequential binary reads, decompressing .gz/.zst as it is read
+
+    Nothing is written to disk; .zst needs Python 3.14's compression.zstd
+    or the zstandard package.
+    """
+    lower = file_path.lower()
+    if lower.endswith('.gz'):
+        return gzip.open(file_path, 'rb')
+    if lower.endswith('.zst'):
+        try:
+            from compression import zstd
+            return zstd.open(file_path, 'rb')
+        except ImportError:
+            pass
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Reading .zst captures needs zstandard (pip install zstandard)")
+        return zstandard.open(file_path, 'rb')
+    return open(file_path, 'rb')
+
+
+def transport_payload(buf, offset, length, linktype):
+    """Decode link/IP/transport headers in place
+
+    Returns (start, end, protocol) of the UDP or TCP payload, or None for
+    anything else. IP fragments are skipped since they cannot be parsed
+    on their own.
+    """
+    end = offset + length
+    if linktype == LINKTYPE_ETHERNET:
+        if length < 14:
+            return None
+        ethertype = _U16.unpack_from(buf, offset + 12)[0]
+        pos = offset + 14
+        while ethertype in VLAN_ETHERTYPES and pos + 4 <= end:
+            ethertype = _U16.unpack_from(buf, pos + 2)[0]
+            pos += 4
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if length < 16:
+            return None
+        ethertype = _U16.unpack_from(buf, offset + 14)[0]
+        pos = offset + 16
+    elif linktype == LINKTYPE_LINUX_SLL2:
+        if length < 20:
+            return None
+        ethertype = _U16.unpack_from(buf, offset)[0]
+        pos = offset + 20
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_RAW_ALT, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        if length < 1:
+            return None
+        ethertype = ETHERTYPE_IPV4 if buf[offset] >> 4 == 4 else ETHERTYPE_IPV6
+        pos = offset
+    elif linktype == LINKTYPE_NULL:
+        if length < 4:
+            return None
+        # Address family is in host byte order of the capturing machine
+        family = struct.unpack_from('<I', buf, offset)[0]
+        if family > 0xFFFF:
+            family = struct.unpack_from('>I', buf, offset)[0]
+        ethertype = ETHERTYPE_IPV4 if family == 2 else ETHERTYPE_IPV6
+        pos = offset + 4
+    else:
+        return None
+
+    if ethertype == ETHERTYPE_IPV4:
+        if pos + 20 > end or buf[pos] >> 4 != 4:
+            return None
+        header_len = (buf[pos] & 0x0F) * 4
+        total_len = _U16.unpack_from(buf, pos + 2)[0]
+        if _U16.unpack_from(buf, pos + 6)[0] & 0x3FFF:
+            return None  # fragment
+        protocol = buf[pos + 9]
+        if total_len:
+            end = min(end, pos + total_len)  # drops Ethernet padding
+        pos += header_len
+    elif ethertype == ETHERTYPE_IPV6:
+        if pos + 40 > end:
+            return None
+        protocol = buf[pos + 6]
+        payload_len = _U16.unpack_from(buf, pos + 4)[0]
+        if payload_len:
+            end = min(end, pos + 40 + payload_len)
+        pos += 40
+        while True:
+            if protocol in IPV6_EXTENSION_HEADERS:
+                if pos + 2 > end:
+                    return None
+                protocol, ext_len = buf[pos], buf[pos + 1]
+                pos += (ext_len + 1) * 8
+            elif protocol == IPV6_FRAGMENT_HEADER:
+                if pos + 8 > end or _U16.unpack_from(buf, pos + 2)[0] & 0xFFF9:
+                    return None  # fragment
+                protocol = buf[pos]
+                pos += 8
+            elif protocol == IPV6_AH_HEADER:
+                if pos + 2 > end:
+                    return None
+                protocol, ext_len = buf[pos], buf[pos + 1]
+                pos += (ext_len + 2) * 4
+            else:
+                break
+    else:
+        return None
+
+    if protocol == IPPROTO_UDP:
+        if pos + 8 > end:
+            return None
+        udp_len = _U16.unpack_from(buf, pos + 4)[0]
+        if udp_len >= 8:
+            end = min(end, pos + udp_len)
+        return pos + 8, end, IPPROTO_UDP
+    if protocol == IPPROTO_TCP:
+        if pos + 20 > end:
+            return None
+        start = pos + (buf[pos + 12] >> 4) * 4
+        if start >= end:
+            return None
+        return start, end, IPPROTO_TCP
+    return None
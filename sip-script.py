@@ -1,11 +1,23 @@
-import pyshark
 import os
-import sys
-from datetime import datetime
-import glob
+import multiprocessing
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from tqdm import tqdm
+import sip_analyzer
+from sip_access import load_rules
+from sip_cache import ResultCache
+from sip_columnar import COLUMNAR_FORMATS
+from sip_dedup import DEFAULT_DEDUP_WINDOW
+from sip_dialogs import TRANSACTION_TABLE_SIZE
+from sip_metrics import ThroughputMeter, write_run_metrics
+
+# Worker events are drained at most this often, i.e. at most 10 redraws per second
+UI_REFRESH_MS = 100
+
+# Older console lines are dropped so redraw cost stays flat on long runs
+MAX_CONSOLE_LINES = 1000
 
 class SIPAnalyzerGUI:
     def __init__(self, root):
@@ -64,37 +76,124 @@ class SIPAnalyzerGUI:
         ttk.Entry(main_frame, textvariable=self.output_path, width=60).grid(row=5, column=0, columnspan=2, pady=(0, 30), padx=5, sticky=tk.EW)
         ttk.Button(main_frame, text="Browse", command=self.select_output_dir).grid(row=5, column=2, padx=5, pady=(0, 30))
         
+        # Analysis engine selection
+        ttk.Label(main_frame, text="Analysis Engine:", font=('Helvetica', 11)).grid(row=6, column=0, sticky=tk.W, pady=(0, 15))
+        self.backend_var = tk.StringVar(value=sip_analyzer.BACKENDS[0])
+        engine_frame = ttk.Frame(main_frame)
+        engine_frame.grid(row=6, column=1, columnspan=2, sticky=tk.W, padx=5, pady=(0, 15))
+        ttk.Combobox(engine_frame, textvariable=self.backend_var, values=sip_analyzer.BACKENDS,
+                     state='readonly', width=15).pack(side=tk.LEFT)
+        
+        # Number of files analyzed in parallel, one process each
+        ttk.Label(engine_frame, text="Workers:", font=('Helvetica', 11)).pack(side=tk.LEFT, padx=(20, 5))
+        self.workers_var = tk.IntVar(value=os.cpu_count() or 1)
+        ttk.Spinbox(engine_frame, from_=1, to=256, textvariable=self.workers_var, width=5).pack(side=tk.LEFT)
+        
+        # Split each capture into byte-range chunks analyzed in parallel (native engine only)
+        ttk.Label(engine_frame, text="Chunks per file:", font=('Helvetica', 11)).pack(side=tk.LEFT, padx=(20, 5))
+        self.chunks_var = tk.IntVar(value=1)
+        ttk.Spinbox(engine_frame, from_=1, to=256, textvariable=self.chunks_var, width=5).pack(side=tk.LEFT)
+        
+        # Optional stages, laid out on a grid so every control fits the window width
+        options_frame = ttk.LabelFrame(main_frame, text="Options", padding=10)
+        options_frame.grid(row=7, column=0, columnspan=3, sticky=tk.EW, padx=5, pady=(0, 30))
+        for column in range(4):
+            options_frame.grid_columnconfigure(column, weight=1)
+        
+        # Hand only REGISTER/INVITE frames to tshark (pyshark / tshark-fields engines)
+        self.prefilter_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Prefilter", variable=self.prefilter_var).grid(row=0, column=0,
+                                                                                             sticky=tk.W)
+        
+        # Access type, cell ID and per-minute histograms in the reports (needs numpy)
+        self.stats_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Statistics", variable=self.stats_var).grid(row=0, column=1, sticky=tk.W)
+        
+        # Drop copies of the same SIP message mirrored from several taps
+        self.dedup_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Dedup", variable=self.dedup_var).grid(row=0, column=2, sticky=tk.W)
+        
+        # Pair REGISTER/INVITE with their responses and report setup latencies
+        self.transactions_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Transactions", variable=self.transactions_var).grid(row=0, column=3,
+                                                                                                   sticky=tk.W)
+        
+        # Per-stage timings, throughput and memory written to run_metrics.json / .prom
+        self.metrics_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Metrics", variable=self.metrics_var).grid(row=1, column=0, sticky=tk.W,
+                                                                                         pady=(8, 0))
+        
+        # Reuse reports of captures already analyzed with the same settings
+        self.cache_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(options_frame, text="Use cache", variable=self.cache_var).grid(row=1, column=1, sticky=tk.W,
+                                                                                         pady=(8, 0))
+        
+        # Optional typed columnar output next to each text report
+        columnar_frame = ttk.Frame(options_frame)
+        columnar_frame.grid(row=1, column=2, columnspan=2, sticky=tk.W, pady=(8, 0))
+        ttk.Label(columnar_frame, text="Columnar:", font=('Helvetica', 11)).pack(side=tk.LEFT, padx=(0, 5))
+        self.columnar_var = tk.StringVar(value='none')
+        ttk.Combobox(columnar_frame, textvariable=self.columnar_var, values=('none',) + tuple(COLUMNAR_FORMATS),
+                     state='readonly', width=8).pack(side=tk.LEFT)
+        
+        # One time-ordered report (NAME.txt) across all captures instead of one per file (native engine)
+        merge_frame = ttk.Frame(options_frame)
+        merge_frame.grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=(8, 0))
+        self.merge_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(merge_frame, text="Merge files into", variable=self.merge_var).pack(side=tk.LEFT)
+        self.merge_name_var = tk.StringVar(value='merged')
+        ttk.Entry(merge_frame, textvariable=self.merge_name_var, width=14).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(merge_frame, text=".txt").pack(side=tk.LEFT)
+        
+        # Rule file classifying PANI/CNI access types into categories; cancelling the dialog clears it
+        self.access_rules_path = ''
+        self.access_rules_var = tk.StringVar(value="Access rules: none")
+        ttk.Button(options_frame, textvariable=self.access_rules_var,
+                   command=self.select_access_rules).grid(row=2, column=2, columnspan=2, sticky=tk.W, pady=(8, 0))
+        
         # Progress Bar with increased width and spacing
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(main_frame, length=600, mode='determinate', variable=self.progress_var)
-        self.progress_bar.grid(row=6, column=0, columnspan=3, pady=(0, 30), sticky=tk.EW)
+        self.progress_bar.grid(row=8, column=0, columnspan=3, pady=(0, 30), sticky=tk.EW)
         
         # Status Label with better font and spacing
         self.status_var = tk.StringVar(value="Ready to analyze...")
         self.status_label = ttk.Label(main_frame, textvariable=self.status_var, font=('Helvetica', 10))
-        self.status_label.grid(row=7, column=0, columnspan=3, pady=(0, 30))
+        self.status_label.grid(row=9, column=0, columnspan=3, pady=(0, 30))
         
         # Analysis Button with better styling and spacing
         style = ttk.Style()
         style.configure('Accent.TButton', font=('Helvetica', 12, 'bold'))
-        self.analyze_button = ttk.Button(main_frame, text="Start Analysis", command=self.start_analysis, style='Accent.TButton')
-        self.analyze_button.grid(row=8, column=0, columnspan=3, pady=(0, 30))
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=10, column=0, columnspan=3, pady=(0, 30))
+        self.analyze_button = ttk.Button(button_frame, text="Start Analysis", command=self.start_analysis, style='Accent.TButton')
+        self.analyze_button.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self.cancel_analysis, state='disabled')
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
         
         # Console Output with increased size and spacing
         self.console = tk.Text(main_frame, height=10, width=70, font=('Courier', 10))
-        self.console.grid(row=9, column=0, columnspan=3, pady=(0, 20), sticky=tk.NSEW)
+        self.console.grid(row=11, column=0, columnspan=3, pady=(0, 20), sticky=tk.NSEW)
         self.console.config(state='disabled')
         
         # Add scrollbar to console
         scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self.console.yview)
-        scrollbar.grid(row=9, column=3, sticky=tk.NS, pady=(0, 20))
+        scrollbar.grid(row=11, column=3, sticky=tk.NS, pady=(0, 20))
         self.console.configure(yscrollcommand=scrollbar.set)
         
         # Footer text with adjusted spacing
         footer_text = ttk.Label(main_frame, text="Done by M. ElSakka", 
                                font=('Helvetica', 7, 'italic'), 
                                foreground='gray')
-        footer_text.grid(row=10, column=0, columnspan=3, pady=(10, 0), sticky=tk.SE)
+        footer_text.grid(row=12, column=0, columnspan=3, pady=(10, 0), sticky=tk.SE)
+        
+        # Analysis runs on a background thread and reports back through this queue
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        # Live SIP packets/s appended to the status line while a run is going
+        self.throughput = None
+        self.status_text = self.status_var.get()
+        self.root.after(UI_REFRESH_MS, self.poll_events)
 
     def select_input_dir(self):
         directory = filedialog.askdirectory(title="Select Input Directory")
@@ -106,12 +205,54 @@ class SIPAnalyzerGUI:
         if directory:
             self.output_path.set(directory)
 
+    def select_access_rules(self):
+        path = filedialog.askopenfilename(title="Select Access Rule File")
+        self.access_rules_path = path or ''
+        self.access_rules_var.set(f"Access rules: {os.path.basename(path) if path else 'none'}")
+
     def update_console(self, message):
-        self.console.config(state='normal')
-        self.console.insert(tk.END, message + "\n")
-        self.console.see(tk.END)
-        self.console.config(state='disabled')
-        self.root.update()
+        # Safe from any thread; the widget is only touched by poll_events
+        self.events.put(('log', message))
+
+    def poll_events(self):
+        """Drain queued worker events and apply them in a single redraw"""
+        lines = []
+        progress = None
+        status = None
+        finished = None
+        while True:
+            try:
+                kind, value = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'log':
+                lines.append(value)
+            elif kind == 'progress':
+                progress = value
+            elif kind == 'status':
+                status = value
+            elif kind == 'finished':
+                finished = value
+
+        if lines:
+            self.console.config(state='normal')
+            self.console.insert(tk.END, "\n".join(lines[-MAX_CONSOLE_LINES:]) + "\n")
+            self.console.delete('1.0', f'end-{MAX_CONSOLE_LINES + 1}l')
+            self.console.see(tk.END)
+            self.console.config(state='disabled')
+        if progress is not None:
+            self.progress_var.set(progress)
+        if status is not None:
+            self.status_text = status
+        rate = self.throughput.update() if self.throughput is not None else None
+        if status is not None or rate is not None:
+            text = self.status_text if rate is None else f"{self.status_text} | {rate:,.0f} SIP packets/s"
+            if text != self.status_var.get():
+                self.status_var.set(text)
+        if finished is not None:
+            self.analysis_finished(*finished)
+
+        self.root.after(UI_REFRESH_MS, self.poll_events)
 
     def start_analysis(self):
         input_dir = self.input_path.get()
@@ -126,28 +267,136 @@ class SIPAnalyzerGUI:
             os.makedirs(output_dir)
 
         # Get all pcap files
-        pcap_files = glob.glob(os.path.join(input_dir, '*.pcap'))
-        if not pcap_files:
-            messagebox.showerror("Error", f"No .pcap files found in '{input_dir}'!")
+        jobs = sip_analyzer.find_jobs(input_dir, output_dir)
+        if not jobs:
+            messagebox.showerror("Error", f"No capture files (.pcap, .pcapng, .cap, also .gz/.zst) found in '{input_dir}'!")
             return
 
+        try:
+            workers = max(1, self.workers_var.get())
+            chunks = max(1, self.chunks_var.get())
+        except tk.TclError:
+            messagebox.showerror("Error", "Workers and chunks per file must be whole numbers!")
+            return
+
+        merged_report = None
+        if self.merge_var.get():
+            name = self.merge_name_var.get().strip()
+            if not name or os.path.basename(name) != name:
+                messagebox.showerror("Error", "Please enter a file name for the merged report!")
+                return
+            merged_report = os.path.join(output_dir, name + '.txt')
+            # A capture's own report must not be overwritten by the merged one
+            if any(report == merged_report for _, report in jobs):
+                messagebox.showerror("Error", f"'{name}.txt' is the report name of a capture in the input "
+                                              f"directory; please choose another name for the merged report!")
+                return
+            if os.path.exists(merged_report) and not messagebox.askyesno(
+                    "Overwrite", f"'{name}.txt' already exists in the output directory. Overwrite it?"):
+                return
+
+        access_rules = None
+        if self.access_rules_path:
+            try:
+                access_rules = load_rules(self.access_rules_path)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Error", f"Invalid access rule file: {e}")
+                return
+
         self.analyze_button.config(state='disabled')
-        total_files = len(pcap_files)
-        
+        self.cancel_button.config(state='normal')
+        self.cancel_event.clear()
+        self.status_text = f"Processing {len(jobs)} file(s) with {workers} worker(s)"
+        self.status_var.set(self.status_text)
+        self.update_console(f"Processing {len(jobs)} file(s) with {workers} worker(s)")
+        # Counted by every analysis process, read by poll_events
+        packet_counter = multiprocessing.Value('q', 0)
+        self.throughput = ThroughputMeter(packet_counter)
+
+        # Tk variables are read here on the main thread; the worker only gets plain values
+        worker = threading.Thread(
+            target=self.run_analysis,
+            args=(jobs, output_dir, self.backend_var.get(), workers, chunks, self.prefilter_var.get(),
+                  None if self.columnar_var.get() == 'none' else self.columnar_var.get(), self.cache_var.get(),
+                  self.stats_var.get(), TRANSACTION_TABLE_SIZE if self.transactions_var.get() else None,
+                  self.metrics_var.get(), packet_counter, access_rules,
+                  DEFAULT_DEDUP_WINDOW if self.dedup_var.get() else None, merged_report),
+            daemon=True
+        )
+        worker.start()
+
+    def run_analysis(self, jobs, output_dir, backend, workers, chunks, prefilter, columnar, use_cache, stats,
+                     transactions, metrics, packet_counter, access_rules, dedup, merged_report):
+        """Background thread body: run the analysis and queue progress events"""
+        total_files = len(jobs)
+        completed = 0
+
+        def file_completed(index, summary):
+            nonlocal completed
+            completed += 1
+            self.events.put(('progress', (completed / total_files) * 100))
+            self.events.put(('status', f"Completed {completed} of {total_files} file(s)"))
+            label = "Cached" if summary.get('cached') else "Completed"
+            self.update_console(f"{label}: {os.path.basename(jobs[index][0])}")
+
         try:
-            for index, pcap_file in enumerate(pcap_files, 1):
-                base_name = os.path.basename(pcap_file)
-                self.status_var.set(f"Processing: {base_name}")
-                self.progress_var.set((index / total_files) * 100)
-                
-                output_file = os.path.join(output_dir, base_name.replace('.pcap', '.txt'))
-                self.update_console(f"Processing: {base_name}")
-                
-                # Call the existing analysis function
-                self.extract_sip_info(pcap_file, output_file)
-                
-                self.update_console(f"Completed: {base_name}")
+            cache = ResultCache() if use_cache else None
+            start = time.perf_counter()
+            if merged_report is not None:
+                summary = sip_analyzer.merge_sip_info([file_path for file_path, _ in jobs], merged_report,
+                                                      progress=False, cancel=self.cancel_event,
+                                                      columnar=columnar, stats=stats,
+                                                      transactions=transactions, metrics=metrics,
+                                                      packet_counter=packet_counter, access_rules=access_rules,
+                                                      dedup=dedup)
+                self.events.put(('progress', 100))
+                self.update_console(f"Merged {total_files} file(s) into {os.path.basename(merged_report)}")
+                summaries = [summary]
+            else:
+                summaries = sip_analyzer.analyze_files(jobs, backend=backend, workers=workers,
+                                                       callback=file_completed, chunks=chunks,
+                                                       cancel=self.cancel_event, prefilter=prefilter,
+                                                       columnar=columnar, cache=cache, progress=False, stats=stats,
+                                                       transactions=transactions, metrics=metrics,
+                                                       packet_counter=packet_counter, access_rules=access_rules,
+                                                       dedup=dedup)
+            totals = sip_analyzer.write_run_summary(output_dir, summaries)
+            self.update_console(f"Run summary: {totals['total_packets']} SIP packets, "
+                                f"{totals['register_count']} REGISTER, {totals['invite_count']} INVITE")
+            if metrics:
+                report = write_run_metrics(output_dir, summaries, time.perf_counter() - start)
+                self.update_console(f"Throughput: {report['packets_per_sec']:,.0f} SIP packets/s, "
+                                    f"{report['bytes_per_sec'] / 1e6:.1f} MB/s (see run_metrics.json)")
+            self.events.put(('finished', ('success', output_dir)))
+        except sip_analyzer.AnalysisCancelled:
+            self.events.put(('finished', ('cancelled', output_dir)))
+        except SystemExit as e:
+            # The engine exits on fatal capture errors; report it instead of dying silently
+            self.events.put(('finished', ('error', f"Analysis failed (exit code {e.code}), see console output")))
+        except Exception as e:
+            self.events.put(('finished', ('error', str(e))))
+
+    def cancel_analysis(self):
+        self.cancel_event.set()
+        self.cancel_button.config(state='disabled')
+        self.status_text = "Cancelling..."
+        self.status_var.set(self.status_text)
 
+    def analysis_finished(self, outcome, detail):
+        """Back on the Tk thread once the worker is done"""
+        self.throughput = None
+        self.analyze_button.config(state='normal')
+        self.cancel_button.config(state='disabled')
+        self.progress_var.set(0)
+
+        if outcome == 'cancelled':
+            self.status_var.set("Analysis cancelled")
+            self.update_console("Analysis cancelled")
+        elif outcome == 'error':
+            self.status_var.set("Error occurred during analysis!")
+            messagebox.showerror("Error", detail)
+        else:
+            output_dir = detail
             self.status_var.set("Analysis completed successfully!")
             
             # Show completion message with file location
@@ -160,247 +409,10 @@ class SIPAnalyzerGUI:
             # Ask to open output folder
             if messagebox.askyesno("Open Folder", "Would you like to open the output folder?"):
                 os.startfile(output_dir) if os.name == 'nt' else os.system(f'xdg-open "{output_dir}"')
-                
-        except Exception as e:
-            self.status_var.set("Error occurred during analysis!")
-            messagebox.showerror("Error", str(e))
-            
-        finally:
-            self.analyze_button.config(state='normal')
-            self.progress_var.set(0)
-
-    def count_packets(self, file_path):
-        """Count total SIP packets in file"""
-        try:
-            capture = pyshark.FileCapture(
-                file_path,
-                display_filter='sip',
-                keep_packets=False,
-                output_file=None
-            )
-            count = 0
-            for _ in capture:
-                count += 1
-            capture.close()
-            return count
-        except Exception as e:
-            self.update_console(f"Error counting packets: {str(e)}")
-            return 0
-
-    def extract_sip_info(self, file_path, output_file):
-        try:
-            # First count total packets for progress bar
-            self.update_console("Counting packets...")
-            total_packets = self.count_packets(file_path)
-            
-            # Create capture object for SIP packets
-            capture = pyshark.FileCapture(
-                file_path,
-                display_filter='sip',
-                keep_packets=False,
-                output_file=None
-            )
-            
-            print(f"\nProcessing SIP messages in '{file_path}'...")
-            
-            # Initialize counters
-            register_count = 0
-            invite_count = 0
-            pani_register_count = 0  # P-Access-Network-Info in REGISTER
-            pani_invite_count = 0    # P-Access-Network-Info in INVITE
-            cni_register_count = 0   # Cellular-Network-Info in REGISTER
-            cni_invite_count = 0     # Cellular-Network-Info in INVITE
-            
-            # Temporary file for storing message details
-            temp_file = output_file + '.temp'
-            
-            # Process packets and write to temporary file
-            with open(temp_file, 'w') as file:
-                file.write("Detailed SIP Message Information:\n")
-                file.write("=" * 50 + "\n")
-                
-                # Create progress bar
-                with tqdm(total=total_packets, desc="Analyzing packets", unit="packet") as pbar:
-                    for packet in capture:
-                        try:
-                            if 'SIP' in packet:
-                                # Check for REGISTER or INVITE messages
-                                message_type = None
-                                if hasattr(packet.sip, 'request_method'):
-                                    if packet.sip.request_method == "REGISTER":
-                                        message_type = "REGISTER"
-                                        register_count += 1
-                                    elif packet.sip.request_method == "INVITE":
-                                        message_type = "INVITE"
-                                        invite_count += 1
-                                elif hasattr(packet.sip, 'request_line'):
-                                    if "REGISTER" in packet.sip.request_line:
-                                        message_type = "REGISTER"
-                                        register_count += 1
-                                    elif "INVITE" in packet.sip.request_line:
-                                        message_type = "INVITE"
-                                        invite_count += 1
-                                
-                                if message_type:
-                                    sip_headers = packet.sip
-                                    
-                                    # Track header availability based on message type
-                                    if hasattr(sip_headers, 'p_access_network_info'):
-                                        if message_type == "REGISTER":
-                                            pani_register_count += 1
-                                        elif message_type == "INVITE":
-                                            pani_invite_count += 1
-
-                                    if hasattr(sip_headers, 'cellular_network_info'):
-                                        if message_type == "REGISTER":
-                                            cni_register_count += 1
-                                        elif message_type == "INVITE":
-                                            cni_invite_count += 1
-                                    
-                                    # Write message type and timestamp
-                                    timestamp = packet.sniff_time.strftime('%Y-%m-%d %H:%M:%S.%f')
-                                    file.write(f"\nMessage Type: {message_type}\n")
-                                    file.write(f"Timestamp: {timestamp}\n")
-                                    
-                                    # Extract To header
-                                    if hasattr(sip_headers, 'to'):
-                                        to_header = sip_headers.to
-                                        file.write(f"To: {to_header}\n")
-                                        if ';' in to_header:
-                                            file.write("To Header Parameters:\n")
-                                            params = to_header.split(';')[1:]
-                                            for param in params:
-                                                param = param.strip()
-                                                if '=' in param:
-                                                    key, value = param.split('=', 1)
-                                                    file.write(f"  {key.strip()}: {value.strip()}\n")
-                                                else:
-                                                    file.write(f"  {param}\n")
-                                    
-                                    # Extract From header
-                                    if hasattr(sip_headers, 'from_'):
-                                        from_header = sip_headers.from_
-                                        file.write(f"From: {from_header}\n")
-                                        if ';' in from_header:
-                                            file.write("From Header Parameters:\n")
-                                            params = from_header.split(';')[1:]
-                                            for param in params:
-                                                param = param.strip()
-                                                if '=' in param:
-                                                    key, value = param.split('=', 1)
-                                                    file.write(f"  {key.strip()}: {value.strip()}\n")
-                                                else:
-                                                    file.write(f"  {param}\n")
-
-                                    # Extract Route header
-                                    if hasattr(sip_headers, 'route'):
-                                        route_header = sip_headers.route
-                                        file.write(f"Route: {route_header}\n")
-
-                                        '''
-                                        if ';' in route_header:
-                                            file.write("Route Header Parameters:\n")
-                                            params = route_header.split(';')[1:]
-                                            for param in params:
-                                                param = param.strip()
-                                                if '=' in param:
-                                                    key, value = param.split('=', 1)
-                                                    file.write(f"  {key.strip()}: {value.strip()}\n")
-                                                else:
-                                                    file.write(f"  {param}\n")
-                                        '''
-
-                                    # Extract P-Access-Network-Info
-                                    if hasattr(sip_headers, 'p_access_network_info'):
-                                        p_access_network_info = sip_headers.p_access_network_info
-                                        file.write(f"P-Access-Network-Info: {p_access_network_info}\n")
-                                                                            
-                                        '''
-                                        file.write("P-Access-Network-Info Parameters:\n")
-                                        for param in p_access_network_info.split(";"):
-                                            param = param.strip()
-                                            if '=' in param:
-                                                key, value = param.split('=', 1)
-                                                file.write(f"  {key.strip()}: {value.strip()}\n")
-                                            else:
-                                                file.write(f"  {param}\n")
-                                        '''
-                                    
-                                    # Extract Cellular-Network-Info
-                                    if hasattr(sip_headers, 'cellular_network_info'):
-                                        cellular_network_info = sip_headers.cellular_network_info
-                                        file.write(f"Cellular-Network-Info: {cellular_network_info}\n")
-
-                                        '''
-                                        file.write("Cellular-Network-Info Parameters:\n")
-                                        for param in cellular_network_info.split(";"):
-                                            param = param.strip()
-                                            if '=' in param:
-                                                key, value = param.split('=', 1)
-                                                file.write(f"  {key.strip()}: {value.strip()}\n")
-                                            else:
-                                                file.write(f"  {param}\n")
-                                        '''
-                                    
-                                    file.write("-" * 50 + "\n")
-
-                        except AttributeError as e:
-                            print(f"\nSkipping packet due to missing attribute: {str(e)}")
-                            continue
-                        except Exception as e:
-                            print(f"\nError processing packet: {str(e)}")
-                            continue
-                        finally:
-                            pbar.update(1)
-
-            # Write final file with summary at top
-            with open(output_file, 'w') as final_file:
-                # Write summary
-                final_file.write("SIP Analysis Summary\n")
-                final_file.write("=" * 50 + "\n")
-                final_file.write(f"Analysis Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                final_file.write(f"Input File: {os.path.basename(file_path)}\n")
-                final_file.write(f"Total SIP Packets: {total_packets}\n")
-                final_file.write(f"REGISTER Messages: {register_count}\n")
-                final_file.write(f"INVITE Messages: {invite_count}\n")
-                final_file.write("\nHeader Availability:\n")
-                final_file.write(f"P-Access-Network-Info in REGISTER: {pani_register_count}\n")
-                final_file.write(f"P-Access-Network-Info in INVITE: {pani_invite_count}\n")
-                final_file.write(f"Cellular-Network-Info in REGISTER: {cni_register_count}\n")
-                final_file.write(f"Cellular-Network-Info in INVITE: {cni_invite_count}\n")
-                final_file.write("=" * 50 + "\n\n")
-                
-                # Copy content from temporary file
-                with open(temp_file, 'r') as temp:
-                    final_file.write(temp.read())
-            
-            # Remove temporary file
-            os.remove(temp_file)
-
-            print(f"\nSummary:")
-            print(f"Total packets processed: {total_packets}")
-            print(f"REGISTER messages found: {register_count}")
-            print(f"INVITE messages found: {invite_count}")
-            print(f"\nHeader Availability:")
-            print(f"P-Access-Network-Info in REGISTER: {pani_register_count}")
-            print(f"P-Access-Network-Info in INVITE: {pani_invite_count}")
-            print(f"Cellular-Network-Info in REGISTER: {cni_register_count}")
-            print(f"Cellular-Network-Info in INVITE: {cni_invite_count}")
-
-        except pyshark.capture.capture.TSharkCrashException as e:
-            print(f"TShark crashed: {str(e)}")
-            print("Please ensure you have the latest version of TShark installed")
-            sys.exit(1)
-        except Exception as e:
-            print(f"An error occurred: {str(e)}")
-            sys.exit(1)
-        finally:
-            try:
-                capture.close()
-            except:
-                pass
 
 def main():
+    # Needed for the process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = SIPAnalyzerGUI(root)
     root.mainloop()
@@ -0,0 +1,173 @@
+import re
+from sip_parser import access_type
+
+# Category counted for header values no rule matches
+UNCLASSIFIED = 'Unclassified'
+
+# Prefix marking a rule pattern as a regular expression instead of a glob
+REGEX_PREFIX = 're:'
+
+# Inline flags opening a re: pattern, e.g. (?i); they are scoped to the rule's
+# own group since global flags are only allowed at the start of the combined regex
+INLINE_GLOBAL_FLAGS = re.compile(r'\(\?([aiLmsux]+)\)')
+
+# Numbered group references (\1, (?(1)...)) would point at the wrong group once
+# the rules are combined; escaped backslashes are matched so \\1 is not one
+NUMBERED_REFERENCE = re.compile(r'\\\\|\\[1-9]|\(\?\(\d')
+
+# Group names compile_rules gives the rules
+RULE_GROUP = re.compile(r'r\d+')
+
+# Distinct access types remembered before the lookup table is cleared
+CLASSIFY_CACHE_SIZE = 4096
+
+# Headers classified, summary key and label of each
+CLASSIFIED_HEADERS = (
+    ('pani', "P-Access-Network-Info"),
+    ('cni', "Cellular-Network-Info"),
+)
+
+
+def _glob_regex(pattern):
+    # * and ? are the only wildcards; everything else is literal
+    return ''.join('.*' if char == '*' else '.' if char == '?' else re.escape(char) for char in pattern)
+
+
+def _rule_regex(pattern):
+    """Regular expression for one rule pattern, with its leading inline flags scoped to it"""
+    if not pattern.startswith(REGEX_PREFIX):
+        return _glob_regex(pattern)
+    expression = pattern[len(REGEX_PREFIX):]
+    flags = ''
+    match = INLINE_GLOBAL_FLAGS.match(expression)
+    while match:
+        flags += match.group(1)
+        expression = expression[match.end():]
+        match = INLINE_GLOBAL_FLAGS.match(expression)
+    if not flags:
+        return expression
+    # A verbose-mode comment must not swallow the closing parenthesis
+    return f'(?{flags}:{expression}\n)' if 'x' in flags else f'(?{flags}:{expression})'
+
+
+def load_rules(path):
+    """[(category, pattern), ...] from an access rule file, in file order
+
+    Each non-empty line that is not a # comment holds a category and a
+    pattern separated by whitespace. The pattern is matched against the
+    whole access type (the text before the first ';' of the header value),
+    ignoring case: a glob with * and ?, or a regular expression after re:.
+    Regular expressions may start with inline flags such as (?i) but must
+    not use numbered group references, group names like r0, or a group
+    name of an earlier rule. Raises ValueError naming the line for
+    malformed rules, so they are reported before any analysis starts.
+    """
+    rules = []
+    group_names = set()
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split(None, 1)
+            if len(fields) != 2:
+                raise ValueError(f"{path}:{line_number}: expected 'CATEGORY PATTERN'")
+            category, pattern = fields[0], fields[1].strip()
+            if pattern.startswith(REGEX_PREFIX):
+                try:
+                    regex = re.compile(_rule_regex(pattern))
+                except re.error as e:
+                    raise ValueError(f"{path}:{line_number}: invalid regular expression ({e})")
+                if any(match.group() != '\\\\' for match in NUMBERED_REFERENCE.finditer(pattern)):
+                    raise ValueError(f"{path}:{line_number}: numbered group references are not supported, "
+                                     "use (?P<name>...) and (?P=name)")
+                for name in regex.groupindex:
+                    if RULE_GROUP.fullmatch(name) or name in group_names:
+                        raise ValueError(f"{path}:{line_number}: group name '{name}' is reserved or already used")
+                    group_names.add(name)
+            rules.append((category, pattern))
+    if not rules:
+        raise ValueError(f"{path}: no rules")
+    try:
+        compile_rules(rules)
+    except re.error as e:
+        raise ValueError(f"{path}: rules cannot be combined ({e})")
+    return rules
+
+
+def compile_rules(rules):
+    """One case-insensitive regex matching any rule, with the category index of each rule's group
+
+    Returns (regex, categories) where categories[i] belongs to the group
+    named r{i}. The alternatives keep file order, so when several rules
+    match an access type the first one wins.
+    """
+    alternatives = []
+    categories = []
+    for index, (category, pattern) in enumerate(rules):
+        alternatives.append(f'(?P<r{index}>{_rule_regex(pattern)})')
+        categories.append(category)
+    return re.compile('|'.join(alternatives), re.IGNORECASE), categories
+
+
+def empty_access_categories():
+    return {key: {} for key, _ in CLASSIFIED_HEADERS}
+
+
+def merge_access_categories(totals, counts):
+    """Add the category counts of counts to totals in place and return totals"""
+    for key, _ in CLASSIFIED_HEADERS:
+        histogram = totals[key]
+        for category, count in counts[key].items():
+            histogram[category] = histogram.get(category, 0) + count
+    return totals
+
+
+def format_access_categories(counts):
+    """Text block with the access network category counts of a report or run summary"""
+    lines = ["\nAccess Network Categories:\n"]
+    for key, label in CLASSIFIED_HEADERS:
+        lines.append(f"Categories in {label}:\n")
+        for category, count in sorted(counts[key].items(), key=lambda item: (-item[1], item[0])):
+            lines.append(f"  {category}: {count}\n")
+    return ''.join(lines)
+
+
+class AccessClassifier:
+    """Count PANI/CNI headers per access network category of the rules from load_rules
+
+    Each distinct access type is matched once against the combined rule
+    regex and then looked up. counts holds category counts to start from.
+    """
+
+    def __init__(self, rules, counts=None):
+        self.regex, self.categories = compile_rules(rules)
+        self.counts = merge_access_categories(empty_access_categories(), counts) if counts \
+            else empty_access_categories()
+        self._known = {}
+
+    def classify(self, network_info):
+        """Category of a P-Access-Network-Info / Cellular-Network-Info value"""
+        kind = access_type(network_info)
+        category = self._known.get(kind)
+        if category is None:
+            match = self.regex.fullmatch(kind)
+            category = self.categories[int(match.lastgroup[1:])] if match else UNCLASSIFIED
+            if len(self._known) >= CLASSIFY_CACHE_SIZE:
+                self._known.clear()
+            self._known[kind] = category
+        return category
+
+    def add(self, message):
+        if message.pani is not None:
+            histogram = self.counts['pani']
+            category = self.classify(message.pani)
+            histogram[category] = histogram.get(category, 0) + 1
+        if message.cni is not None:
+            histogram = self.counts['cni']
+            category = self.classify(message.cni)
+            histogram[category] = histogram.get(category, 0) + 1
+
+    def result(self):
+        """Category counts of everything added so far"""
+        return self.counts
@@ -0,0 +1,1679 @@
+import heapq
+import os
+import sys
+import shutil
+import signal
+import multiprocessing
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from pcap_reader import (COMPRESSED_EXTENSIONS, MultiSectionCapture, capture_prefix, count_frames, filter_capture,
+                         frame_end, is_compressed, iter_records, iter_stream_records, map_file, open_capture,
+                         split_capture, transport_payload)
+from sip_parser import (MAX_START_LINE, SipMessage, header_params, parse_cseq, parse_headers, request_method,
+                        response_status)
+from sip_checkpoint import Checkpoint
+from sip_columnar import COLUMNAR_FORMATS, ColumnarWriter, columnar_path
+from sip_stats import StatsCollector, empty_stats, format_stats, merge_stats
+from sip_access import AccessClassifier, empty_access_categories, format_access_categories, merge_access_categories
+from sip_dialogs import (TransactionCorrelator, empty_transaction_stats, format_transaction_stats,
+                         merge_transaction_stats, transactions_path)
+from sip_store import MessageStore, StoreWriter
+from sip_metrics import StageTimer, add_packets, merge_stages, timed_stage
+from sip_governor import LEAN_TSHARK_ARGUMENTS, TsharkGovernor
+from sip_dedup import Deduplicator
+
+# pyshark and tqdm are imported where they are used, so that headless runs
+# and the native backend do not pay for loading them
+
+# Analysis backends selectable from the GUI
+BACKENDS = ('pyshark', 'tshark-fields', 'native')
+
+# File name endings of the captures picked up from an input directory, each
+# optionally followed by one of COMPRESSED_EXTENSIONS
+CAPTURE_EXTENSIONS = ('.pcap', '.pcapng', '.cap')
+
+# Message types that get counted and written to the detail section
+REPORTED_METHODS = ('REGISTER', 'INVITE')
+
+# Per-file counters returned by extract_sip_info and summed for a run
+SUMMARY_FIELDS = (
+    'total_packets',
+    'register_count',
+    'invite_count',
+    'pani_register_count',
+    'pani_invite_count',
+    'cni_register_count',
+    'cni_invite_count',
+)
+
+# Bump when the report or columnar layout changes so cached results are recomputed
+REPORT_VERSION = 1
+
+# Write buffer for report files and chunk size for splicing them together
+REPORT_BUFFER_SIZE = 1024 * 1024
+
+# How often (in SIP messages) a running analysis checks for cancellation
+CANCEL_CHECK_INTERVAL = 1000
+
+# Seconds between running summaries while analyzing a stream
+STREAM_SUMMARY_INTERVAL = 10
+
+# Fields requested from tshark -T fields, in output column order. tshark
+# matches -e names case-sensitively, so these are spelled exactly as Wireshark
+# registers them (tshark -G fields) and an unknown one aborts the run
+TSHARK_FIELDS = (
+    'frame.number',
+    'frame.time_epoch',
+    'sip.Method',
+    'sip.Request-Line',
+    'sip.To',
+    'sip.From',
+    'sip.Route',
+    'sip.P-Access-Network-Info',
+    'sip.Cellular-Network-Info',
+    'sip.Call-ID',
+    'sip.CSeq.seq',
+    'sip.CSeq.method',
+    'sip.Status-Code',
+)
+
+# PDML names of the fields read from a pyshark SIP layer, keyed to SipMessage attributes
+# (spelled as Wireshark registers them, like TSHARK_FIELDS)
+PYSHARK_FIELDS = {
+    'to': 'sip.To',
+    'from_': 'sip.From',
+    'route': 'sip.Route',
+    'pani': 'sip.P-Access-Network-Info',
+    'cni': 'sip.Cellular-Network-Info',
+    'call_id': 'sip.Call-ID',
+}
+
+# Headers the native backend extracts
+NATIVE_HEADERS = frozenset({
+    'to',
+    'from',
+    'route',
+    'p-access-network-info',
+    'cellular-network-info',
+    'call-id',
+})
+
+# Headers that identify the transaction of a request or response
+TRANSACTION_HEADERS = frozenset({'call-id', 'cseq'})
+NATIVE_TRANSACTION_HEADERS = NATIVE_HEADERS | TRANSACTION_HEADERS
+
+# Cancellation flag of a pool worker process, set up by _init_worker
+_worker_cancel = None
+
+# Shared SIP packet counter of a pool worker process (live throughput), set up by _init_worker
+_worker_packets = None
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside a running analysis once cancellation has been requested"""
+
+
+def _init_worker(cancel, packet_counter=None):
+    global _worker_cancel, _worker_packets
+    _worker_cancel = cancel
+    _worker_packets = packet_counter
+
+
+def run_in_pool(function, task_args, workers, cancel=None, packet_counter=None, **kwargs):
+    """Run function(*args, **kwargs) for each task in a process pool
+
+    Yields (index, result) as tasks finish. cancel (anything with is_set())
+    is relayed to the workers through a multiprocessing.Event, so tasks that
+    are already running stop early as well. packet_counter (a
+    multiprocessing.Value) is handed to the workers, which add the SIP
+    packets they analyze to it.
+    """
+    worker_cancel = multiprocessing.Event()
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(worker_cancel, packet_counter))
+    try:
+        futures = {executor.submit(function, *args, **kwargs): index for index, args in enumerate(task_args)}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+            if cancel is not None and cancel.is_set():
+                worker_cancel.set()
+            for future in done:
+                yield futures[future], future.result()
+    except BaseException:
+        worker_cancel.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+
+def _sip_display_filter(after):
+    """tshark display filter for SIP packets past frame number after"""
+    return f'sip && frame.number > {after}' if after else 'sip'
+
+
+def _decompressed_pipe(file_path):
+    """Read end of an OS pipe that a background thread fills with the decompressed capture"""
+    stream = open_capture(file_path)
+    read_fd, write_fd = os.pipe()
+
+    def feed():
+        with stream, open(write_fd, 'wb') as pipe:
+            try:
+                shutil.copyfileobj(stream, pipe, REPORT_BUFFER_SIZE)
+            except (OSError, EOFError):
+                # The reader stopped early, or the archive is truncated
+                pass
+
+    threading.Thread(target=feed, daemon=True).start()
+    return open(read_fd, 'rb')
+
+
+def _tail_pipe(file_path, offset):
+    """Read end of an OS pipe fed with the capture from byte offset (a record boundary) on
+
+    The file header (and pcapng interface descriptions) go first, so the
+    reader sees a valid capture whose first frame is the one at offset.
+    """
+    buf = map_file(file_path)
+    try:
+        prefix = capture_prefix(buf, offset)
+    finally:
+        if hasattr(buf, 'close'):
+            buf.close()
+    read_fd, write_fd = os.pipe()
+
+    def feed():
+        with open(file_path, 'rb') as capture, open(write_fd, 'wb') as pipe:
+            try:
+                pipe.write(prefix)
+                capture.seek(offset)
+                shutil.copyfileobj(capture, pipe, REPORT_BUFFER_SIZE)
+            except OSError:
+                # The reader stopped early (tshark was restarted or the analysis ended)
+                pass
+
+    threading.Thread(target=feed, daemon=True).start()
+    return open(read_fd, 'rb')
+
+
+def _pyshark_message(packet, transactions=False):
+    """SipMessage for a pyshark packet of the SIP display filter"""
+    message = SipMessage(int(packet.number))
+    try:
+        if 'SIP' in packet:
+            # get_field finds a field by its exact PDML name with one dict
+            # lookup; attribute access sanitizes and compares every field name
+            get_field = packet.sip.get_field
+            # Check for REGISTER or INVITE messages
+            method = get_field('sip.Method')
+            request_line = get_field('sip.Request-Line')
+            if method is not None:
+                message.method = method
+            elif request_line is not None:
+                if "REGISTER" in request_line:
+                    message.method = "REGISTER"
+                elif "INVITE" in request_line:
+                    message.method = "INVITE"
+
+            if message.method in REPORTED_METHODS:
+                message.time = float(packet.sniff_timestamp)
+                for attribute, field in PYSHARK_FIELDS.items():
+                    setattr(message, attribute, get_field(field))
+            if transactions and message.method is None:
+                message.time = float(packet.sniff_timestamp)
+                message.call_id = get_field('sip.Call-ID')
+            if transactions and (message.method in REPORTED_METHODS or message.method is None):
+                cseq = get_field('sip.CSeq.seq')
+                message.cseq = int(cseq) if cseq is not None and cseq.isdigit() else None
+                message.cseq_method = get_field('sip.CSeq.method')
+                status = get_field('sip.Status-Code')
+                message.status = int(status) if status is not None and status.isdigit() else None
+    except AttributeError as e:
+        print(f"\nSkipping packet due to missing attribute: {str(e)}")
+        message.method = None
+    return message
+
+
+def iter_pyshark_messages(file_path, after=0, transactions=False, timer=None, pipe=None, governor=None):
+    """Yield one SipMessage per SIP packet using tshark dissection
+
+    Frames up to number after are skipped (used when resuming). Compressed
+    captures are decompressed on the fly and piped into tshark; pipe (a
+    readable binary file) is read instead of file_path when given. With
+    transactions, CSeq of REGISTER/INVITE and Call-ID/CSeq of responses
+    (with their time and status) are filled in too. With a StageTimer,
+    the field extraction is timed as its parse stage. With a
+    TsharkGovernor, tshark runs with lean preferences under its watch.
+    """
+    import pyshark
+    if pipe is None and is_compressed(file_path):
+        pipe = _decompressed_pipe(file_path)
+    options = {'custom_parameters': LEAN_TSHARK_ARGUMENTS} if governor is not None else {}
+    if pipe is not None:
+        # PipeCapture is not exported at the package level, and its close()
+        # closes the descriptor it was given, so it gets a copy of ours
+        from pyshark.capture.pipe_capture import PipeCapture
+        capture = PipeCapture(os.dup(pipe.fileno()), display_filter=_sip_display_filter(after), **options)
+    else:
+        capture = pyshark.FileCapture(
+            file_path,
+            display_filter=_sip_display_filter(after),
+            keep_packets=False,
+            output_file=None,
+            **options
+        )
+    if governor is not None:
+        # pyshark starts tshark on the first read
+        governor.watch(lambda: capture._running_processes)
+    parse = timer.timed('parse', _pyshark_message) if timer is not None else _pyshark_message
+    try:
+        for packet in capture:
+            yield parse(packet, transactions)
+    finally:
+        capture.close()
+        if pipe is not None:
+            pipe.close()
+
+
+def _tshark_fields_message(line, transactions=False):
+    """SipMessage for one line of tshark -T fields output in TSHARK_FIELDS order"""
+    (number, epoch, method, request_line, to_header, from_header, route, pani, cni,
+     call_id, cseq, cseq_method, status) = line.decode('utf-8', 'replace').rstrip('\r\n').split('\t')
+    # Check for REGISTER or INVITE messages
+    if not method and request_line:
+        if "REGISTER" in request_line:
+            method = "REGISTER"
+        elif "INVITE" in request_line:
+            method = "INVITE"
+    message = SipMessage(int(number), method or None)
+    if method in REPORTED_METHODS:
+        # Empty columns mean the header was not present
+        message.time = float(epoch)
+        message.to = to_header or None
+        message.from_ = from_header or None
+        message.route = route or None
+        message.pani = pani or None
+        message.cni = cni or None
+        message.call_id = call_id or None
+    if transactions and not method:
+        message.time = float(epoch)
+        message.call_id = call_id or None
+    if transactions and (method in REPORTED_METHODS or not method):
+        message.cseq = int(cseq) if cseq.isdigit() else None
+        message.cseq_method = cseq_method or None
+        message.status = int(status) if status.isdigit() else None
+    return message
+
+
+def iter_tshark_fields_messages(file_path, after=0, transactions=False, timer=None, pipe=None, governor=None,
+                                dedup=None):
+    """Yield one SipMessage per SIP packet from tshark -T fields output
+
+    tshark still dissects every frame, but only the reported fields are
+    printed as tab-separated text, which avoids building the PDML tree.
+    Frames up to number after are skipped (used when resuming). Compressed
+    captures are decompressed on the fly and piped into tshark; pipe (a
+    readable binary file) is read instead of file_path when given. With
+    transactions, CSeq of REGISTER/INVITE and Call-ID/CSeq of responses
+    (with their time and status) are filled in too. With a StageTimer,
+    splitting the lines into records is timed as its parse stage. With a
+    TsharkGovernor, tshark runs with lean preferences under its watch.
+    With a Deduplicator, lines whose SIP columns repeat within its window
+    are dropped before they are split.
+    """
+    import pyshark
+    if pipe is None and is_compressed(file_path):
+        pipe = _decompressed_pipe(file_path)
+    command = [
+        pyshark.tshark.tshark.get_process_path(), '-n', '-r', '-' if pipe else file_path,
+        '-Y', _sip_display_filter(after),
+        '-T', 'fields', '-E', 'separator=/t', '-E', 'occurrence=f', '-E', 'quote=n',
+    ]
+    for field in TSHARK_FIELDS:
+        command += ['-e', field]
+    if governor is not None:
+        command += LEAN_TSHARK_ARGUMENTS
+
+    with tempfile.TemporaryFile() as stderr:
+        try:
+            process = subprocess.Popen(command, stdin=pipe, stdout=subprocess.PIPE, stderr=stderr,
+                                       bufsize=1024 * 1024)
+        finally:
+            if pipe is not None:
+                # tshark holds its own copy of the read end
+                pipe.close()
+        if governor is not None:
+            governor.watch(lambda: (process,))
+        parse = timer.timed('parse', _tshark_fields_message) if timer is not None else _tshark_fields_message
+        try:
+            for line in process.stdout:
+                if not line.endswith(b'\n'):
+                    # Cut off by tshark being killed; the exit status below says so
+                    break
+                if dedup is not None:
+                    # Copies from other taps differ in frame number and time only
+                    _, epoch, columns = line.split(b'\t', 2)
+                    if dedup.is_duplicate(float(epoch), columns):
+                        continue
+                yield parse(line, transactions)
+
+            returncode = process.wait()
+            # Windows has no SIGKILL; there a killed tshark is not told apart from a failed one
+            if hasattr(signal, 'SIGKILL') and returncode == -signal.SIGKILL:
+                raise RuntimeError("tshark was killed, most likely for running out of memory; "
+                                   "a tshark memory limit restarts it before that happens")
+            if returncode != 0:
+                stderr.seek(0)
+                raise RuntimeError(f"tshark failed: {stderr.read().decode('utf-8', 'replace').strip()}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+
+
+def iter_supervised_messages(file_path, backend, after=0, transactions=False, timer=None, memory_limit=None,
+                             dedup=None):
+    """Yield the messages of a tshark backend, restarting tshark whenever it outgrows memory_limit MB
+
+    A TsharkGovernor watches the tshark process. When it kills tshark, the
+    capture is fed to a new tshark from the record after the last frame
+    delivered, with frame numbers shifted back to those of the whole
+    capture, so the caller sees one uninterrupted sequence of messages.
+    Each restart drops tshark's conversation and reassembly state; a SIP
+    message split over TCP segments across that point is lost. Needs an
+    uncompressed capture. dedup is passed on to iter_tshark_fields_messages.
+    """
+    iterate = iter_tshark_fields_messages if backend == 'tshark-fields' else iter_pyshark_messages
+    options = {'dedup': dedup} if dedup is not None else {}
+    governor = TsharkGovernor(memory_limit)
+    last_frame = after
+    restart_frame = None
+    try:
+        while True:
+            # The first run reads the file itself; restarts read its tail through a pipe
+            if restart_frame is None:
+                messages = iterate(file_path, after, transactions, timer, governor=governor, **options)
+                base_frame = 0
+            else:
+                buf = map_file(file_path)
+                try:
+                    offset = frame_end(buf, restart_frame)
+                finally:
+                    if hasattr(buf, 'close'):
+                        buf.close()
+                if offset is None:
+                    return
+                messages = iterate(file_path, 0, transactions, timer, _tail_pipe(file_path, offset), governor,
+                                   **options)
+                base_frame = restart_frame
+            try:
+                for message in messages:
+                    message.frame += base_frame
+                    last_frame = message.frame
+                    yield message
+            except Exception:
+                if not governor.tripped:
+                    raise
+            finally:
+                messages.close()
+            if not governor.tripped:
+                return
+            if last_frame == restart_frame:
+                raise RuntimeError(f"tshark needs more than {governor.limit_mb} MB before the next SIP packet "
+                                   f"after frame {last_frame}; raise the tshark memory limit")
+            governor.restarts += 1
+            restart_frame = last_frame
+            print(f"\ntshark reached {governor.tripped_rss // (1024 * 1024)} MB (limit {governor.limit_mb} MB); "
+                  f"restarting it after frame {restart_frame}")
+    finally:
+        governor.close()
+        if governor.restarts:
+            print(f"tshark was restarted {governor.restarts} time(s) to stay within {governor.limit_mb} MB")
+
+
+def _native_message(number, timestamp, payload, transactions=False, dedup=None):
+    """SipMessage for a frame payload that starts with a SIP start line, else None
+
+    With transactions, CSeq of REGISTER/INVITE and Call-ID/CSeq of
+    responses (with their time and status) are filled in too. With a
+    Deduplicator, a payload repeating one within its window gives None
+    before any header is parsed.
+    """
+    is_sip, method = request_method(payload)
+    if not is_sip:
+        return None
+    if dedup is not None and dedup.is_duplicate(timestamp, payload):
+        return None
+    message = SipMessage(number, method)
+    if method in REPORTED_METHODS:
+        message.time = timestamp
+        headers = parse_headers(payload, NATIVE_TRANSACTION_HEADERS if transactions else NATIVE_HEADERS)
+        message.to = headers.get('to')
+        message.from_ = headers.get('from')
+        message.route = headers.get('route')
+        message.pani = headers.get('p-access-network-info')
+        message.cni = headers.get('cellular-network-info')
+        message.call_id = headers.get('call-id')
+    elif transactions and method is None:
+        message.time = timestamp
+        message.status = response_status(payload)
+        headers = parse_headers(payload, TRANSACTION_HEADERS)
+        message.call_id = headers.get('call-id')
+    else:
+        return message
+    if transactions:
+        message.cseq, message.cseq_method = parse_cseq(headers.get('cseq'))
+    return message
+
+
+def iter_native_messages(file_path, start=None, end=None, after=0, transactions=False, timer=None, dedup=None,
+                         base_frame=0):
+    """Yield one SipMessage per SIP packet by parsing the capture bytes directly
+
+    The capture is memory-mapped and walked record by record; only frames
+    whose UDP/TCP payload starts with a SIP start line are reported, and
+    only the first SIP message of each frame is looked at, as with pyshark.
+    start/end limit the walk to one chunk from split_capture, whose frames
+    are numbered on from base_frame (the frames before the chunk). Frames
+    up to number after are only walked over, not parsed (used when
+    resuming).
+    Compressed captures are decompressed and walked as a stream instead.
+    transactions and dedup (a Deduplicator) are passed on to
+    _native_message. With a StageTimer, _native_message is timed as its
+    parse stage.
+    """
+    if is_compressed(file_path):
+        with open_capture(file_path) as stream:
+            yield from iter_stream_messages(stream, after=after, transactions=transactions, timer=timer,
+                                            dedup=dedup)
+        return
+    parse = timer.timed('parse', _native_message) if timer is not None else _native_message
+    buf = map_file(file_path)
+    try:
+        for number, timestamp, linktype, offset, caplen in iter_records(buf, start, end):
+            if number <= after:
+                continue
+            payload_range = transport_payload(buf, offset, caplen, linktype)
+            if payload_range is None:
+                continue
+            payload_start, payload_end, _ = payload_range
+            message = parse(base_frame + number, timestamp, buf[payload_start:payload_end], transactions, dedup)
+            if message is not None:
+                message.offset = offset + caplen
+                yield message
+    finally:
+        if hasattr(buf, 'close'):
+            buf.close()
+
+
+def iter_stream_messages(stream, stop=None, after=0, transactions=False, timer=None, dedup=None):
+    """Yield one SipMessage per SIP packet read from a pcap/pcapng byte stream
+
+    Same parsing as the native backend, for input that can only be read
+    once (stdin, a named pipe, a decompressor). Ends at the end of the
+    stream or as soon as stop gets set; frames up to number after are
+    skipped. transactions, timer and dedup are used as by
+    iter_native_messages.
+    """
+    parse = timer.timed('parse', _native_message) if timer is not None else _native_message
+    for number, timestamp, linktype, data in iter_stream_records(stream):
+        if stop is not None and stop.is_set():
+            return
+        if number <= after:
+            continue
+        payload_range = transport_payload(data, 0, len(data), linktype)
+        if payload_range is None:
+            continue
+        payload_start, payload_end, _ = payload_range
+        message = parse(number, timestamp, data[payload_start:payload_end], transactions, dedup)
+        if message is not None:
+            yield message
+
+
+def _sip_payloads(file_path, index):
+    # (timestamp, index, frame number, payload) of the frames of a capture
+    # that start with a SIP start line; the payload is parsed after the merge
+    if is_compressed(file_path):
+        with open_capture(file_path) as stream:
+            for number, timestamp, linktype, data in iter_stream_records(stream):
+                payload_range = transport_payload(data, 0, len(data), linktype)
+                if payload_range is not None:
+                    payload_start, payload_end, _ = payload_range
+                    payload = data[payload_start:payload_end]
+                    if request_method(payload)[0]:
+                        yield timestamp, index, number, payload
+        return
+    buf = map_file(file_path)
+    try:
+        for number, timestamp, linktype, offset, caplen in iter_records(buf):
+            payload_range = transport_payload(buf, offset, caplen, linktype)
+            if payload_range is not None:
+                payload_start, payload_end, _ = payload_range
+                payload = buf[payload_start:payload_end]
+                if request_method(payload)[0]:
+                    yield timestamp, index, number, payload
+    finally:
+        if hasattr(buf, 'close'):
+            buf.close()
+
+
+def iter_merged_messages(file_paths, transactions=False, timer=None, dedup=None):
+    """Yield the SIP messages of several captures as one sequence in timestamp order
+
+    The SIP frames of the captures are read side by side and combined by a
+    heap-based k-way merge (heapq.merge) on frame timestamp, so only the
+    next frame of each capture is held, whatever their size; nothing is
+    merged on disk first. As with mergecap, each capture is taken to be in
+    time order already. Equal timestamps keep capture order, then frame
+    order. Frames are parsed by _native_message only once merged, so
+    dedup (one Deduplicator for all captures, dropping copies recorded by
+    different probes) sees them in that order and keeps the first copy.
+    message.source is set to the capture's file name, and message.frame
+    is the frame number within that capture, so each message leads back
+    to its packet. transactions and timer are used as by
+    iter_native_messages.
+    """
+    sources = [_sip_payloads(file_path, index) for index, file_path in enumerate(file_paths)]
+    names = [os.path.basename(file_path) for file_path in file_paths]
+    parse = timer.timed('parse', _native_message) if timer is not None else _native_message
+    try:
+        for timestamp, index, number, payload in heapq.merge(*sources):
+            message = parse(number, timestamp, payload, transactions, dedup)
+            if message is not None:
+                message.source = names[index]
+                yield message
+    finally:
+        for payloads in sources:
+            payloads.close()
+
+
+def prefilter_capture(file_path, reduced_file, dedup=None):
+    """Copy only the REGISTER/INVITE frames of a capture to reduced_file
+
+    Frames are classified from their raw UDP/TCP payload before any
+    dissection. Every frame that starts with a SIP start line is counted,
+    so the returned number still covers all SIP packets of the original
+    capture. As with the native backend, a TCP message is matched by the
+    segment that carries its start line. With a Deduplicator, SIP frames
+    repeating a payload within its window are neither copied nor counted.
+    """
+    buf = map_file(file_path)
+    sip_packets = 0
+
+    def keep(record):
+        nonlocal sip_packets
+        _, _, linktype, offset, caplen = record
+        payload_range = transport_payload(buf, offset, caplen, linktype)
+        if payload_range is None:
+            return False
+        payload_start, payload_end, _ = payload_range
+        is_sip, method = request_method(buf[payload_start:min(payload_end, payload_start + MAX_START_LINE)])
+        if is_sip and dedup is not None and dedup.is_duplicate(record[1], buf[payload_start:payload_end]):
+            return False
+        if is_sip:
+            sip_packets += 1
+        return method in REPORTED_METHODS
+
+    try:
+        with open(reduced_file, 'wb', buffering=1024 * 1024) as out:
+            filter_capture(buf, out, keep)
+    finally:
+        if hasattr(buf, 'close'):
+            buf.close()
+    return sip_packets
+
+
+def format_header_params(lines, label, header):
+    """Append the ;-separated parameters of a To/From header to lines"""
+    params = header_params(header)
+    if params:
+        lines.append(f"{label} Header Parameters:\n")
+        for key, value in params:
+            if value is not None:
+                lines.append(f"  {key}: {value}\n")
+            else:
+                lines.append(f"  {key}\n")
+
+
+def format_message(message_type, message):
+    """Return the detail block for one REGISTER/INVITE message"""
+    # Same text as strftime('%Y-%m-%d %H:%M:%S.%f'), at a fraction of the cost
+    timestamp = datetime.fromtimestamp(message.time).isoformat(' ', 'microseconds')
+    lines = [f"\nMessage Type: {message_type}\n", f"Timestamp: {timestamp}\n"]
+    if message.source is not None:
+        lines.append(f"Source File: {message.source}\n")
+
+    # Extract To header
+    if message.to is not None:
+        lines.append(f"To: {message.to}\n")
+        format_header_params(lines, "To", message.to)
+
+    # Extract From header
+    if message.from_ is not None:
+        lines.append(f"From: {message.from_}\n")
+        format_header_params(lines, "From", message.from_)
+
+    # Extract Route header
+    if message.route is not None:
+        lines.append(f"Route: {message.route}\n")
+
+    # Extract P-Access-Network-Info
+    if message.pani is not None:
+        lines.append(f"P-Access-Network-Info: {message.pani}\n")
+
+    # Extract Cellular-Network-Info
+    if message.cni is not None:
+        lines.append(f"Cellular-Network-Info: {message.cni}\n")
+
+    lines.append("-" * 50 + "\n")
+    return ''.join(lines)
+
+
+def append_file(dst, src_path):
+    """Append the file at src_path to the open file dst without reading it into memory
+
+    Uses os.sendfile where the platform supports it, so the copy stays in
+    the kernel, and falls back to a chunked copy otherwise.
+    """
+    dst.flush()
+    with open(src_path, 'rb') as src:
+        copied = False
+        if hasattr(os, 'sendfile'):
+            try:
+                offset = 0
+                size = os.fstat(src.fileno()).st_size
+                while offset < size:
+                    sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                copied = offset == size
+            except OSError:
+                copied = False
+            if not copied:
+                # Continue with the chunked copy from wherever sendfile stopped
+                src.seek(offset)
+        dst.seek(0, os.SEEK_END)
+        if not copied:
+            shutil.copyfileobj(src, dst.buffer if hasattr(dst, 'buffer') else dst, REPORT_BUFFER_SIZE)
+            dst.flush()
+
+
+def write_report(output_file, input_name, counters, detail_file, stats=None, transaction_stats=None,
+                 access_categories=None, duplicates=None):
+    """Write the summary header followed by the detail section streamed from detail_file
+
+    stats (histograms from a StatsCollector) adds the access network
+    statistics to the summary, transaction_stats (from a
+    TransactionCorrelator) the transaction counts and latencies,
+    access_categories (from an AccessClassifier) the category counts and
+    duplicates the number of duplicate SIP frames dropped.
+    """
+    with open(output_file, 'w', buffering=REPORT_BUFFER_SIZE) as final_file:
+        # Write summary
+        final_file.write(
+            "SIP Analysis Summary\n"
+            + "=" * 50 + "\n"
+            + f"Analysis Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+            + f"Input File: {input_name}\n"
+            + f"Total SIP Packets: {counters['total_packets']}\n"
+            + (f"Duplicate SIP Frames Dropped: {duplicates}\n" if duplicates is not None else "")
+            + f"REGISTER Messages: {counters['register_count']}\n"
+            + f"INVITE Messages: {counters['invite_count']}\n"
+            + "\nHeader Availability:\n"
+            + f"P-Access-Network-Info in REGISTER: {counters['pani_register_count']}\n"
+            + f"P-Access-Network-Info in INVITE: {counters['pani_invite_count']}\n"
+            + f"Cellular-Network-Info in REGISTER: {counters['cni_register_count']}\n"
+            + f"Cellular-Network-Info in INVITE: {counters['cni_invite_count']}\n"
+            + (format_stats(stats) if stats is not None else "")
+            + (format_access_categories(access_categories) if access_categories is not None else "")
+            + (format_transaction_stats(transaction_stats) if transaction_stats is not None else "")
+            + "=" * 50 + "\n\n"
+        )
+
+        # Splice in the detail section
+        append_file(final_file, detail_file)
+
+
+def process_messages(messages, file, pbar=None, progress_key='frame', cancel=None, columnar_writer=None,
+                     checkpoint=None, counters=None, stats=None, correlator=None, store_writer=None,
+                     packet_counter=None, classifier=None, dedup=None):
+    """Count SIP messages and write the REGISTER/INVITE detail blocks
+
+    Returns the counters as a dict keyed by SUMMARY_FIELDS, continuing from
+    counters when resuming. REGISTER/INVITE rows also go to columnar_writer,
+    stats (a StatsCollector), classifier (an AccessClassifier) and
+    store_writer when given; every message goes to correlator (a
+    TransactionCorrelator) when given. With a Checkpoint (or a
+    SummaryTicker), the last frame, progress position, detail file size,
+    counters, statistics and the duplicates dropped so far by dedup (the
+    Deduplicator of the message iterator) are saved whenever it is due.
+    SIP packets are added to packet_counter (a multiprocessing.Value) as
+    they are counted. Raises AnalysisCancelled when cancel gets set.
+    """
+    # Initialize counters
+    if counters is None:
+        counters = dict.fromkeys(SUMMARY_FIELDS, 0)
+    total_packets = counters['total_packets']
+    register_count = counters['register_count']
+    invite_count = counters['invite_count']
+    pani_register_count = counters['pani_register_count']  # P-Access-Network-Info in REGISTER
+    pani_invite_count = counters['pani_invite_count']      # P-Access-Network-Info in INVITE
+    cni_register_count = counters['cni_register_count']    # Cellular-Network-Info in REGISTER
+    cni_invite_count = counters['cni_invite_count']        # Cellular-Network-Info in INVITE
+
+    def current_counters():
+        return {
+            'total_packets': total_packets,
+            'register_count': register_count,
+            'invite_count': invite_count,
+            'pani_register_count': pani_register_count,
+            'pani_invite_count': pani_invite_count,
+            'cni_register_count': cni_register_count,
+            'cni_invite_count': cni_invite_count,
+        }
+
+    last_position = pbar.n if pbar is not None else 0
+    reported_packets = total_packets
+    for message in messages:
+        total_packets += 1
+        if total_packets % CANCEL_CHECK_INTERVAL == 0:
+            if cancel is not None and cancel.is_set():
+                raise AnalysisCancelled()
+            if packet_counter is not None:
+                add_packets(packet_counter, total_packets - reported_packets)
+                reported_packets = total_packets
+        try:
+            if correlator is not None:
+                correlator.add(message)
+            message_type = message.method
+            if message_type == "REGISTER":
+                register_count += 1
+            elif message_type == "INVITE":
+                invite_count += 1
+            else:
+                continue
+
+            # Track header availability based on message type
+            if message.pani is not None:
+                if message_type == "REGISTER":
+                    pani_register_count += 1
+                else:
+                    pani_invite_count += 1
+
+            if message.cni is not None:
+                if message_type == "REGISTER":
+                    cni_register_count += 1
+                else:
+                    cni_invite_count += 1
+
+            file.write(format_message(message_type, message))
+            if columnar_writer is not None:
+                columnar_writer.add(message_type, message)
+            if stats is not None:
+                stats.add(message)
+            if classifier is not None:
+                classifier.add(message)
+            if store_writer is not None:
+                store_writer.add(message_type, message)
+
+        except Exception as e:
+            print(f"\nError processing packet: {str(e)}")
+            continue
+        finally:
+            if pbar is not None:
+                # Advance by frame number (or byte offset) so frames that
+                # are not SIP are accounted for too
+                position = getattr(message, progress_key)
+                pbar.update(position - last_position)
+                last_position = position
+            # A message interrupted half way (Ctrl+C) must not be recorded as done
+            if checkpoint is not None and checkpoint.due() and sys.exc_info()[0] is None:
+                # Everything up to this frame is in the detail file once it is flushed
+                file.flush()
+                checkpoint.save({
+                    'frame': message.frame,
+                    'progress': getattr(message, progress_key),
+                    'position': file.tell(),
+                    'counters': current_counters(),
+                    'stats': stats.result() if stats is not None else None,
+                    'access_categories': classifier.result() if classifier is not None else None,
+                    'duplicates': dedup.dropped if dedup is not None else None,
+                })
+
+    if packet_counter is not None:
+        add_packets(packet_counter, total_packets - reported_packets)
+    return current_counters()
+
+
+def analyze_chunk(file_path, start, end, part_file, base_frame=0, columnar=None, stats=False, store=None,
+                  metrics=False, access_rules=None, dedup=None):
+    """Analyze one byte range of a capture with the native backend
+
+    The detail blocks go to part_file (and columnar rows to its columnar
+    sibling); the counters are returned, with the chunk's histograms under
+    'stats' when stats is set, its category counts under
+    'access_categories' with access_rules, the duplicates it dropped under
+    'duplicates_dropped' with a dedup window and its stage times under
+    'stages' when metrics is set. store is a (database path, capture id)
+    pair whose message store gets the chunk's messages directly, numbered
+    on from base_frame. Copies
+    of a message on both sides of a chunk boundary are both kept.
+    """
+    timer = StageTimer() if metrics else None
+    deduplicator = Deduplicator(dedup) if dedup else None
+    messages = iter_native_messages(file_path, start, end, timer=timer, dedup=deduplicator, base_frame=base_frame)
+    columnar_writer = None
+    store_writer = None
+    try:
+        if store:
+            store_writer = StoreWriter(*store)
+        if columnar:
+            columnar_writer = ColumnarWriter(part_file + COLUMNAR_FORMATS[columnar], columnar,
+                                             os.path.basename(file_path))
+        stats_collector = StatsCollector() if stats else None
+        classifier = AccessClassifier(access_rules) if access_rules else None
+        with open(part_file, 'w', buffering=REPORT_BUFFER_SIZE) as file, timed_stage(timer, 'process'):
+            counters = process_messages(timer.messages(messages) if timer is not None else messages, file,
+                                        cancel=_worker_cancel, columnar_writer=columnar_writer,
+                                        stats=stats_collector, store_writer=store_writer,
+                                        packet_counter=_worker_packets, classifier=classifier)
+        if stats_collector is not None:
+            counters['stats'] = stats_collector.result()
+        if classifier is not None:
+            counters['access_categories'] = classifier.result()
+        if deduplicator is not None:
+            counters['duplicates_dropped'] = deduplicator.dropped
+        if timer is not None:
+            counters['stages'] = timer.stage_times()
+        return counters
+    finally:
+        messages.close()
+        if columnar_writer is not None:
+            columnar_writer.close()
+        if store_writer is not None:
+            store_writer.close()
+
+
+def analyze_chunks(file_path, file, ranges, progress=True, cancel=None, columnar_writer=None, checkpoint=None,
+                   stats=False, store=None, metrics=False, packet_counter=None, access_rules=None, dedup=None):
+    """Analyze byte ranges of one capture in parallel and merge them into file
+
+    Chunks are contiguous and in file order, so appending their detail
+    sections (and columnar batches) in chunk order gives exactly the
+    sequential output. With a Checkpoint, finished chunks are recorded and
+    their part files kept if the run fails, so a re-run only analyzes the
+    remaining chunks. With metrics, the stage times of the chunks are
+    summed under 'stages'. With a store, the frames of each chunk are
+    counted first, so stored frame numbers are those of the whole capture.
+    Raises MultiSectionCapture, leaving no part files, if a chunk of a
+    pcapng capture reaches a further section.
+    """
+    from tqdm import tqdm
+    part_files = [f"{file.name}.{index}" for index in range(len(ranges))]
+    columnar = columnar_writer.fmt if columnar_writer is not None else None
+    results = [None] * len(ranges)
+    state = checkpoint.load() if checkpoint is not None else None
+    if state:
+        for index, result in state['chunks'].items():
+            if all(os.path.exists(path) for path in _part_outputs(part_files[int(index)], columnar)):
+                results[int(index)] = result
+    remaining = [index for index in range(len(ranges)) if results[index] is None]
+    if len(remaining) < len(ranges):
+        print(f"Resuming: {len(ranges) - len(remaining)} of {len(ranges)} chunk(s) already analyzed")
+
+    keep_parts = False
+    try:
+        base_frames = _chunk_base_frames(file_path, ranges, cancel) if store else [0] * len(ranges)
+        tasks = [(file_path, *ranges[index], part_files[index], base_frames[index]) for index in remaining]
+        with tqdm(total=len(ranges), initial=len(ranges) - len(remaining), desc="Analyzing chunks", unit="chunk",
+                  disable=not progress) as pbar:
+            for task_index, result in run_in_pool(analyze_chunk, tasks, max(len(tasks), 1), cancel, packet_counter,
+                                                  columnar=columnar, stats=stats, store=store, metrics=metrics,
+                                                  access_rules=access_rules, dedup=dedup):
+                results[remaining[task_index]] = result
+                if checkpoint is not None:
+                    checkpoint.save({'chunks': {str(index): result for index, result in enumerate(results)
+                                                if result is not None}})
+                pbar.update(1)
+
+        for part_file in part_files:
+            append_file(file, part_file)
+            if columnar_writer is not None:
+                columnar_writer.append_file(part_file + COLUMNAR_FORMATS[columnar])
+    except (AnalysisCancelled, MultiSectionCapture):
+        raise
+    except BaseException:
+        keep_parts = checkpoint is not None
+        raise
+    finally:
+        if not keep_parts:
+            for part_file in part_files:
+                for path in _part_outputs(part_file, columnar):
+                    if os.path.exists(path):
+                        os.remove(path)
+    totals = merge_summaries(results)
+    if metrics:
+        totals['stages'] = merge_stages(result.get('stages') for result in results)
+    return totals
+
+
+def count_chunk_frames(file_path, start, end):
+    """Number of frames whose records begin in one byte range of a capture"""
+    buf = map_file(file_path)
+    try:
+        return sum(1 for _ in iter_records(buf, start, end))
+    finally:
+        if hasattr(buf, 'close'):
+            buf.close()
+
+
+def _chunk_base_frames(file_path, ranges, cancel=None):
+    """Frames before each chunk, counted in parallel by walking record headers only
+
+    Every chunk is walked, so a multi-section capture raises
+    MultiSectionCapture before any message reaches the store.
+    """
+    counts = [0] * len(ranges)
+    tasks = [(file_path, *chunk_range) for chunk_range in ranges]
+    for index, count in run_in_pool(count_chunk_frames, tasks, len(tasks), cancel):
+        counts[index] = count
+    return [sum(counts[:index]) for index in range(len(ranges))]
+
+
+def _part_outputs(part_file, columnar):
+    """Files written by analyze_chunk for one chunk"""
+    if columnar:
+        return (part_file, part_file + COLUMNAR_FORMATS[columnar])
+    return (part_file,)
+
+
+def _tshark_crash_error():
+    """pyshark's TSharkCrashException, or no exception type if pyshark was never loaded"""
+    pyshark = sys.modules.get('pyshark')
+    return pyshark.capture.capture.TSharkCrashException if pyshark is not None else ()
+
+
+def extract_sip_info(file_path, output_file, backend='pyshark', progress=True, chunks=1, cancel=None,
+                     prefilter=False, columnar=None, stats=False, transactions=None, store=None, metrics=False,
+                     packet_counter=None, tshark_memory=None, access_rules=None, dedup=None):
+    """Analyze one capture, write its report and return its counters
+
+    With the native backend and chunks > 1 the capture is split on record
+    boundaries and the chunks are analyzed in separate processes. With a
+    tshark backend and prefilter set, only REGISTER/INVITE frames are handed
+    to tshark. columnar ('parquet' or 'arrow') also writes one typed row per
+    REGISTER/INVITE next to the text report. stats adds access type,
+    cell ID and per-minute histograms to the report and to the returned
+    summary (under 'stats'). access_rules (from sip_access.load_rules)
+    counts the PANI/CNI values per access network category (summary key
+    'access_categories'). dedup (a window in seconds) drops copies of a
+    SIP message captured again within that time, e.g. from several taps,
+    before its headers are parsed, and reports how many were dropped
+    (summary key 'duplicates_dropped'); the pyshark backend only gets this
+    with the prefilter. transactions (the size of the transaction
+    table) pairs REGISTER/INVITE with their responses by Call-ID/CSeq,
+    writes one CSV row per transaction and adds counts and latency
+    percentiles (summary key 'transactions'); this needs one sequential
+    pass over all frames, so chunking and the prefilter are skipped.
+    store (a database path) also inserts every REGISTER/INVITE into that
+    message store, replacing rows from earlier analyses of the capture.
+    metrics times the analysis stages and adds them with throughput and
+    peak memory to the summary (key 'metrics'). SIP packets are added to
+    packet_counter (or the pool's counter) as they are analyzed.
+    tshark_memory (MB) keeps a tshark backend's process under that much
+    resident memory by restarting it after the last frame it delivered
+    (see iter_supervised_messages); it needs an uncompressed capture.
+    Raises AnalysisCancelled if cancel (or the pool's cancel flag) gets set.
+
+    Progress is checkpointed to output_file + '.checkpoint' while running.
+    If a run dies, the next run on the same capture and settings resumes
+    after the last checkpointed frame (or finished chunk) instead of
+    starting over. A single-pass run with columnar output or transactions
+    is not checkpointed, since a half-written columnar file cannot be
+    reopened and open transactions are not saved; neither is a run that
+    fills a message store, which would otherwise get rows twice.
+    """
+    if cancel is None:
+        cancel = _worker_cancel
+    if packet_counter is None:
+        packet_counter = _worker_packets
+    timer = StageTimer() if metrics else None
+    messages = None
+    temp_file = output_file + '.temp'
+    reduced_file = None
+    sip_packets = None
+    columnar_writer = None
+    checkpoint = None
+    correlator = None
+    store_writer = None
+    capture_id = None
+    try:
+        if store:
+            message_store = MessageStore(store)
+            try:
+                capture_id = message_store.begin_capture(file_path, os.path.basename(file_path))
+            finally:
+                message_store.close()
+        if transactions:
+            correlator = TransactionCorrelator(transactions_path(output_file), max_transactions=transactions)
+            if backend == 'native' and chunks > 1:
+                print("Chunking skipped: transaction correlation needs one sequential pass")
+                chunks = 1
+        if columnar:
+            columnar_writer = ColumnarWriter(columnar_path(output_file, columnar), columnar,
+                                             os.path.basename(file_path))
+
+        compressed = is_compressed(file_path)
+        ranges = None
+        if backend == 'native' and chunks > 1 and not compressed:
+            buf = map_file(file_path)
+            try:
+                ranges = split_capture(buf, chunks)
+            finally:
+                if hasattr(buf, 'close'):
+                    buf.close()
+
+        chunked = ranges is not None and len(ranges) > 1
+        state = None
+        if (chunked or not (columnar or transactions)) and not store:
+            settings = {'version': REPORT_VERSION, 'backend': backend, 'prefilter': prefilter,
+                        'chunks': len(ranges) if chunked else 1, 'columnar': columnar, 'stats': stats,
+                        'access_rules': [list(rule) for rule in access_rules] if access_rules else None,
+                        'dedup': dedup}
+            checkpoint = Checkpoint(output_file + '.checkpoint', file_path, settings)
+            if not chunked:
+                state = checkpoint.load()
+                # The detail file must still hold everything the checkpoint counted
+                if state and (not os.path.exists(temp_file) or os.path.getsize(temp_file) < state['position']):
+                    state = None
+
+        print(f"\nProcessing SIP messages in '{file_path}'...")
+
+        # Process packets and write to temporary file
+        if state:
+            print(f"Resuming after frame {state['frame']} ({state['counters']['total_packets']} SIP packets done)")
+            os.truncate(temp_file, state['position'])
+        with open(temp_file, 'a' if state else 'w', buffering=REPORT_BUFFER_SIZE) as file:
+            if not state:
+                file.write("Detailed SIP Message Information:\n")
+                file.write("=" * 50 + "\n")
+            resume_frame = state['frame'] if state else 0
+
+            if chunked:
+                try:
+                    counters = analyze_chunks(file_path, file, ranges, progress=progress, cancel=cancel,
+                                              columnar_writer=columnar_writer, checkpoint=checkpoint, stats=stats,
+                                              store=(store, capture_id) if store else None, metrics=metrics,
+                                              packet_counter=packet_counter, access_rules=access_rules,
+                                              dedup=dedup)
+                except MultiSectionCapture:
+                    # Only the chunk walks see the later section headers; one pass reads them all
+                    print("Chunking skipped: the capture has several pcapng sections")
+                    chunked = False
+                    if checkpoint is not None:
+                        checkpoint.remove()
+                        checkpoint = None if columnar else Checkpoint(output_file + '.checkpoint', file_path,
+                                                                      {**settings, 'chunks': 1})
+                else:
+                    file_stats = counters.pop('stats', None)
+                    access_categories = counters.pop('access_categories', None)
+                    duplicates = counters.pop('duplicates_dropped', None)
+                    if timer is not None:
+                        timer.add_stages(counters.pop('stages'))
+            if not chunked:
+                stats_collector = StatsCollector(state.get('stats') if state else None) if stats else None
+                classifier = AccessClassifier(access_rules, state.get('access_categories') if state else None) \
+                    if access_rules else None
+                if store:
+                    store_writer = StoreWriter(store, capture_id)
+                deduplicator = None
+                if dedup:
+                    deduplicator = Deduplicator(dedup, dropped=state.get('duplicates') or 0 if state else 0)
+                from tqdm import tqdm
+                if backend == 'native':
+                    if compressed:
+                        # Frame count is unknown until the stream has been read
+                        progress_total = None
+                        progress_key, progress_unit = 'frame', 'frame'
+                    else:
+                        # Progress follows the byte offset in the mapped file
+                        progress_total = os.path.getsize(file_path)
+                        progress_key, progress_unit = 'offset', 'B'
+                    messages = iter_native_messages(file_path, after=resume_frame, transactions=bool(transactions),
+                                                    timer=timer, dedup=deduplicator)
+                else:
+                    capture_path = file_path
+                    if prefilter and transactions:
+                        print("Prefilter skipped: transaction correlation needs the responses")
+                    elif prefilter and compressed:
+                        print("Prefilter skipped: it needs an uncompressed capture")
+                    elif prefilter:
+                        # Dissect a reduced copy holding only REGISTER/INVITE frames
+                        reduced_file = output_file + '.prefilter' + os.path.splitext(file_path)[1]
+                        if deduplicator is not None:
+                            # The reduced copy is rebuilt in full, so its count starts over
+                            deduplicator = Deduplicator(dedup)
+                        with timed_stage(timer, 'prefilter'):
+                            sip_packets = prefilter_capture(file_path, reduced_file, deduplicator)
+                        capture_path = reduced_file
+
+                    # Cheap frame-header walk for the progress bar; SIP packets are
+                    # counted during the real pass below
+                    progress_total = None if compressed else count_frames(capture_path)
+                    progress_key, progress_unit = 'frame', 'frame'
+                    if tshark_memory and compressed:
+                        print("tshark memory limit skipped: restarting tshark needs an uncompressed capture")
+                    if deduplicator is not None and reduced_file is None and backend == 'pyshark':
+                        print("Duplicate suppression skipped: the pyshark engine needs the prefilter for it")
+                        deduplicator = None
+                    # Copies were already left out of the reduced capture
+                    fields_dedup = deduplicator if reduced_file is None else None
+                    if tshark_memory and not compressed:
+                        messages = iter_supervised_messages(capture_path, backend, resume_frame, bool(transactions),
+                                                            timer, tshark_memory, fields_dedup)
+                    elif backend == 'tshark-fields':
+                        messages = iter_tshark_fields_messages(capture_path, resume_frame, bool(transactions), timer,
+                                                               dedup=fields_dedup)
+                    else:
+                        messages = iter_pyshark_messages(capture_path, resume_frame, bool(transactions), timer)
+
+                # Create progress bar
+                with tqdm(total=progress_total, initial=state['progress'] if state else 0, desc="Analyzing packets",
+                          unit=progress_unit, disable=not progress) as pbar, timed_stage(timer, 'process'):
+                    counters = process_messages(timer.messages(messages) if timer is not None else messages, file,
+                                                pbar=pbar, progress_key=progress_key, cancel=cancel,
+                                                columnar_writer=columnar_writer, checkpoint=checkpoint,
+                                                counters=state['counters'] if state else None,
+                                                stats=stats_collector, correlator=correlator,
+                                                store_writer=store_writer, packet_counter=packet_counter,
+                                                classifier=classifier, dedup=deduplicator)
+                    if progress_total is not None:
+                        pbar.update(max(progress_total - pbar.n, 0))
+
+                if sip_packets is not None:
+                    # tshark only saw REGISTER/INVITE; the prefilter counted every SIP frame
+                    counters['total_packets'] = sip_packets
+                file_stats = stats_collector.result() if stats_collector is not None else None
+                access_categories = classifier.result() if classifier is not None else None
+                duplicates = deduplicator.dropped if deduplicator is not None else None
+
+        if columnar_writer is not None:
+            columnar_writer.close()
+            columnar_writer = None
+        if store_writer is not None:
+            store_writer.close()
+            store_writer = None
+        transaction_stats = None
+        if correlator is not None:
+            transaction_stats = correlator.result()
+            correlator.close()
+
+        # Write final file with summary at top
+        with timed_stage(timer, 'report'):
+            write_report(output_file, os.path.basename(file_path), counters, temp_file, file_stats,
+                         transaction_stats, access_categories, duplicates)
+
+        # Remove temporary file
+        os.remove(temp_file)
+        if checkpoint is not None:
+            checkpoint.remove()
+
+        print(f"\nSummary:")
+        print(f"Total packets processed: {counters['total_packets']}")
+        if duplicates is not None:
+            print(f"Duplicate SIP frames dropped: {duplicates}")
+        print(f"REGISTER messages found: {counters['register_count']}")
+        print(f"INVITE messages found: {counters['invite_count']}")
+        print(f"\nHeader Availability:")
+        print(f"P-Access-Network-Info in REGISTER: {counters['pani_register_count']}")
+        print(f"P-Access-Network-Info in INVITE: {counters['pani_invite_count']}")
+        print(f"Cellular-Network-Info in REGISTER: {counters['cni_register_count']}")
+        print(f"Cellular-Network-Info in INVITE: {counters['cni_invite_count']}")
+
+        summary = {'file': os.path.basename(file_path), **counters}
+        if duplicates is not None:
+            summary['duplicates_dropped'] = duplicates
+        if file_stats is not None:
+            summary['stats'] = file_stats
+        if access_categories is not None:
+            summary['access_categories'] = access_categories
+        if transaction_stats is not None:
+            summary['transactions'] = transaction_stats
+        if timer is not None:
+            summary['metrics'] = timer.result(counters['total_packets'], os.path.getsize(file_path))
+        return summary
+
+    except AnalysisCancelled:
+        if columnar_writer is not None:
+            columnar_writer.close()
+            columnar_writer = None
+            os.remove(columnar_path(output_file, columnar))
+        if correlator is not None:
+            correlator.close()
+            os.remove(transactions_path(output_file))
+        if store_writer is not None:
+            store_writer.close()
+            store_writer = None
+        if capture_id is not None:
+            message_store = MessageStore(store)
+            try:
+                message_store.remove_capture(capture_id)
+            finally:
+                message_store.close()
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        if checkpoint is not None:
+            checkpoint.remove()
+        raise
+    except _tshark_crash_error() as e:
+        print(f"TShark crashed: {str(e)}")
+        print("Please ensure you have the latest version of TShark installed")
+        sys.exit(1)
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        sys.exit(1)
+    finally:
+        if messages is not None:
+            messages.close()
+        if columnar_writer is not None:
+            columnar_writer.close()
+        if correlator is not None:
+            correlator.close()
+        if store_writer is not None:
+            store_writer.close()
+        if reduced_file and os.path.exists(reduced_file):
+            os.remove(reduced_file)
+
+
+class SummaryTicker:
+    """Checkpoint stand-in that hands the running counters to a callback every interval seconds"""
+
+    def __init__(self, callback, interval=STREAM_SUMMARY_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self.last_save = time.monotonic()
+
+    def due(self):
+        return time.monotonic() - self.last_save >= self.interval
+
+    def save(self, state):
+        self.last_save = time.monotonic()
+        self.callback(state['counters'])
+
+
+def stream_sip_info(stream, output_file, input_name='stdin', summary_callback=None, stop=None, columnar=None,
+                    stats=False, transactions=None, store=None, access_rules=None, dedup=None):
+    """Analyze a pcap/pcapng byte stream as it arrives and write its report at the end
+
+    Detail blocks are written line-buffered to output_file + '.temp', so
+    they can be followed while the stream runs; summary_callback(counters)
+    gets the running counters every STREAM_SUMMARY_INTERVAL seconds. When
+    the stream ends (or stop gets set) the report is written as for a
+    file and the counters (plus 'stats', 'access_categories',
+    'duplicates_dropped' and 'transactions' when set) are
+    returned. Memory use does not grow with the
+    length of the stream.
+    """
+    temp_file = output_file + '.temp'
+    columnar_writer = None
+    correlator = None
+    store_writer = None
+    try:
+        if columnar:
+            columnar_writer = ColumnarWriter(columnar_path(output_file, columnar), columnar, input_name)
+        if store:
+            message_store = MessageStore(store)
+            try:
+                store_writer = StoreWriter(store, message_store.begin_capture(input_name, input_name))
+            finally:
+                message_store.close()
+        if transactions:
+            correlator = TransactionCorrelator(transactions_path(output_file), max_transactions=transactions)
+        ticker = SummaryTicker(summary_callback) if summary_callback else None
+        stats_collector = StatsCollector() if stats else None
+        classifier = AccessClassifier(access_rules) if access_rules else None
+        deduplicator = Deduplicator(dedup) if dedup else None
+        with open(temp_file, 'w', buffering=1) as file:
+            file.write("Detailed SIP Message Information:\n")
+            file.write("=" * 50 + "\n")
+            counters = process_messages(iter_stream_messages(stream, stop, transactions=bool(transactions),
+                                                             dedup=deduplicator), file,
+                                        columnar_writer=columnar_writer, checkpoint=ticker, stats=stats_collector,
+                                        correlator=correlator, store_writer=store_writer, classifier=classifier,
+                                        dedup=deduplicator)
+        if columnar_writer is not None:
+            columnar_writer.close()
+            columnar_writer = None
+        if store_writer is not None:
+            store_writer.close()
+            store_writer = None
+        file_stats = stats_collector.result() if stats_collector is not None else None
+        transaction_stats = correlator.result() if correlator is not None else None
+        access_categories = classifier.result() if classifier is not None else None
+        duplicates = deduplicator.dropped if deduplicator is not None else None
+        write_report(output_file, input_name, counters, temp_file, file_stats, transaction_stats, access_categories,
+                     duplicates)
+        os.remove(temp_file)
+        summary = {'file': input_name, **counters}
+        if duplicates is not None:
+            summary['duplicates_dropped'] = duplicates
+        if file_stats is not None:
+            summary['stats'] = file_stats
+        if access_categories is not None:
+            summary['access_categories'] = access_categories
+        if transaction_stats is not None:
+            summary['transactions'] = transaction_stats
+        return summary
+    finally:
+        if columnar_writer is not None:
+            columnar_writer.close()
+        if correlator is not None:
+            correlator.close()
+        if store_writer is not None:
+            store_writer.close()
+
+
+def merge_sip_info(file_paths, output_file, progress=True, cancel=None, columnar=None, stats=False,
+                   transactions=None, store=None, metrics=False, packet_counter=None, access_rules=None, dedup=None):
+    """Analyze several captures as one chronological timeline and write a single report
+
+    The SIP messages of all captures go through iter_merged_messages, so
+    the detail section (each block naming its source file), transactions
+    and statistics follow capture time across the whole set, e.g. when a
+    subscriber's signalling spans rotated files or several probes. The
+    options are those of extract_sip_info, with the native backend.
+    Columnar rows and store rows name the capture each message came from
+    (the store registers every capture, replacing earlier rows for it)
+    and its frame number there. The summary ('file' is the report name,
+    'captures' the number merged) is returned. A merged run is not
+    checkpointed; a cancelled one leaves no output behind.
+    """
+    if cancel is None:
+        cancel = _worker_cancel
+    if packet_counter is None:
+        packet_counter = _worker_packets
+    name = os.path.basename(output_file)
+    timer = StageTimer() if metrics else None
+    temp_file = output_file + '.temp'
+    columnar_writer = None
+    correlator = None
+    store_writer = None
+    capture_ids = None
+    messages = None
+    try:
+        if columnar:
+            columnar_writer = ColumnarWriter(columnar_path(output_file, columnar), columnar, name)
+        if store:
+            message_store = MessageStore(store)
+            try:
+                capture_ids = {os.path.basename(file_path): message_store.begin_capture(
+                    file_path, os.path.basename(file_path)) for file_path in file_paths}
+            finally:
+                message_store.close()
+            store_writer = StoreWriter(store, None, capture_ids=capture_ids)
+        if transactions:
+            correlator = TransactionCorrelator(transactions_path(output_file), max_transactions=transactions)
+        stats_collector = StatsCollector() if stats else None
+        classifier = AccessClassifier(access_rules) if access_rules else None
+        deduplicator = Deduplicator(dedup) if dedup else None
+
+        print(f"\nProcessing SIP messages of {len(file_paths)} captures in timestamp order...")
+        from tqdm import tqdm
+        messages = iter_merged_messages(file_paths, bool(transactions), timer, deduplicator)
+        with open(temp_file, 'w', buffering=REPORT_BUFFER_SIZE) as file:
+            file.write("Detailed SIP Message Information:\n")
+            file.write("=" * 50 + "\n")
+            # The merged message count is only known at the end, and frame
+            # numbers restart with each capture, so the bar counts messages
+            with tqdm(timer.messages(messages) if timer is not None else messages, desc="Analyzing packets",
+                      unit="msg", disable=not progress) as merged, timed_stage(timer, 'process'):
+                counters = process_messages(merged, file, cancel=cancel, columnar_writer=columnar_writer,
+                                            stats=stats_collector, correlator=correlator,
+                                            store_writer=store_writer, packet_counter=packet_counter,
+                                            classifier=classifier)
+        if columnar_writer is not None:
+            columnar_writer.close()
+            columnar_writer = None
+        if store_writer is not None:
+            store_writer.close()
+            store_writer = None
+        file_stats = stats_collector.result() if stats_collector is not None else None
+        access_categories = classifier.result() if classifier is not None else None
+        duplicates = deduplicator.dropped if deduplicator is not None else None
+        transaction_stats = correlator.result() if correlator is not None else None
+        with timed_stage(timer, 'report'):
+            write_report(output_file, ', '.join(os.path.basename(file_path) for file_path in file_paths),
+                         counters, temp_file, file_stats, transaction_stats, access_categories, duplicates)
+        os.remove(temp_file)
+
+        print(f"\nSummary:")
+        print(f"Total packets processed: {counters['total_packets']}")
+        if duplicates is not None:
+            print(f"Duplicate SIP frames dropped: {duplicates}")
+        print(f"REGISTER messages found: {counters['register_count']}")
+        print(f"INVITE messages found: {counters['invite_count']}")
+
+        summary = {'file': name, 'captures': len(file_paths), **counters}
+        if duplicates is not None:
+            summary['duplicates_dropped'] = duplicates
+        if file_stats is not None:
+            summary['stats'] = file_stats
+        if access_categories is not None:
+            summary['access_categories'] = access_categories
+        if transaction_stats is not None:
+            summary['transactions'] = transaction_stats
+        if timer is not None:
+            summary['metrics'] = timer.result(counters['total_packets'],
+                                              sum(os.path.getsize(file_path) for file_path in file_paths))
+        return summary
+
+    except AnalysisCancelled:
+        if columnar_writer is not None:
+            columnar_writer.close()
+            columnar_writer = None
+            os.remove(columnar_path(output_file, columnar))
+        if correlator is not None:
+            correlator.close()
+            os.remove(transactions_path(output_file))
+        if store_writer is not None:
+            store_writer.close()
+            store_writer = None
+        if capture_ids is not None:
+            message_store = MessageStore(store)
+            try:
+                for capture_id in capture_ids.values():
+                    message_store.remove_capture(capture_id)
+            finally:
+                message_store.close()
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    finally:
+        if messages is not None:
+            messages.close()
+        if columnar_writer is not None:
+            columnar_writer.close()
+        if correlator is not None:
+            correlator.close()
+        if store_writer is not None:
+            store_writer.close()
+
+
+def _job_outputs(output_file, columnar, transactions=None):
+    """Output files of one job keyed by their role in the result cache"""
+    outputs = {'report': output_file}
+    if columnar:
+        outputs['columnar'] = columnar_path(output_file, columnar)
+    if transactions:
+        outputs['transactions'] = transactions_path(output_file)
+    return outputs
+
+
+def capture_stem(file_name):
+    """File name without its capture and compression extensions, or None if it is not a capture"""
+    lower = file_name.lower()
+    for compressed in ('',) + COMPRESSED_EXTENSIONS:
+        for extension in CAPTURE_EXTENSIONS:
+            if lower.endswith(extension + compressed) and len(file_name) > len(extension + compressed):
+                return file_name[:-len(extension + compressed)]
+    return None
+
+
+def is_capture(file_name):
+    return capture_stem(file_name) is not None
+
+
+def report_path(capture_file, output_dir):
+    """Report file in output_dir for a capture: trace.pcapng.zst -> trace.txt"""
+    base_name = os.path.basename(capture_file)
+    return os.path.join(output_dir, (capture_stem(base_name) or base_name) + '.txt')
+
+
+def report_paths(capture_files, output_dir):
+    """Report files in output_dir for captures that sit side by side, in the same order
+
+    When several captures share a stem (trace.pcap, trace.pcapng.gz) their
+    reports keep the full capture name (trace.pcap.txt, trace.pcapng.gz.txt)
+    so that none overwrites another.
+    """
+    reports = [report_path(capture_file, output_dir) for capture_file in capture_files]
+    shared = Counter(reports)
+    return [report if shared[report] == 1 else os.path.join(output_dir, os.path.basename(capture_file) + '.txt')
+            for capture_file, report in zip(capture_files, reports)]
+
+
+def find_jobs(input_dir, output_dir):
+    """(capture, report) path pairs for the captures in input_dir, named by report_paths"""
+    captures = sorted(os.path.join(input_dir, name) for name in os.listdir(input_dir) if is_capture(name))
+    return list(zip(captures, report_paths(captures, output_dir)))
+
+
+def analyze_files(jobs, backend='pyshark', workers=1, callback=None, chunks=1, cancel=None,
+                  prefilter=False, columnar=None, cache=None, progress=True, stats=False, transactions=None,
+                  store=None, metrics=False, packet_counter=None, tshark_memory=None, access_rules=None,
+                  dedup=None):
+    """Run extract_sip_info over (file_path, output_file) jobs
+
+    With more than one worker each file is analyzed in its own process.
+    callback(index, summary) runs in the calling process as each file
+    finishes; the summaries are returned in job order either way. Setting
+    cancel stops the run with AnalysisCancelled. With a ResultCache, files
+    whose cached result is still valid are served from the cache (their
+    summary has 'cached' set) and new results are stored. progress turns
+    the per-file progress bars of a single-worker run on or off. stats,
+    transactions, store, metrics, packet_counter (a multiprocessing.Value
+    counting analyzed SIP packets across all processes), tshark_memory,
+    access_rules and dedup are passed on to extract_sip_info. Cached results carry no metrics.
+    """
+    results = [None] * len(jobs)
+    pending = list(range(len(jobs)))
+    cache_keys = {}
+
+    def finished(index, summary):
+        results[index] = summary
+        if index in cache_keys:
+            # Timings belong to this run, not to later cache hits
+            cache.put(cache_keys[index], {key: value for key, value in summary.items() if key != 'metrics'},
+                      _job_outputs(jobs[index][1], columnar, transactions))
+        if callback:
+            callback(index, summary)
+
+    if cache is not None:
+        settings = {'version': REPORT_VERSION, 'backend': backend, 'prefilter': prefilter, 'columnar': columnar,
+                    'stats': stats, 'transactions': transactions,
+                    'store': os.path.abspath(store) if store else None,
+                    'access_rules': [list(rule) for rule in access_rules] if access_rules else None,
+                    'dedup': dedup}
+        if dedup:
+            # Copies on both sides of a chunk boundary are both kept, so the chunk count changes the result
+            settings['chunks'] = chunks
+        pending = []
+        for index, (file_path, output_file) in enumerate(jobs):
+            key = cache.key(file_path, settings)
+            summary = cache.get(key, _job_outputs(output_file, columnar, transactions))
+            if summary is None:
+                cache_keys[index] = key
+                pending.append(index)
+            else:
+                results[index] = dict(summary, cached=True)
+                if callback:
+                    callback(index, results[index])
+
+    if workers <= 1 or len(pending) <= 1:
+        for index in pending:
+            if cancel is not None and cancel.is_set():
+                raise AnalysisCancelled()
+            file_path, output_file = jobs[index]
+            finished(index, extract_sip_info(file_path, output_file, backend, progress, chunks=chunks, cancel=cancel,
+                                             prefilter=prefilter, columnar=columnar, stats=stats,
+                                             transactions=transactions, store=store, metrics=metrics,
+                                             packet_counter=packet_counter, tshark_memory=tshark_memory,
+                                             access_rules=access_rules, dedup=dedup))
+        return results
+
+    # Progress bars from several processes would interleave, so workers run quiet
+    tasks = [jobs[index] + (backend, False) for index in pending]
+    for task_index, result in run_in_pool(extract_sip_info, tasks, min(workers, len(tasks)), cancel, packet_counter,
+                                          chunks=chunks, prefilter=prefilter, columnar=columnar, stats=stats,
+                                          transactions=transactions, store=store, metrics=metrics,
+                                          tshark_memory=tshark_memory, access_rules=access_rules, dedup=dedup):
+        finished(pending[task_index], result)
+    return results
+
+
+def merge_summaries(summaries):
+    """Sum per-file counters (plus duplicates, statistics, categories and transactions) into a run total"""
+    totals = dict.fromkeys(SUMMARY_FIELDS, 0)
+    for summary in summaries:
+        for field in SUMMARY_FIELDS:
+            totals[field] += summary[field]
+        if summary.get('duplicates_dropped') is not None:
+            totals['duplicates_dropped'] = totals.get('duplicates_dropped', 0) + summary['duplicates_dropped']
+        if summary.get('stats') is not None:
+            merge_stats(totals.setdefault('stats', empty_stats()), summary['stats'])
+        if summary.get('access_categories') is not None:
+            merge_access_categories(totals.setdefault('access_categories', empty_access_categories()),
+                                    summary['access_categories'])
+        if summary.get('transactions') is not None:
+            merge_transaction_stats(totals.setdefault('transactions', empty_transaction_stats()),
+                                    summary['transactions'])
+    return totals
+
+
+def write_run_summary(output_dir, summaries):
+    """Write run_summary.txt with one line per file plus the run totals"""
+    totals = merge_summaries(summaries)
+    with open(os.path.join(output_dir, 'run_summary.txt'), 'w') as summary_file:
+        summary_file.write("SIP Analysis Run Summary\n")
+        summary_file.write("=" * 50 + "\n")
+        summary_file.write(f"Analysis Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        summary_file.write(f"Files Analyzed: {len(summaries)}\n\n")
+        for summary in summaries:
+            summary_file.write(f"{summary['file']}: {summary['total_packets']} SIP packets, "
+                               f"{summary['register_count']} REGISTER, {summary['invite_count']} INVITE\n")
+        summary_file.write("\nTotals:\n")
+        summary_file.write(f"Total SIP Packets: {totals['total_packets']}\n")
+        if 'duplicates_dropped' in totals:
+            summary_file.write(f"Duplicate SIP Frames Dropped: {totals['duplicates_dropped']}\n")
+        summary_file.write(f"REGISTER Messages: {totals['register_count']}\n")
+        summary_file.write(f"INVITE Messages: {totals['invite_count']}\n")
+        summary_file.write(f"P-Access-Network-Info in REGISTER: {totals['pani_register_count']}\n")
+        summary_file.write(f"P-Access-Network-Info in INVITE: {totals['pani_invite_count']}\n")
+        summary_file.write(f"Cellular-Network-Info in REGISTER: {totals['cni_register_count']}\n")
+        summary_file.write(f"Cellular-Network-Info in INVITE: {totals['cni_invite_count']}\n")
+        if 'stats' in totals:
+            summary_file.write(format_stats(totals['stats'], all_minutes=False))
+        if 'access_categories' in totals:
+            summary_file.write(format_access_categories(totals['access_categories']))
+        if 'transactions' in totals:
+            summary_file.write(format_transaction_stats(totals['transactions']))
+        summary_file.write("=" * 50 + "\n")
+    return totals
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.sip_analyzer_cache')
+DEFAULT_CACHE_SIZE = 2 * 1024 ** 3
+
+# Bytes hashed at the start, middle and end of a capture to fingerprint it
+PARTIAL_HASH_BLOCK = 1024 * 1024
+
+SUMMARY_NAME = 'summary.json'
+
+
+def partial_hash(file_path):
+    """Fast fingerprint of a capture from its size and three sampled blocks"""
+    size = os.path.getsize(file_path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(file_path, 'rb') as f:
+        for offset in sorted({0, max(0, size // 2 - PARTIAL_HASH_BLOCK // 2), max(0, size - PARTIAL_HASH_BLOCK)}):
+            f.seek(offset)
+            digest.update(f.read(PARTIAL_HASH_BLOCK))
+    return digest.hexdigest()
+
+
+def _entry_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+class ResultCache:
+    """Persistent store of finished reports keyed by capture identity and analyzer settings
+
+    Each entry is a directory named after its key holding the output files
+    and summary.json. Entries are touched when served and the least
+    recently used ones are evicted once the cache grows beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, file_path, settings):
+        """Cache key from file name, size, mtime, partial hash and the settings dict"""
+        stat = os.stat(file_path)
+        identity = {
+            'name': os.path.basename(file_path),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'hash': partial_hash(file_path),
+            'settings': settings,
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key, outputs):
+        """Copy a cached entry to the outputs {role: path} and return its summary, or None on a miss"""
+        entry = os.path.join(self.cache_dir, key)
+        try:
+            with open(os.path.join(entry, SUMMARY_NAME)) as f:
+                summary = json.load(f)
+            if not all(os.path.exists(os.path.join(entry, role)) for role in outputs):
+                return None
+            for role, path in outputs.items():
+                shutil.copyfile(os.path.join(entry, role), path)
+            os.utime(entry)
+        except (OSError, ValueError):
+            return None
+        return summary
+
+    def put(self, key, summary, outputs):
+        """Store the summary and copies of the outputs {role: path}, then evict if over the limit"""
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self.cache_dir)
+        try:
+            for role, path in outputs.items():
+                shutil.copyfile(path, os.path.join(staging, role))
+            with open(os.path.join(staging, SUMMARY_NAME), 'w') as f:
+                json.dump(summary, f)
+            entry = os.path.join(self.cache_dir, key)
+            if os.path.exists(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_dir() and not entry.name.startswith('.staging-'):
+                entries.append((entry.stat().st_mtime, _entry_size(entry.path), entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
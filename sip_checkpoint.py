@@ -0,0 +1,51 @@
+import json
+import os
+import time
+
+# Minimum number of seconds between two checkpoints of a running analysis
+CHECKPOINT_INTERVAL = 30
+
+
+class Checkpoint:
+    """Periodically saved progress of one analysis, used to resume after a crash
+
+    The state is a JSON file next to the report. It is only accepted back
+    by load() when the capture (size and mtime) and the analysis settings
+    still match the ones it was written for.
+    """
+
+    def __init__(self, path, file_path, settings, interval=CHECKPOINT_INTERVAL):
+        stat = os.stat(file_path)
+        self.path = path
+        self.identity = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'settings': settings}
+        self.interval = interval
+        self.last_save = time.monotonic()
+
+    def load(self):
+        """Return the saved state, or None if there is none or it is for another run"""
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if saved.get('identity') != self.identity:
+            return None
+        return saved.get('state')
+
+    def due(self):
+        return time.monotonic() - self.last_save >= self.interval
+
+    def save(self, state):
+        """Atomically replace the checkpoint file with state"""
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'identity': self.identity, 'state': state}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.last_save = time.monotonic()
+
+    def remove(self):
+        for path in (self.path, self.path + '.tmp'):
+            if os.path.exists(path):
+                os.remove(path)
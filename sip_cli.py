@@ -0,0 +1,272 @@
+import argparse
+import multiprocessing
+import os
+import signal
+import stat
+import sys
+import threading
+import time
+import sip_analyzer
+from sip_access import load_rules
+from sip_columnar import COLUMNAR_FORMATS
+from sip_dedup import DEFAULT_DEDUP_WINDOW
+from sip_dialogs import TRANSACTION_TABLE_SIZE
+from sip_governor import DEFAULT_TSHARK_MEMORY
+
+# Process exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_NO_CAPTURES = 3
+EXIT_INTERRUPTED = 130
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Analyze SIP REGISTER/INVITE messages without starting the GUI: in every capture of a "
+                    "directory (.pcap, .pcapng or .cap, optionally .gz/.zst compressed), in one pcap/pcapng "
+                    "stream from stdin or a named pipe, or, with --watch, in captures as they arrive."
+    )
+    parser.add_argument('input_dir', help="directory with the captures to analyze, or - / a named pipe "
+                                          "to analyze one pcap/pcapng stream")
+    parser.add_argument('output_dir', help="directory for the reports (created if missing)")
+    parser.add_argument('-b', '--backend', choices=sip_analyzer.BACKENDS, default=sip_analyzer.BACKENDS[0],
+                        help="analysis engine (default: %(default)s)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="files analyzed in parallel (default: %(default)s)")
+    parser.add_argument('-c', '--chunks', type=int, default=1,
+                        help="chunks per file for the native engine (default: %(default)s)")
+    parser.add_argument('-p', '--prefilter', action='store_true',
+                        help="hand only REGISTER/INVITE frames to tshark")
+    parser.add_argument('-f', '--columnar', choices=tuple(COLUMNAR_FORMATS),
+                        help="also write Parquet or Arrow IPC output next to each report")
+    parser.add_argument('-s', '--stats', action='store_true',
+                        help="add access type, cell ID and per-minute histograms to the reports (needs numpy)")
+    parser.add_argument('-a', '--access-rules', metavar='FILE',
+                        help="count P-Access-Network-Info/Cellular-Network-Info values per access network category "
+                             "with the CATEGORY PATTERN rules of FILE")
+    parser.add_argument('-d', '--dedup', type=float, nargs='?', const=DEFAULT_DEDUP_WINDOW, metavar='SECONDS',
+                        help="drop copies of a SIP message seen again within SECONDS, e.g. from several taps "
+                             "(default: %(const)s)")
+    parser.add_argument('-t', '--transactions', type=int, nargs='?', const=TRANSACTION_TABLE_SIZE, metavar='SIZE',
+                        help="pair REGISTER/INVITE with their responses by Call-ID/CSeq and report latencies; "
+                             "SIZE caps the open transactions held in memory (default: %(const)s)")
+    parser.add_argument('--store', metavar='DB',
+                        help="also insert every REGISTER/INVITE into this SQLite message store "
+                             "(query it with sip_query.py)")
+    parser.add_argument('--metrics', action='store_true',
+                        help="time the analysis stages and write run_metrics.json and run_metrics.prom "
+                             "(Prometheus text format) to output_dir")
+    parser.add_argument('--tshark-memory', type=int, nargs='?', const=DEFAULT_TSHARK_MEMORY, metavar='MB',
+                        help="restart tshark after its last delivered frame whenever it grows past MB of "
+                             "resident memory (tshark engines, uncompressed captures; default: %(const)s)")
+    parser.add_argument('-m', '--merge', nargs='?', const='merged', metavar='NAME',
+                        help="analyze all captures as one timeline in timestamp order and write a single "
+                             "NAME.txt report (native engine; default: %(const)s)")
+    parser.add_argument('--no-cache', action='store_true', help="always re-analyze, ignoring cached results")
+    parser.add_argument('-q', '--quiet', action='store_true', help="no progress bars")
+    parser.add_argument('--watch', action='store_true',
+                        help="keep running and analyze captures as they arrive in input_dir")
+    return parser
+
+
+def watch(args):
+    """Run the watch-folder daemon until SIGTERM or Ctrl+C"""
+    from sip_watch import watch_directory
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+    def file_completed(file_path, summary, error):
+        if error is not None:
+            print(f"Failed: {os.path.basename(file_path)} ({error!r})", flush=True)
+        else:
+            print(f"Completed: {os.path.basename(file_path)} ({summary['total_packets']} SIP packets)", flush=True)
+
+    print(f"Watching '{args.input_dir}' with {args.workers} worker(s)", flush=True)
+    try:
+        watch_directory(args.input_dir, args.output_dir, backend=args.backend, workers=args.workers,
+                        callback=file_completed, cancel=stop, chunks=args.chunks,
+                        prefilter=args.prefilter, columnar=args.columnar, stats=args.stats,
+                        transactions=args.transactions, store=args.store, tshark_memory=args.tshark_memory,
+                        access_rules=args.access_rules, dedup=args.dedup)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    return EXIT_OK
+
+
+def is_stream(path):
+    """True for - (stdin) and named pipes"""
+    if path == '-':
+        return True
+    try:
+        return stat.S_ISFIFO(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def stream(args):
+    """Analyze one capture stream from stdin or a named pipe"""
+    name = 'stdin' if args.input_dir == '-' else os.path.basename(args.input_dir)
+    if sip_analyzer.is_capture(name):
+        output_file = sip_analyzer.report_path(name, args.output_dir)
+    else:
+        output_file = os.path.join(args.output_dir, name + '.txt')
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # The first Ctrl+C ends the stream cleanly and still writes the report
+    stop = threading.Event()
+
+    def interrupt(signum, frame):
+        stop.set()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGINT, interrupt)
+    signal.signal(signal.SIGTERM, interrupt)
+
+    def running_summary(counters):
+        print(f"So far: {counters['total_packets']} SIP packets, {counters['register_count']} REGISTER, "
+              f"{counters['invite_count']} INVITE", file=sys.stderr, flush=True)
+
+    def analyze(source):
+        return sip_analyzer.stream_sip_info(source, output_file, name, summary_callback=running_summary, stop=stop,
+                                            columnar=args.columnar, stats=args.stats,
+                                            transactions=args.transactions, store=args.store,
+                                            access_rules=args.access_rules, dedup=args.dedup)
+
+    print(f"Reading capture stream from {'stdin' if name == 'stdin' else args.input_dir}", file=sys.stderr)
+    try:
+        if args.input_dir == '-':
+            counters = analyze(sys.stdin.buffer)
+        else:
+            with open(args.input_dir, 'rb') as f:
+                counters = analyze(f)
+    except KeyboardInterrupt:
+        print("Analysis interrupted", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        print(f"An error occurred: {str(e)}", file=sys.stderr)
+        return EXIT_FAILED
+
+    print(f"Report: {output_file}")
+    print(f"Run summary: {counters['total_packets']} SIP packets, "
+          f"{counters['register_count']} REGISTER, {counters['invite_count']} INVITE")
+    return EXIT_OK
+
+
+def merge(args, jobs):
+    """Analyze the captures of input_dir as one time-ordered capture with the native engine"""
+    output_file = os.path.join(args.output_dir, args.merge + '.txt')
+    if any(report == output_file for _, report in jobs):
+        print(f"error: {args.merge}.txt is the report name of a capture in '{args.input_dir}'; "
+              f"give the merged report another --merge NAME", file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        start = time.perf_counter()
+        summary = sip_analyzer.merge_sip_info([file_path for file_path, _ in jobs], output_file,
+                                              progress=not args.quiet, columnar=args.columnar, stats=args.stats,
+                                              transactions=args.transactions, store=args.store,
+                                              metrics=args.metrics, access_rules=args.access_rules,
+                                              dedup=args.dedup)
+        sip_analyzer.write_run_summary(args.output_dir, [summary])
+        if args.metrics:
+            from sip_metrics import write_run_metrics
+            write_run_metrics(args.output_dir, [summary], time.perf_counter() - start)
+    except KeyboardInterrupt:
+        print("Analysis interrupted", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        print(f"An error occurred: {str(e)}", file=sys.stderr)
+        return EXIT_FAILED
+
+    print(f"Report: {output_file}")
+    print(f"Run summary: {summary['captures']} captures merged, {summary['total_packets']} SIP packets, "
+          f"{summary['register_count']} REGISTER, {summary['invite_count']} INVITE")
+    return EXIT_OK
+
+
+def main(argv=None):
+    """Run a batch analysis from the command line and return the process exit code"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if (args.workers < 1 or args.chunks < 1 or (args.transactions is not None and args.transactions < 1)
+            or (args.tshark_memory is not None and args.tshark_memory < 1)):
+        parser.print_usage(sys.stderr)
+        print("error: --workers, --chunks, --transactions and --tshark-memory must be at least 1", file=sys.stderr)
+        return EXIT_USAGE
+    if args.dedup is not None and not args.dedup > 0:
+        parser.print_usage(sys.stderr)
+        print("error: --dedup must be a positive number of seconds", file=sys.stderr)
+        return EXIT_USAGE
+    if args.access_rules:
+        try:
+            args.access_rules = load_rules(args.access_rules)
+        except (OSError, ValueError) as e:
+            print(f"error: access rules: {e}", file=sys.stderr)
+            return EXIT_USAGE
+    if args.merge is not None and (args.watch or is_stream(args.input_dir)):
+        parser.print_usage(sys.stderr)
+        print("error: --merge needs an input directory and cannot be combined with --watch", file=sys.stderr)
+        return EXIT_USAGE
+    if args.merge is not None and (not args.merge or os.path.basename(args.merge) != args.merge):
+        parser.print_usage(sys.stderr)
+        print("error: --merge NAME must be a plain file name", file=sys.stderr)
+        return EXIT_USAGE
+    if is_stream(args.input_dir):
+        return stream(args)
+    if not os.path.isdir(args.input_dir):
+        print(f"error: input directory '{args.input_dir}' does not exist", file=sys.stderr)
+        return EXIT_USAGE
+    if args.watch:
+        return watch(args)
+
+    jobs = sip_analyzer.find_jobs(args.input_dir, args.output_dir)
+    if not jobs:
+        print(f"error: no capture files found in '{args.input_dir}'", file=sys.stderr)
+        return EXIT_NO_CAPTURES
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.merge is not None:
+        return merge(args, jobs)
+
+    cache = None
+    if not args.no_cache:
+        from sip_cache import ResultCache
+        cache = ResultCache()
+
+    def file_completed(index, summary):
+        label = "Cached" if summary.get('cached') else "Completed"
+        print(f"{label}: {os.path.basename(jobs[index][0])}")
+
+    try:
+        start = time.perf_counter()
+        summaries = sip_analyzer.analyze_files(jobs, backend=args.backend, workers=args.workers,
+                                               callback=file_completed, chunks=args.chunks,
+                                               prefilter=args.prefilter, columnar=args.columnar,
+                                               cache=cache, progress=not args.quiet, stats=args.stats,
+                                               transactions=args.transactions, store=args.store,
+                                               metrics=args.metrics, tshark_memory=args.tshark_memory,
+                                               access_rules=args.access_rules, dedup=args.dedup)
+        totals = sip_analyzer.write_run_summary(args.output_dir, summaries)
+        if args.metrics:
+            from sip_metrics import write_run_metrics
+            report = write_run_metrics(args.output_dir, summaries, time.perf_counter() - start)
+    except KeyboardInterrupt:
+        print("Analysis interrupted", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    except SystemExit as e:
+        # extract_sip_info exits with 1 after reporting what went wrong
+        return e.code if isinstance(e.code, int) else EXIT_FAILED
+    except Exception as e:
+        print(f"An error occurred: {str(e)}", file=sys.stderr)
+        return EXIT_FAILED
+
+    print(f"Run summary: {totals['total_packets']} SIP packets, "
+          f"{totals['register_count']} REGISTER, {totals['invite_count']} INVITE")
+    if args.metrics:
+        print(f"Throughput: {report['packets_per_sec']:.0f} SIP packets/s, "
+              f"{report['bytes_per_sec'] / 1e6:.1f} MB/s over {report['files_analyzed']} analyzed file(s)")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    # Needed for the process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import os
+from sip_parser import header_params
+
+# Columnar output formats and the file extension used for each
+COLUMNAR_FORMATS = {
+    'parquet': '.parquet',
+    'arrow': '.arrow',
+}
+
+# Rows buffered before a record batch is written
+BATCH_SIZE = 65536
+
+
+def columnar_path(output_file, fmt):
+    """Columnar file written next to a text report"""
+    return os.path.splitext(output_file)[0] + COLUMNAR_FORMATS[fmt]
+
+
+class ColumnarWriter:
+    """Write one row per REGISTER/INVITE message to Parquet or Arrow IPC in record batches
+
+    The file column is input_name, or the capture a message came from in a
+    merged analysis.
+    """
+
+    def __init__(self, path, fmt='parquet', input_name=''):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise RuntimeError("Columnar output needs pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.fmt = fmt
+        self.input_name = input_name
+        self.schema = pa.schema([
+            ('file', pa.string()),
+            ('message_type', pa.string()),
+            ('timestamp', pa.timestamp('us', tz='UTC')),
+            ('to', pa.string()),
+            ('to_params', pa.map_(pa.string(), pa.string())),
+            ('from', pa.string()),
+            ('from_params', pa.map_(pa.string(), pa.string())),
+            ('route', pa.string()),
+            ('p_access_network_info', pa.string()),
+            ('cellular_network_info', pa.string()),
+        ])
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+        self.rows = {name: [] for name in self.schema.names}
+
+    def add(self, message_type, message):
+        rows = self.rows
+        rows['file'].append(message.source or self.input_name)
+        rows['message_type'].append(message_type)
+        rows['timestamp'].append(round(message.time * 1000000))
+        rows['to'].append(message.to)
+        rows['to_params'].append(header_params(message.to) if message.to is not None else None)
+        rows['from'].append(message.from_)
+        rows['from_params'].append(header_params(message.from_) if message.from_ is not None else None)
+        rows['route'].append(message.route)
+        rows['p_access_network_info'].append(message.pani)
+        rows['cellular_network_info'].append(message.cni)
+        if len(rows['file']) >= BATCH_SIZE:
+            self.flush()
+
+    def write_batch(self, batch):
+        if self.fmt == 'parquet':
+            self.writer.write_table(self.pa.Table.from_batches([batch], self.schema))
+        else:
+            self.writer.write_batch(batch)
+
+    def flush(self):
+        if not self.rows['file']:
+            return
+        arrays = [self.pa.array(self.rows[field.name], type=field.type) for field in self.schema]
+        self.write_batch(self.pa.record_batch(arrays, schema=self.schema))
+        self.rows = {name: [] for name in self.schema.names}
+
+    def append_file(self, path):
+        """Copy the batches of another columnar file with the same schema, in order"""
+        self.flush()
+        if self.fmt == 'parquet':
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=BATCH_SIZE):
+                self.write_batch(batch)
+        else:
+            with self.pa.memory_map(path) as source:
+                reader = self.pa.ipc.open_file(source)
+                for index in range(reader.num_record_batches):
+                    self.write_batch(reader.get_batch(index))
+
+    def close(self):
+        self.flush()
+        self.writer.close()
@@ -0,0 +1,53 @@
+from collections import deque
+
+# Seconds after the first copy of a SIP message within which an identical one
+# is taken for a mirrored copy (taps see it microseconds to milliseconds apart,
+# while SIP retransmits over UDP only after T1 = 500 ms)
+DEFAULT_DEDUP_WINDOW = 0.05
+
+# Message hashes held at most; past this the oldest are forgotten early
+DEDUP_MAX_ENTRIES = 1 << 20
+
+
+class Deduplicator:
+    """Drop repeated copies of a SIP message captured from several taps
+
+    Keeps a time-windowed hash set: the 64-bit hash of every SIP payload
+    seen within the last window seconds, with the time of its first copy.
+    A payload whose hash is already there, no more than window seconds
+    after that first copy, is a duplicate. Entries leave the set in
+    arrival order once they fall out of the window (or past max_entries),
+    so memory depends on the message rate, not the capture length.
+    dropped counts the duplicates found, continuing from dropped when
+    resuming.
+    """
+
+    def __init__(self, window=DEFAULT_DEDUP_WINDOW, max_entries=DEDUP_MAX_ENTRIES, dropped=0):
+        self.window = window
+        self.max_entries = max_entries
+        self.dropped = dropped
+        self._seen = {}
+        self._order = deque()
+
+    def _forget_oldest(self):
+        timestamp, key = self._order.popleft()
+        # A later copy with the same hash may have replaced the entry
+        if self._seen.get(key) == timestamp:
+            del self._seen[key]
+
+    def is_duplicate(self, timestamp, payload):
+        """True (and counted) if payload repeats one seen within the window before timestamp"""
+        order = self._order
+        cutoff = timestamp - self.window
+        while order and order[0][0] < cutoff:
+            self._forget_oldest()
+        key = hash(payload)
+        first = self._seen.get(key)
+        if first is not None and abs(timestamp - first) <= self.window:
+            self.dropped += 1
+            return True
+        self._seen[key] = timestamp
+        order.append((timestamp, key))
+        if len(order) > self.max_entries:
+            self._forget_oldest()
+        return False
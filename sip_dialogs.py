@@ -0,0 +1,255 @@
+import csv
+import math
+import os
+from collections import OrderedDict
+from datetime import datetime
+
+# Seconds without a final response after which a transaction is given up;
+# covers INVITE Timer C (3 minutes), far beyond REGISTER's 32 s Timer F
+TRANSACTION_TIMEOUT = 180
+
+# Default limit on open transactions held at once; the oldest are evicted past it
+TRANSACTION_TABLE_SIZE = 1000000
+
+# Percentiles reported for each latency histogram
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+
+# Transaction counters, summed across chunks, files and workers
+TRANSACTION_COUNTERS = (
+    'invite_transactions',
+    'invite_answered',      # 2xx final response
+    'invite_failed',        # 3xx-6xx final response
+    'register_transactions',
+    'register_ok',          # 2xx
+    'register_challenged',  # 401/407
+    'register_failed',      # any other final response
+    'timed_out',            # no final response within TRANSACTION_TIMEOUT
+    'evicted',              # dropped to stay within the table size
+    'unfinished',           # still open at the end of the capture
+    'unmatched_responses',  # responses whose request was never seen (or already answered)
+)
+
+# Latency histograms in whole milliseconds, each a {'ms': count} dict
+LATENCY_HISTOGRAMS = (
+    'invite_ringing',  # INVITE to first provisional response other than 100 Trying
+    'invite_answer',   # INVITE to 2xx
+    'register',        # REGISTER to its final response
+)
+
+# Columns of the per-transaction CSV written next to the report
+TRANSACTION_COLUMNS = ('call_id', 'method', 'cseq', 'request_frame', 'request_time', 'provisional_status',
+                       'provisional_latency_ms', 'final_status', 'final_latency_ms', 'outcome')
+
+
+def transactions_path(output_file):
+    """Per-transaction CSV written next to a text report"""
+    return os.path.splitext(output_file)[0] + '.transactions.csv'
+
+
+def empty_transaction_stats():
+    return {'counters': dict.fromkeys(TRANSACTION_COUNTERS, 0),
+            'latency': {name: {} for name in LATENCY_HISTOGRAMS}}
+
+
+def merge_transaction_stats(totals, stats):
+    """Add the counters and latency histograms of stats to totals in place and return totals"""
+    for name in TRANSACTION_COUNTERS:
+        totals['counters'][name] += stats['counters'][name]
+    for name in LATENCY_HISTOGRAMS:
+        histogram = totals['latency'][name]
+        for key, count in stats['latency'][name].items():
+            histogram[key] = histogram.get(key, 0) + count
+    return totals
+
+
+def latency_percentiles(histogram, percentiles=LATENCY_PERCENTILES):
+    """{percentile: milliseconds} by nearest rank over a latency histogram, {} if it is empty"""
+    entries = sorted((int(key), count) for key, count in histogram.items())
+    total = sum(count for _, count in entries)
+    if not total:
+        return {}
+    result = {}
+    index = 0
+    seen = entries[0][1]
+    for percentile in percentiles:
+        rank = max(1, math.ceil(percentile / 100 * total))
+        while seen < rank:
+            index += 1
+            seen += entries[index][1]
+        result[percentile] = entries[index][0]
+    return result
+
+
+def format_transaction_stats(stats):
+    """Text block with the transaction counters and latency percentiles of a report or run summary"""
+    counters = stats['counters']
+    lines = [
+        "\nTransaction Correlation (Call-ID/CSeq):\n",
+        f"INVITE transactions: {counters['invite_transactions']} "
+        f"({counters['invite_answered']} answered, {counters['invite_failed']} failed)\n",
+        f"REGISTER transactions: {counters['register_transactions']} "
+        f"({counters['register_ok']} accepted, {counters['register_challenged']} challenged, "
+        f"{counters['register_failed']} failed)\n",
+        f"Without final response: {counters['timed_out']} timed out, {counters['evicted']} evicted, "
+        f"{counters['unfinished']} open at end of capture\n",
+        f"Unmatched or retransmitted responses: {counters['unmatched_responses']}\n",
+    ]
+    for name, label in (('invite_ringing', "INVITE to first 18x"), ('invite_answer', "INVITE to 200"),
+                        ('register', "REGISTER to final response")):
+        percentiles = latency_percentiles(stats['latency'][name])
+        if percentiles:
+            values = ', '.join(f"p{percentile} {ms} ms" for percentile, ms in percentiles.items())
+        else:
+            values = "no samples"
+        lines.append(f"{label} latency: {values}\n")
+    return ''.join(lines)
+
+
+class TransactionCorrelator:
+    """Pair REGISTER/INVITE requests with their responses by Call-ID and CSeq
+
+    Open transactions live in an insertion-ordered hash table keyed by
+    (Call-ID, CSeq number, method). A final response closes its
+    transaction; transactions without one are given up once the capture
+    clock (the latest time of any message added) is timeout seconds past
+    their request, or evicted oldest first when more than
+    max_transactions are open, so memory is bounded however many dialogs
+    the capture holds. Every closed transaction is written as
+    one CSV row to records_path (if given) and counted into latency
+    histograms, which take bounded space and merge across files.
+    """
+
+    def __init__(self, records_path=None, timeout=TRANSACTION_TIMEOUT, max_transactions=TRANSACTION_TABLE_SIZE):
+        self.timeout = timeout
+        self.max_transactions = max_transactions
+        # (call_id, cseq, method) -> [request frame, request time, provisional status, provisional time]
+        self.table = OrderedDict()
+        self.stats = empty_transaction_stats()
+        self.latest = None
+        self.records_file = None
+        self.writer = None
+        if records_path is not None:
+            self.records_file = open(records_path, 'w', newline='', encoding='utf-8')
+            self.writer = csv.writer(self.records_file)
+            self.writer.writerow(TRANSACTION_COLUMNS)
+
+    def add(self, message):
+        # Any timed message moves the capture clock, so transactions time out
+        # during runs of responses (or of other traffic) too
+        if message.time is not None and (self.latest is None or message.time > self.latest):
+            self.latest = message.time
+            if self.table:
+                self._expire()
+        if message.call_id is None or message.cseq is None:
+            return
+        if message.method is None:
+            self._response(message)
+        elif message.method in ('REGISTER', 'INVITE'):
+            self._request(message)
+
+    def _request(self, message):
+        key = (message.call_id, message.cseq, message.method)
+        if key in self.table:
+            # Retransmission; latency counts from the first copy
+            return
+        self.table[key] = [message.frame, message.time, None, None]
+        self._expire()
+
+    def _expire(self):
+        table = self.table
+        deadline = self.latest - self.timeout
+        while table:
+            key = next(iter(table))
+            transaction = table[key]
+            if transaction[1] >= deadline and len(table) <= self.max_transactions:
+                break
+            del table[key]
+            self._finish(key, transaction, None, None, 'timed_out' if transaction[1] < deadline else 'evicted')
+
+    def _response(self, message):
+        key = (message.call_id, message.cseq, message.cseq_method)
+        transaction = self.table.get(key)
+        if transaction is None:
+            if message.cseq_method in ('REGISTER', 'INVITE'):
+                self.stats['counters']['unmatched_responses'] += 1
+            return
+        status = message.status
+        if status is None:
+            return
+        if status < 200:
+            if status != 100 and transaction[2] is None:
+                transaction[2] = status
+                transaction[3] = message.time
+            return
+        del self.table[key]
+        self._finish(key, transaction, status, message.time, None)
+
+    def _finish(self, key, transaction, status, time, outcome):
+        call_id, cseq, method = key
+        frame, request_time, provisional_status, provisional_time = transaction
+        counters = self.stats['counters']
+        latency = self.stats['latency']
+        provisional_ms = self._latency_ms(request_time, provisional_time)
+        final_ms = self._latency_ms(request_time, time)
+
+        if method == 'INVITE':
+            counters['invite_transactions'] += 1
+            if provisional_ms is not None:
+                self._count_latency(latency['invite_ringing'], provisional_ms)
+            if status is None:
+                pass
+            elif status < 300:
+                outcome = 'answered'
+                counters['invite_answered'] += 1
+                self._count_latency(latency['invite_answer'], final_ms)
+            else:
+                outcome = 'failed'
+                counters['invite_failed'] += 1
+        else:
+            counters['register_transactions'] += 1
+            if status is None:
+                pass
+            elif status < 300:
+                outcome = 'ok'
+                counters['register_ok'] += 1
+            elif status in (401, 407):
+                outcome = 'challenged'
+                counters['register_challenged'] += 1
+            else:
+                outcome = 'failed'
+                counters['register_failed'] += 1
+            if status is not None:
+                self._count_latency(latency['register'], final_ms)
+        if status is None:
+            # timed_out, evicted or unfinished
+            counters[outcome] += 1
+
+        if self.writer is not None:
+            self.writer.writerow((
+                call_id, method, cseq, frame,
+                datetime.fromtimestamp(request_time).isoformat(' ', 'microseconds'),
+                provisional_status or '', provisional_ms if provisional_ms is not None else '',
+                status or '', final_ms if final_ms is not None else '', outcome,
+            ))
+
+    @staticmethod
+    def _latency_ms(start, end):
+        # Clock steps in a capture must not produce negative latencies
+        return None if end is None else max(0, round((end - start) * 1000))
+
+    @staticmethod
+    def _count_latency(histogram, ms):
+        key = str(ms)
+        histogram[key] = histogram.get(key, 0) + 1
+
+    def result(self):
+        """Close out the transactions still open and return the counters and latency histograms"""
+        while self.table:
+            key, transaction = self.table.popitem(last=False)
+            self._finish(key, transaction, None, None, 'unfinished')
+        return self.stats
+
+    def close(self):
+        if self.records_file is not None:
+            self.records_file.close()
+            self.records_file = None
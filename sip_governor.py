@@ -0,0 +1,104 @@
+import os
+import signal
+import threading
+
+# Memory budget of the tshark process in megabytes when none is given
+DEFAULT_TSHARK_MEMORY = 2048
+
+# Seconds between RSS readings of the supervised tshark process
+GOVERNOR_INTERVAL = 0.5
+
+# Extra tshark arguments in supervised mode (both backends already pass -n).
+# They cut the state tshark keeps per conversation without changing the SIP
+# header fields we read: no SDP-driven RTP/RTCP conversation setup, no
+# per-segment TCP bytes-in-flight and timestamp tracking
+LEAN_TSHARK_ARGUMENTS = [
+    '--disable-protocol', 'sdp',
+    '--disable-protocol', 'rtp',
+    '--disable-protocol', 'rtcp',
+    '-o', 'tcp.track_bytes_in_flight:FALSE',
+    '-o', 'tcp.calculate_timestamps:FALSE',
+]
+
+# Signal sent to tshark once it is over budget (Windows has no SIGKILL)
+KILL_SIGNAL = getattr(signal, 'SIGKILL', signal.SIGTERM)
+
+
+def process_rss(pid):
+    """Resident set size of a process in bytes, or None once it has exited
+
+    Read from /proc where there is one, else through psutil.
+    """
+    if os.path.exists('/proc/self/statm'):
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return None
+    try:
+        import psutil
+    except ImportError:
+        raise RuntimeError("The tshark memory limit needs psutil on this platform (pip install psutil)")
+    try:
+        return psutil.Process(pid).memory_info().rss
+    except psutil.Error:
+        return None
+
+
+class TsharkGovernor:
+    """Watchdog thread that kills tshark once its RSS passes a budget
+
+    The iterator that starts tshark hands its processes over with watch().
+    Every GOVERNOR_INTERVAL seconds the thread reads their RSS; past
+    limit_mb megabytes it kills them and sets tripped, which tells the
+    reader that the capture ended early and tshark should be restarted
+    after the last frame it delivered.
+    """
+
+    def __init__(self, limit_mb=DEFAULT_TSHARK_MEMORY, interval=GOVERNOR_INTERVAL):
+        self.limit_mb = limit_mb
+        self.limit = limit_mb * 1024 * 1024
+        self.interval = interval
+        self.tripped = False
+        self.tripped_rss = 0
+        self.peak_rss = 0
+        self.restarts = 0
+        self._processes = None
+        self._stop = threading.Event()
+        # Fail here rather than in the thread if RSS cannot be read
+        process_rss(os.getpid())
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def watch(self, processes):
+        """Supervise the processes (objects with a pid) returned by calling processes()"""
+        self.tripped = False
+        self._processes = processes
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            processes = self._processes
+            if processes is None or self.tripped:
+                continue
+            try:
+                pids = [process.pid for process in processes()]
+            except RuntimeError:
+                # pyshark's process set changed while it was copied; try again next time
+                continue
+            for pid in pids:
+                rss = process_rss(pid)
+                if rss is None:
+                    continue
+                self.peak_rss = max(self.peak_rss, rss)
+                if rss > self.limit:
+                    self.tripped_rss = rss
+                    self.tripped = True
+                    try:
+                        os.kill(pid, KILL_SIGNAL)
+                    except OSError:
+                        # Exited on its own in the meantime
+                        pass
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,271 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    # No getrusage on Windows; memory and child CPU figures are left out there
+    resource = None
+
+# Stages an analysis is timed in, in pipeline order
+STAGES = (
+    'prefilter',  # writing the REGISTER/INVITE-only copy handed to tshark
+    'dissect',    # waiting for packets: tshark dissection and pyshark packet objects, or the native record walk
+    'parse',      # our header/field parsing into SipMessage records
+    'process',    # counting, detail blocks and the optional outputs (columnar, stats, transactions, store)
+    'report',     # writing the final report
+)
+
+# Seconds between live throughput readings
+THROUGHPUT_INTERVAL = 1.0
+
+# Run metrics written next to run_summary.txt
+RUN_METRICS_NAME = 'run_metrics.json'
+PROMETHEUS_NAME = 'run_metrics.prom'
+
+
+def _kilobytes(maxrss):
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    return maxrss // 1024 if sys.platform == 'darwin' else maxrss
+
+
+def _children_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def peak_rss():
+    """(peak RSS of this process, of its largest finished child) in kilobytes, or (None, None)"""
+    if resource is None:
+        return None, None
+    return (_kilobytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss),
+            _kilobytes(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss))
+
+
+def add_packets(counter, count):
+    """Add count to a shared packet counter (a multiprocessing.Value)"""
+    with counter.get_lock():
+        counter.value += count
+
+
+def merge_stages(stage_times):
+    """Sum {stage: seconds} dicts, skipping None"""
+    totals = dict.fromkeys(STAGES, 0.0)
+    for stages in stage_times:
+        if stages is not None:
+            for stage in STAGES:
+                totals[stage] += stages[stage]
+    return totals
+
+
+def timed_stage(timer, stage):
+    """Context manager timing stage on timer, or doing nothing without one"""
+    return timer.stage(stage) if timer is not None else nullcontext()
+
+
+class StageTimer:
+    """Wall time per stage of one capture analysis, plus its resource use
+
+    prefilter, process and report are timed around the code they cover.
+    The message iterator is wrapped by messages(), which times how long
+    each message takes to arrive; the parse time measured inside the
+    iterator (see timed) is taken out of that to give dissect, and the
+    whole iterator time out of the message loop to give process. Stages
+    of chunks analyzed in other processes are added with add_stages, so
+    for chunked runs they sum over the chunk processes.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.children_cpu = _children_cpu()
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.merged = dict.fromkeys(STAGES, 0.0)
+        self.source = 0.0
+
+    @contextmanager
+    def stage(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] += time.perf_counter() - start
+
+    def timed(self, stage, function):
+        """function wrapped to add its run time to stage"""
+        clock = time.perf_counter
+        stages = self.stages
+
+        def timed_function(*args):
+            start = clock()
+            try:
+                return function(*args)
+            finally:
+                stages[stage] += clock() - start
+        return timed_function
+
+    def messages(self, messages):
+        """Yield from messages, adding the time spent waiting for each to the source time"""
+        clock = time.perf_counter
+        iterator = iter(messages)
+        while True:
+            start = clock()
+            try:
+                message = next(iterator)
+            except StopIteration:
+                self.source += clock() - start
+                return
+            self.source += clock() - start
+            yield message
+
+    def add_stages(self, stages):
+        for stage in STAGES:
+            self.merged[stage] += stages[stage]
+
+    def stage_times(self):
+        """{stage: seconds} with dissect and process derived from the iterator time"""
+        stages = dict(self.stages)
+        stages['dissect'] = max(0.0, self.source - stages['parse'])
+        stages['process'] = max(0.0, stages['process'] - self.source)
+        return {stage: stages[stage] + self.merged[stage] for stage in STAGES}
+
+    def result(self, packets, size):
+        """Per-file metrics: duration, stages, throughput and resource use
+
+        size is the capture size in bytes. Peak RSS is the high-water mark
+        of the process (a pool worker analyzing several files reports the
+        largest so far); child figures cover tshark, or the chunk workers.
+        """
+        duration = time.perf_counter() - self.start
+        analyzer_rss, child_rss = peak_rss()
+        return {
+            'duration': duration,
+            'stages': self.stage_times(),
+            'bytes': size,
+            'packets_per_sec': packets / duration if duration else 0.0,
+            'bytes_per_sec': size / duration if duration else 0.0,
+            'peak_rss_kb': analyzer_rss,
+            'peak_child_rss_kb': child_rss,
+            'child_cpu_seconds': _children_cpu() - self.children_cpu,
+        }
+
+
+class ThroughputMeter:
+    """Live SIP packets per second from a shared packet counter
+
+    update() takes a reading at most every interval seconds and returns
+    the rate over the last interval, or None before the first reading.
+    """
+
+    def __init__(self, counter, interval=THROUGHPUT_INTERVAL):
+        self.counter = counter
+        self.interval = interval
+        self.last_time = time.monotonic()
+        self.last_count = counter.value
+        self.rate = None
+
+    def update(self):
+        now = time.monotonic()
+        if now - self.last_time >= self.interval:
+            count = self.counter.value
+            self.rate = (count - self.last_count) / (now - self.last_time)
+            self.last_time = now
+            self.last_count = count
+        return self.rate
+
+
+def run_metrics(summaries, duration):
+    """Run report dict from the per-file summaries of analyze_files and the run's wall time
+
+    Throughput counts the packets and bytes of files actually analyzed,
+    not those served from the result cache.
+    """
+    files = []
+    packets = 0
+    size = 0
+    for summary in summaries:
+        entry = {'file': summary['file'], 'cached': bool(summary.get('cached')),
+                 'packets': summary['total_packets']}
+        metrics = summary.get('metrics')
+        if metrics is not None:
+            entry.update(metrics)
+            packets += summary['total_packets']
+            size += metrics['bytes']
+        files.append(entry)
+    analyzer_rss, child_rss = peak_rss()
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'duration': duration,
+        'files_analyzed': sum(1 for entry in files if 'duration' in entry),
+        'files_cached': sum(1 for entry in files if entry['cached']),
+        'packets': packets,
+        'bytes': size,
+        'packets_per_sec': packets / duration if duration else 0.0,
+        'bytes_per_sec': size / duration if duration else 0.0,
+        'stages': merge_stages(entry.get('stages') for entry in files),
+        'peak_rss_kb': analyzer_rss,
+        'peak_child_rss_kb': child_rss,
+        'child_cpu_seconds': sum(entry.get('child_cpu_seconds', 0.0) for entry in files),
+        'files': files,
+    }
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_prometheus(report):
+    """Prometheus text exposition of a run report"""
+    lines = []
+
+    def metric(name, help_text, samples):
+        lines.append(f"# HELP sip_analyzer_{name} {help_text}")
+        lines.append(f"# TYPE sip_analyzer_{name} gauge")
+        for labels, value in samples:
+            if value is None:
+                continue
+            label_text = ','.join(f'{key}="{_label(label)}"' for key, label in labels.items())
+            lines.append(f"sip_analyzer_{name}{{{label_text}}} {value}" if label_text
+                         else f"sip_analyzer_{name} {value}")
+
+    metric('run_timestamp_seconds', "Unix time the run finished", [({}, round(time.time(), 3))])
+    metric('run_duration_seconds', "Wall time of the run", [({}, report['duration'])])
+    metric('files', "Captures in the run", [({'source': 'analyzed'}, report['files_analyzed']),
+                                           ({'source': 'cache'}, report['files_cached'])])
+    metric('packets', "SIP packets analyzed", [({}, report['packets'])])
+    metric('bytes', "Capture bytes analyzed", [({}, report['bytes'])])
+    metric('packets_per_second', "SIP packets analyzed per second of run time", [({}, report['packets_per_sec'])])
+    metric('bytes_per_second', "Capture bytes analyzed per second of run time", [({}, report['bytes_per_sec'])])
+    metric('stage_seconds', "Time per analysis stage, summed over files",
+           [({'stage': stage}, seconds) for stage, seconds in report['stages'].items()])
+    metric('peak_rss_bytes', "Peak resident memory",
+           [({'process': 'analyzer'}, report['peak_rss_kb'] and report['peak_rss_kb'] * 1024),
+            ({'process': 'child'}, report['peak_child_rss_kb'] and report['peak_child_rss_kb'] * 1024)])
+    metric('child_cpu_seconds', "CPU time of tshark and chunk worker processes", [({}, report['child_cpu_seconds'])])
+    analyzed = [entry for entry in report['files'] if 'duration' in entry]
+    metric('file_duration_seconds', "Wall time per capture",
+           [({'file': entry['file']}, entry['duration']) for entry in analyzed])
+    metric('file_packets_per_second', "SIP packets per second per capture",
+           [({'file': entry['file']}, entry['packets_per_sec']) for entry in analyzed])
+    return '\n'.join(lines) + '\n'
+
+
+def _write_atomic(path, text):
+    # Scrapers (e.g. node_exporter's textfile collector) must never see half a file
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+def write_run_metrics(output_dir, summaries, duration):
+    """Write run_metrics.json and run_metrics.prom for a run and return the report"""
+    report = run_metrics(summaries, duration)
+    _write_atomic(os.path.join(output_dir, RUN_METRICS_NAME), json.dumps(report, indent=2))
+    _write_atomic(os.path.join(output_dir, PROMETHEUS_NAME), format_prometheus(report))
+    return report
@@ -0,0 +1,176 @@
+import sys
+
+SIP_VERSION = b'SIP/2.0'
+RESPONSE_PREFIX = SIP_VERSION + b' '
+REQUEST_SUFFIX = b' ' + SIP_VERSION
+
+# RFC 3261 compact header forms
+COMPACT_HEADERS = {
+    'i': 'call-id',
+    'm': 'contact',
+    'e': 'content-encoding',
+    'l': 'content-length',
+    'c': 'content-type',
+    'f': 'from',
+    's': 'subject',
+    'k': 'supported',
+    't': 'to',
+    'v': 'via',
+}
+
+# Longest request line we are willing to look at before giving up
+MAX_START_LINE = 4096
+
+# Parsed parameters of recently seen headers; a UE refreshing its
+# registration sends the same To header every time
+PARAM_CACHE_SIZE = 65536
+_param_cache = {}
+
+
+class SipMessage:
+    """One SIP packet as reported by the analysis backends
+
+    time and the header fields are only filled in for REGISTER/INVITE;
+    offset is the byte position reached in the capture (native backend).
+    call_id is filled in for REGISTER/INVITE; cseq, cseq_method and the
+    fields of responses (method None: time, call_id, status) only when
+    transactions are correlated. source names the capture a message came
+    from in a merged analysis of several captures.
+    """
+    __slots__ = ('frame', 'offset', 'method', 'time', 'to', 'from_', 'route', 'pani', 'cni',
+                 'call_id', 'cseq', 'cseq_method', 'status', 'source')
+
+    def __init__(self, frame, method=None, offset=None):
+        self.frame = frame
+        self.offset = offset
+        self.method = method
+        self.time = None
+        self.to = None
+        self.from_ = None
+        self.route = None
+        self.pani = None
+        self.cni = None
+        self.call_id = None
+        self.cseq = None
+        self.cseq_method = None
+        self.status = None
+        self.source = None
+
+
+def request_method(payload):
+    """Classify a UDP/TCP payload by its start line
+
+    Returns (is_sip, method); method is None for responses.
+    """
+    if payload.startswith(RESPONSE_PREFIX):
+        return True, None
+    eol = payload.find(b'\r\n', 0, MAX_START_LINE)
+    if eol <= 0:
+        return False, None
+    line = payload[:eol]
+    if not line.endswith(REQUEST_SUFFIX):
+        return False, None
+    method = line[:line.find(b' ')]
+    if not method or not method.isalpha():
+        return False, None
+    return True, method.decode('ascii')
+
+
+def response_status(payload):
+    """Status code from a response start line, or None if it is malformed"""
+    code = payload[len(RESPONSE_PREFIX):len(RESPONSE_PREFIX) + 3]
+    return int(code) if code.isdigit() else None
+
+
+def parse_cseq(value):
+    """Split a CSeq header value into (sequence number, method); (None, None) if malformed"""
+    if value is None:
+        return None, None
+    number, _, method = value.partition(' ')
+    method = method.strip()
+    if not number.isdigit() or not method:
+        return None, None
+    return int(number), sys.intern(method)
+
+
+def parse_headers(payload, names):
+    """Return {name: value} for the first occurrence of each wanted header
+
+    names are lower-case canonical header names; compact forms and folded
+    continuation lines are handled. Everything after the blank line that
+    ends the header block is ignored.
+    """
+    head_end = payload.find(b'\r\n\r\n')
+    if head_end < 0:
+        head_end = len(payload)
+    lines = payload[:head_end].decode('utf-8', 'replace').split('\r\n')
+    headers = {}
+    last = None
+    for line in lines[1:]:
+        if line[:1] in (' ', '\t'):
+            # Folded continuation of the previous header
+            if last:
+                headers[last] += ' ' + line.strip()
+            continue
+        name, sep, value = line.partition(':')
+        last = None
+        if not sep:
+            continue
+        name = name.strip().lower()
+        name = COMPACT_HEADERS.get(name, name)
+        if name in names and name not in headers:
+            headers[name] = value.strip()
+            last = name
+    return headers
+
+
+def header_params(header):
+    """Return the ;-separated parameters of a header as a tuple of (key, value) pairs
+
+    value is None for parameters without '='. The header is split once and
+    each parameter partitioned once; keys are interned. Headers without a
+    tag (To of a REGISTER, access network info) repeat across messages, so
+    their result is cached per header string.
+    """
+    if ';' not in header:
+        return ()
+    params = _param_cache.get(header)
+    if params is not None:
+        return params
+    intern = sys.intern
+    params = []
+    for param in header.split(';')[1:]:
+        key, sep, value = param.partition('=')
+        params.append((intern(key.strip()), value.strip() if sep else None))
+    params = tuple(params)
+    # Tags are unique per dialog; caching tagged headers would only churn the cache
+    if 'tag=' not in header:
+        if len(_param_cache) >= PARAM_CACHE_SIZE:
+            _param_cache.clear()
+        _param_cache[header] = params
+    return params
+
+
+def uri_user(header):
+    """User part of the URI in a To/From header ('+15550001' for <sip:+15550001@ims.example>), or None"""
+    start = header.find('<')
+    if start >= 0:
+        end = header.find('>', start)
+        uri = header[start + 1:end if end >= 0 else len(header)]
+    else:
+        # addr-spec without angle brackets; header parameters follow the first ';'
+        uri = header.split(';', 1)[0].strip()
+    scheme, sep, rest = uri.partition(':')
+    if not sep or scheme.lower() not in ('sip', 'sips', 'tel'):
+        return None
+    user = rest.split('@', 1)[0] if '@' in rest or scheme.lower() == 'tel' else None
+    if not user:
+        return None
+    # URI parameters (;user=phone, ;phone-context=...) are not part of the user
+    return user.split(';', 1)[0] or None
+
+
+def access_type(network_info):
+    """Access type named at the start of a P-Access-Network-Info value, interned"""
+    end = network_info.find(';')
+    return sys.intern((network_info if end < 0 else network_info[:end]).strip())
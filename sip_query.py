@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+from datetime import datetime
+from sip_store import QUERY_COLUMNS, MessageStore
+
+# Process exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_NO_MATCHES = 3
+
+TIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d')
+
+
+def parse_time(text):
+    """Epoch seconds for a local 'YYYY-MM-DD[ HH:MM[:SS]]' time"""
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"invalid time '{text}' (expected YYYY-MM-DD[ HH:MM[:SS]])")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Look up REGISTER/INVITE messages in a message store filled by sip_cli.py --store."
+    )
+    parser.add_argument('store', help="SQLite message store")
+    parser.add_argument('-u', '--user', help="To or From user, e.g. +15550001234")
+    parser.add_argument('-c', '--cell', help="utran-cell-id-3gpp value")
+    parser.add_argument('-i', '--call-id', help="Call-ID")
+    parser.add_argument('-m', '--method', choices=('REGISTER', 'INVITE'))
+    parser.add_argument('--since', type=parse_time, help="local time, YYYY-MM-DD[ HH:MM[:SS]]")
+    parser.add_argument('--until', type=parse_time, help="local time, YYYY-MM-DD[ HH:MM[:SS]] (exclusive)")
+    parser.add_argument('-n', '--limit', type=int, help="at most this many rows")
+    parser.add_argument('--count', action='store_true', help="print only the number of matching messages")
+    return parser
+
+
+def main(argv=None):
+    """Print the matching messages as tab-separated rows and return the process exit code"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.store):
+        print(f"error: message store '{args.store}' does not exist", file=sys.stderr)
+        return EXIT_USAGE
+
+    filters = {'user': args.user, 'cell': args.cell, 'call_id': args.call_id, 'method': args.method,
+               'since': args.since, 'until': args.until}
+    store = MessageStore(args.store)
+    try:
+        if args.count:
+            matches = store.count(**filters)
+            print(matches)
+        else:
+            matches = 0
+            print('\t'.join(QUERY_COLUMNS))
+            for row in store.query(limit=args.limit, **filters):
+                matches += 1
+                timestamp = datetime.fromtimestamp(row[0]).isoformat(' ', 'microseconds')
+                print('\t'.join([timestamp] + ['' if value is None else str(value) for value in row[1:]]))
+    except BrokenPipeError:
+        # Output piped into head and the like; stop quietly
+        sys.stderr.close()
+        return EXIT_OK
+    except Exception as e:
+        print(f"An error occurred: {str(e)}", file=sys.stderr)
+        return EXIT_FAILED
+    finally:
+        store.close()
+    return EXIT_OK if matches else EXIT_NO_MATCHES
+
+
+if __name__ == "__main__":
+    sys.exit(main())
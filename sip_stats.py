@@ -0,0 +1,157 @@
+from array import array
+from datetime import datetime
+from sip_parser import access_type, header_params
+
+# REGISTER/INVITE messages collected before a batch is counted
+STATS_BATCH_SIZE = 65536
+
+# Entries listed for the longer histograms (cells, busiest minutes)
+STATS_TOP_N = 10
+
+# Parameter carrying the cell identity in P-Access-Network-Info / Cellular-Network-Info
+CELL_ID_PARAM = 'utran-cell-id-3gpp'
+
+# Histograms kept per analysis, each a {value: count} dict
+STATS_HISTOGRAMS = (
+    'pani_access_types',  # access type named in P-Access-Network-Info
+    'cni_access_types',   # access type named in Cellular-Network-Info
+    'cells',              # utran-cell-id-3gpp from either header
+    'minutes',            # messages per minute, 'YYYY-MM-DD HH:MM' local time
+)
+
+
+def empty_stats():
+    return {name: {} for name in STATS_HISTOGRAMS}
+
+
+def merge_stats(totals, stats):
+    """Add the histograms of stats to totals in place and return totals"""
+    for name in STATS_HISTOGRAMS:
+        histogram = totals[name]
+        for key, count in stats[name].items():
+            histogram[key] = histogram.get(key, 0) + count
+    return totals
+
+
+def top_entries(histogram, n=STATS_TOP_N):
+    """The n largest (key, count) entries, ties in key order"""
+    return sorted(histogram.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+
+def cell_id(network_info):
+    """utran-cell-id-3gpp value of a P-Access-Network-Info / Cellular-Network-Info header, or ''"""
+    if CELL_ID_PARAM not in network_info.lower():
+        return ''
+    for key, value in header_params(network_info):
+        if value and key.lower() == CELL_ID_PARAM:
+            return value
+    return ''
+
+
+def format_stats(stats, all_minutes=True):
+    """Text block for the access network statistics of a report or run summary
+
+    all_minutes lists every minute in time order; otherwise only the
+    busiest STATS_TOP_N minutes are shown.
+    """
+    lines = ["\nAccess Network Statistics:\n"]
+    for name, label in (('pani_access_types', "P-Access-Network-Info"),
+                        ('cni_access_types', "Cellular-Network-Info")):
+        lines.append(f"Access Types in {label}:\n")
+        for key, count in top_entries(stats[name], len(stats[name])):
+            lines.append(f"  {key}: {count}\n")
+    lines.append(f"Top {STATS_TOP_N} Cell IDs ({len(stats['cells'])} seen):\n")
+    for key, count in top_entries(stats['cells']):
+        lines.append(f"  {key}: {count}\n")
+    if all_minutes:
+        lines.append("Messages per Minute:\n")
+        minutes = sorted(stats['minutes'].items())
+    else:
+        lines.append(f"Busiest {STATS_TOP_N} Minutes:\n")
+        minutes = top_entries(stats['minutes'])
+    for key, count in minutes:
+        lines.append(f"  {key}: {count}\n")
+    return ''.join(lines)
+
+
+class StatsCollector:
+    """Access type, cell ID and per-minute histograms of REGISTER/INVITE messages
+
+    add() codes header values to integers; every batch_size messages the
+    codes are counted with np.bincount. stats seeds the histograms.
+    """
+
+    def __init__(self, stats=None, batch_size=STATS_BATCH_SIZE):
+        try:
+            import numpy as np
+        except ImportError:
+            raise RuntimeError("Statistics need numpy (pip install numpy)")
+        self.np = np
+        self.batch_size = batch_size
+        self.stats = merge_stats(empty_stats(), stats) if stats else empty_stats()
+        self._reset()
+
+    def _reset(self):
+        # Codes are per batch, so the value tables stay bounded by batch_size
+        self.times = array('d')
+        self.pani_codes = array('l')
+        self.cni_codes = array('l')
+        self.pani_values = {}
+        self.cni_values = {}
+
+    def add(self, message):
+        self.times.append(message.time)
+        pani_values = self.pani_values
+        self.pani_codes.append(pani_values.setdefault(message.pani, len(pani_values)))
+        cni_values = self.cni_values
+        self.cni_codes.append(cni_values.setdefault(message.cni, len(cni_values)))
+        if len(self.times) >= self.batch_size:
+            self.flush()
+
+    def _group(self, name, values, codes, cells):
+        """Count the access types of one header column and return the cell code of each message
+
+        cells maps cell IDs to codes and gets the new ones; messages
+        without a cell ID get -1.
+        """
+        np = self.np
+        histogram = self.stats[name]
+        value_cells = []
+        for value, count in zip(values, np.bincount(np.asarray(codes), minlength=len(values)).tolist()):
+            cell = ''
+            if value:
+                key = access_type(value)
+                histogram[key] = histogram.get(key, 0) + count
+                cell = cell_id(value)
+            value_cells.append(cells.setdefault(cell, len(cells)) if cell else -1)
+        return np.array(value_cells, dtype=np.int64)[np.asarray(codes)]
+
+    def flush(self):
+        """Count the collected batch into the histograms"""
+        if not self.times:
+            return
+        np = self.np
+        cells = {}
+        pani_cells = self._group('pani_access_types', self.pani_values, self.pani_codes, cells)
+        cni_cells = self._group('cni_access_types', self.cni_values, self.cni_codes, cells)
+        # Cell ID from P-Access-Network-Info, else from Cellular-Network-Info
+        message_cells = np.where(pani_cells >= 0, pani_cells, cni_cells)
+        counts = np.bincount(message_cells[message_cells >= 0], minlength=len(cells)).tolist()
+        histogram = self.stats['cells']
+        for cell, count in zip(cells, counts):
+            # Cells only named by headers that lost to P-Access-Network-Info count zero
+            if count:
+                histogram[cell] = histogram.get(cell, 0) + count
+
+        minutes, counts = np.unique(np.floor_divide(np.asarray(self.times), 60).astype(np.int64),
+                                    return_counts=True)
+        histogram = self.stats['minutes']
+        for minute, count in zip(minutes.tolist(), counts.tolist()):
+            label = datetime.fromtimestamp(minute * 60).strftime('%Y-%m-%d %H:%M')
+            histogram[label] = histogram.get(label, 0) + count
+        self._reset()
+
+    def result(self):
+        """Histograms of everything added so far"""
+        self.flush()
+        return self.stats
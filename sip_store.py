@@ -0,0 +1,195 @@
+import os
+import sqlite3
+import time
+from sip_parser import access_type, uri_user
+from sip_stats import cell_id
+
+# Rows inserted per transaction
+STORE_BATCH_SIZE = 10000
+
+# Seconds a writer waits for another process's transaction to finish
+STORE_TIMEOUT = 60
+
+# Columns returned by MessageStore.query, in order
+QUERY_COLUMNS = ('time', 'capture', 'frame', 'method', 'from_user', 'to_user', 'call_id', 'cell_id', 'access_type')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    analyzed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    capture_id INTEGER NOT NULL REFERENCES captures(id),
+    frame INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    time REAL NOT NULL,
+    to_user TEXT,
+    from_user TEXT,
+    call_id TEXT,
+    cell_id TEXT,
+    access_type TEXT,
+    to_header TEXT,
+    from_header TEXT,
+    route TEXT,
+    pani TEXT,
+    cni TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_time ON messages(time);
+CREATE INDEX IF NOT EXISTS messages_to_user ON messages(to_user, time);
+CREATE INDEX IF NOT EXISTS messages_from_user ON messages(from_user, time);
+CREATE INDEX IF NOT EXISTS messages_call_id ON messages(call_id);
+CREATE INDEX IF NOT EXISTS messages_cell_id ON messages(cell_id, time);
+CREATE INDEX IF NOT EXISTS messages_capture ON messages(capture_id, frame);
+"""
+
+
+def connect(path, timeout=STORE_TIMEOUT):
+    """Open (creating if needed) a message store in WAL mode
+
+    WAL lets queries run while analyses insert, and several analysis
+    processes take turns writing their batches.
+    """
+    connection = sqlite3.connect(path, timeout=timeout)
+    connection.execute('PRAGMA journal_mode=WAL')
+    # Durable at each checkpoint rather than at each batch; a crash loses at most the last batches
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class MessageStore:
+    """SQLite database of the REGISTER/INVITE messages of any number of captures
+
+    Each capture is registered once per analysis by begin_capture, which
+    drops the rows of any earlier analysis of the same file, so analyzing
+    a capture again replaces its messages instead of duplicating them.
+    Messages are indexed by time, To/From user, Call-ID and cell ID.
+    """
+
+    def __init__(self, path, timeout=STORE_TIMEOUT):
+        self.path = path
+        self.connection = connect(path, timeout)
+
+    def begin_capture(self, capture_path, name):
+        """Register a capture (replacing earlier rows for it) and return its id"""
+        capture_path = os.path.abspath(capture_path) if os.path.exists(capture_path) else capture_path
+        with self.connection:
+            self._remove(capture_path)
+            cursor = self.connection.execute('INSERT INTO captures (path, name, analyzed_at) VALUES (?, ?, ?)',
+                                             (capture_path, name, time.time()))
+        return cursor.lastrowid
+
+    def remove_capture(self, capture_id):
+        """Drop a capture and its messages, e.g. after a cancelled analysis"""
+        with self.connection:
+            self.connection.execute('DELETE FROM messages WHERE capture_id = ?', (capture_id,))
+            self.connection.execute('DELETE FROM captures WHERE id = ?', (capture_id,))
+
+    def _remove(self, capture_path):
+        row = self.connection.execute('SELECT id FROM captures WHERE path = ?', (capture_path,)).fetchone()
+        if row is not None:
+            self.connection.execute('DELETE FROM messages WHERE capture_id = ?', (row[0],))
+            self.connection.execute('DELETE FROM captures WHERE id = ?', (row[0],))
+
+    @staticmethod
+    def _where(user, cell, call_id, method, since, until):
+        """WHERE clause and parameters for the query filters"""
+        conditions = []
+        params = []
+        if user is not None:
+            conditions.append('(m.to_user = ? OR m.from_user = ?)')
+            params += [user, user]
+        if cell is not None:
+            conditions.append('m.cell_id = ?')
+            params.append(cell)
+        if call_id is not None:
+            conditions.append('m.call_id = ?')
+            params.append(call_id)
+        if method is not None:
+            conditions.append('m.method = ?')
+            params.append(method)
+        if since is not None:
+            conditions.append('m.time >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('m.time < ?')
+            params.append(until)
+        return (' WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+
+    def query(self, user=None, cell=None, call_id=None, method=None, since=None, until=None, limit=None):
+        """Yield QUERY_COLUMNS rows matching every given filter, in time order
+
+        user matches either the To or the From user; since/until are epoch
+        seconds. Each filter is served by one of the indexes.
+        """
+        where, params = self._where(user, cell, call_id, method, since, until)
+        sql = ('SELECT m.time, c.name, m.frame, m.method, m.from_user, m.to_user, m.call_id, m.cell_id, '
+               'm.access_type FROM messages m JOIN captures c ON c.id = m.capture_id' + where + ' ORDER BY m.time')
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        yield from self.connection.execute(sql, params)
+
+    def count(self, user=None, cell=None, call_id=None, method=None, since=None, until=None):
+        """Number of messages matching every given filter"""
+        where, params = self._where(user, cell, call_id, method, since, until)
+        return self.connection.execute('SELECT COUNT(*) FROM messages m' + where, params).fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+
+class StoreWriter:
+    """Insert REGISTER/INVITE messages of one capture into a message store in batched transactions
+
+    Rows are buffered and written STORE_BATCH_SIZE at a time, each batch
+    in one transaction, so the database lock is only held briefly and
+    several processes (files or chunks analyzed in parallel) can write to
+    the same store. In a merged analysis capture_ids maps the source name
+    of each message to the id of its capture instead.
+    """
+
+    def __init__(self, path, capture_id, batch_size=STORE_BATCH_SIZE, capture_ids=None):
+        self.connection = connect(path)
+        self.capture_id = capture_id
+        self.capture_ids = capture_ids
+        self.batch_size = batch_size
+        self.rows = []
+
+    def add(self, message_type, message):
+        to_header = message.to
+        from_header = message.from_
+        pani = message.pani
+        cni = message.cni
+        self.rows.append((
+            self.capture_ids[message.source] if self.capture_ids is not None else self.capture_id,
+            message.frame, message_type, message.time,
+            uri_user(to_header) if to_header is not None else None,
+            uri_user(from_header) if from_header is not None else None,
+            message.call_id,
+            (cell_id(pani) if pani is not None else '') or (cell_id(cni) if cni is not None else '') or None,
+            access_type(pani) if pani is not None else None,
+            to_header, from_header, message.route, pani, cni,
+        ))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        with self.connection:
+            self.connection.executemany('INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                        self.rows)
+        self.rows = []
+
+    def close(self):
+        """Write the remaining rows and close the connection"""
+        if self.connection is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,201 @@
+import ctypes
+import ctypes.util
+import multiprocessing
+import os
+import select
+import struct
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import sip_analyzer
+
+# A capture found by a directory scan is analyzed once its size and mtime
+# have not changed for this many seconds
+STABLE_SECONDS = 5
+
+# Longest wait for new events before finished analyses are collected
+POLL_INTERVAL = 0.5
+
+# Full directory rescans, as a safety net with inotify or as the only
+# source of new files without it
+RESCAN_INTERVAL = 30
+FALLBACK_RESCAN_INTERVAL = 2
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Report files closed after writing in, or moved into, one directory (Linux only)"""
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"Cannot watch '{path}'")
+
+    def read_events(self, timeout):
+        """Wait up to timeout seconds and return the names of finished files
+
+        None in the result means events were lost and the directory should
+        be rescanned.
+        """
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset < len(data):
+            _, mask, _, name_len = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            if mask & IN_Q_OVERFLOW:
+                names.append(None)
+            elif name_len:
+                names.append(os.fsdecode(data[offset:offset + name_len].rstrip(b'\0')))
+            offset += name_len
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+def open_watcher(path):
+    """InotifyWatcher for path, or None where inotify is not available"""
+    if not hasattr(os, 'O_CLOEXEC'):
+        return None
+    try:
+        return InotifyWatcher(path)
+    except (OSError, AttributeError, TypeError):
+        return None
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def watch_directory(input_dir, output_dir, backend='pyshark', workers=1, callback=None, cancel=None,
+                    stable_seconds=STABLE_SECONDS, **options):
+    """Analyze captures as they arrive in input_dir until cancel is set
+
+    New files are picked up from inotify close-after-write / moved-in
+    events where available; files found by a directory scan (at startup,
+    and periodically) wait until they have been stable for stable_seconds.
+    Reports are named as by find_jobs, from the captures in input_dir
+    when the analysis starts, and captures that already have a report at
+    startup are skipped. Each capture goes through extract_sip_info in a
+    pool of at most workers processes; further ready files wait in
+    arrival order.
+
+    callback(file_path, summary, error) runs for every finished capture,
+    with error set to the exception if the analysis failed. options are
+    passed on to extract_sip_info (chunks, prefilter, columnar, stats,
+    transactions, store, tshark_memory, access_rules, dedup).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    watcher = open_watcher(input_dir)
+    rescan_interval = RESCAN_INTERVAL if watcher is not None else FALLBACK_RESCAN_INTERVAL
+
+    claimed = {}     # path -> signature of the version queued for analysis
+    candidates = {}  # path -> (signature, time it was first seen with it)
+    backlog = deque()
+    running = {}
+
+    def reports():
+        # Named as find_jobs would, so captures sharing a stem get reports of their own
+        captures = [os.path.join(input_dir, name) for name in os.listdir(input_dir) if sip_analyzer.is_capture(name)]
+        return dict(zip(captures, sip_analyzer.report_paths(captures, output_dir)))
+
+    for path, report in reports().items():
+        if os.path.exists(report):
+            claimed[path] = _file_signature(path)
+
+    def claim(path, signature):
+        claimed[path] = signature
+        candidates.pop(path, None)
+        backlog.append(path)
+
+    def rescan():
+        now = time.monotonic()
+        for name in os.listdir(input_dir):
+            path = os.path.join(input_dir, name)
+            if not sip_analyzer.is_capture(name):
+                continue
+            signature = _file_signature(path)
+            if signature is None or claimed.get(path) == signature:
+                continue
+            seen = candidates.get(path)
+            if seen is None or seen[0] != signature:
+                candidates[path] = (signature, now)
+            elif now - seen[1] >= stable_seconds:
+                claim(path, signature)
+
+    worker_cancel = multiprocessing.Event()
+
+    def new_executor():
+        return ProcessPoolExecutor(max_workers=workers, initializer=sip_analyzer._init_worker,
+                                   initargs=(worker_cancel,))
+
+    executor = new_executor()
+    last_scan = None
+    try:
+        while cancel is None or not cancel.is_set():
+            # Pending candidates are rechecked every round until they are stable
+            if candidates or last_scan is None or time.monotonic() - last_scan >= rescan_interval:
+                rescan()
+                last_scan = time.monotonic()
+
+            if watcher is not None:
+                for name in watcher.read_events(POLL_INTERVAL):
+                    if name is None:
+                        last_scan = None
+                        continue
+                    path = os.path.join(input_dir, name)
+                    signature = _file_signature(path)
+                    if (sip_analyzer.is_capture(name) and signature is not None
+                            and claimed.get(path) != signature):
+                        claim(path, signature)
+            else:
+                time.sleep(POLL_INTERVAL)
+
+            broken = False
+            for future in [future for future in running if future.done()]:
+                path = running.pop(future)
+                try:
+                    summary, error = future.result(), None
+                except (Exception, SystemExit) as e:
+                    summary, error = None, e
+                    broken = broken or isinstance(e, BrokenProcessPool)
+                if callback:
+                    callback(path, summary, error)
+            if broken:
+                # A worker died outright; start a fresh pool for the next files
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = new_executor()
+
+            if backlog and len(running) < workers:
+                report_files = reports()
+            while backlog and len(running) < workers:
+                path = backlog.popleft()
+                report = report_files.get(path) or sip_analyzer.report_path(path, output_dir)
+                future = executor.submit(sip_analyzer.extract_sip_info, path, report, backend, False, **options)
+                running[future] = path
+    finally:
+        worker_cancel.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        if watcher is not None:
+            watcher.close()
@@ -0,0 +1,99 @@
+import pytest
+
+from benchmarks.synthetic_pcap import generate
+from sip_access import UNCLASSIFIED, AccessClassifier, empty_access_categories, load_rules, merge_access_categories
+from sip_analyzer import extract_sip_info
+from sip_parser import SipMessage
+
+
+def write_rules(tmp_path, text):
+    path = tmp_path / 'rules.txt'
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_inline_flags_are_scoped_to_their_rule(tmp_path):
+    rules = load_rules(write_rules(tmp_path, 'WLAN re:(?i)wlan|ieee-802\\.11.*\n'
+                                             'LTE  re:(?x) 3GPP-E-UTRAN- (FDD|TDD)  # FDD or TDD\n'
+                                             'NR   3gpp-nr-*\n'))
+    classifier = AccessClassifier(rules)
+    assert classifier.classify('IEEE-802.11n') == 'WLAN'
+    assert classifier.classify('3GPP-E-UTRAN-TDD; utran-cell-id-3gpp=1') == 'LTE'
+    assert classifier.classify('3GPP-NR-FDD') == 'NR'
+
+
+@pytest.mark.parametrize('pattern, message', [
+    (r're:(wlan)-\1', 'numbered group references'),
+    (r're:(wlan)?(?(1)x|y)', 'numbered group references'),
+    (r're:(?P<r0>wlan)', "group name 'r0'"),
+    (r're:(?P<kind>wlan', 'invalid regular expression'),
+    (r're:wlan(?i)', 'invalid regular expression'),
+])
+def test_rejected_patterns(tmp_path, pattern, message):
+    with pytest.raises(ValueError, match=r'rules\.txt:2: ' + message):
+        load_rules(write_rules(tmp_path, f'# comment\nWLAN {pattern}\n'))
+
+
+def test_escaped_backslash_is_not_a_reference(tmp_path):
+    rules = load_rules(write_rules(tmp_path, 'ODD re:a\\\\1\n'))
+    assert AccessClassifier(rules).classify('a\\1') == 'ODD'
+
+
+def test_group_names_must_differ_between_rules(tmp_path):
+    with pytest.raises(ValueError, match=r'rules\.txt:2: '):
+        load_rules(write_rules(tmp_path, 'A re:(?P<kind>wlan)\nB re:(?P<kind>nr)\n'))
+
+
+def test_malformed_rule_files(tmp_path):
+    with pytest.raises(ValueError, match=r"rules\.txt:3: expected 'CATEGORY PATTERN'"):
+        load_rules(write_rules(tmp_path, '# comment\n\nLTE\n'))
+    with pytest.raises(ValueError, match=r'rules\.txt: no rules'):
+        load_rules(write_rules(tmp_path, '# only comments\n\n'))
+
+
+def test_first_matching_rule_wins(tmp_path):
+    rules = load_rules(write_rules(tmp_path, 'FDD  *-fdd\n'
+                                             'LTE  3gpp-e-utran-*\n'
+                                             'NR?  re:3GPP-NR-.D.\n'))
+    assert rules == [('FDD', '*-fdd'), ('LTE', '3gpp-e-utran-*'), ('NR?', 're:3GPP-NR-.D.')]
+    classifier = AccessClassifier(rules)
+    assert classifier.classify('3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=1') == 'FDD'
+    assert classifier.classify('3GPP-E-UTRAN-TDD') == 'LTE'
+    assert classifier.classify('3gpp-nr-tdd') == 'NR?'
+    # Patterns match the whole access type
+    assert classifier.classify('3GPP-NR-TDD-X') == UNCLASSIFIED
+    assert classifier.classify('IEEE-802.11n') == UNCLASSIFIED
+
+
+def test_counts_per_header(tmp_path):
+    rules = load_rules(write_rules(tmp_path, 'LTE 3gpp-e-utran-*\nNR 3gpp-nr-*\n'))
+    classifier = AccessClassifier(rules)
+    for pani, cni in (('3GPP-E-UTRAN-FDD', '3GPP-NR-FDD'), ('3GPP-NR-TDD', None), (None, '3GPP-E-UTRAN-TDD'),
+                      ('IEEE-802.11n', None), (None, None)):
+        message = SipMessage(1, 'REGISTER')
+        message.pani, message.cni = pani, cni
+        classifier.add(message)
+    counts = classifier.result()
+    assert counts == {'pani': {'LTE': 1, 'NR': 1, UNCLASSIFIED: 1}, 'cni': {'NR': 1, 'LTE': 1}}
+    # Counts to start from are copied, not updated in place
+    resumed = AccessClassifier(rules, counts)
+    assert resumed.result() == counts and resumed.result() is not counts
+    totals = merge_access_categories(empty_access_categories(), counts)
+    assert merge_access_categories(totals, counts) == {'pani': {'LTE': 2, 'NR': 2, UNCLASSIFIED: 2},
+                                                       'cni': {'NR': 2, 'LTE': 2}}
+
+
+def test_analysis_counts_categories(tmp_path):
+    capture = tmp_path / 'sip.pcap'
+    expected = generate(str(capture), 20000)
+    rules = load_rules(write_rules(tmp_path, 'LTE 3gpp-e-utran-*\nNR 3gpp-nr-*\n'))
+    sequential = extract_sip_info(str(capture), str(tmp_path / 'sequential.txt'), 'native', progress=False,
+                                  access_rules=rules)
+    chunked = extract_sip_info(str(capture), str(tmp_path / 'chunked.txt'), 'native', progress=False,
+                               access_rules=rules, chunks=4)
+    counts = sequential['access_categories']
+    assert chunked['access_categories'] == counts
+    assert sorted(counts['pani']) == ['LTE', 'NR', UNCLASSIFIED]
+    assert sum(counts['pani'].values()) == expected['pani_register_count'] + expected['pani_invite_count']
+    assert counts['cni'] == {'LTE': expected['cni_register_count'] + expected['cni_invite_count']}
+    assert "Access Network Categories:" in (tmp_path / 'sequential.txt').read_text()
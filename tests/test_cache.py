@@ -0,0 +1,84 @@
+import os
+
+from benchmarks.synthetic_pcap import generate
+from sip_analyzer import analyze_files
+from sip_cache import SUMMARY_NAME, ResultCache
+
+
+def run(tmp_path, cache, **options):
+    jobs = [(str(tmp_path / 'a.pcap'), str(tmp_path / 'a.txt'))]
+    return analyze_files(jobs, backend='native', cache=cache, progress=False, **options)[0]
+
+
+def test_chunk_count_is_part_of_the_key_with_dedup(tmp_path):
+    generate(str(tmp_path / 'a.pcap'), 2000)
+    cache = ResultCache(str(tmp_path / 'cache'))
+    assert 'cached' not in run(tmp_path, cache, dedup=0.05)
+    assert 'cached' not in run(tmp_path, cache, dedup=0.05, chunks=4)
+    assert run(tmp_path, cache, dedup=0.05, chunks=4)['cached']
+    # Without dedup chunking gives the same result, so it may be served from the cache
+    assert 'cached' not in run(tmp_path, cache)
+    assert run(tmp_path, cache, chunks=4)['cached']
+
+
+def test_hit_restores_the_report(tmp_path):
+    generate(str(tmp_path / 'a.pcap'), 2000)
+    cache = ResultCache(str(tmp_path / 'cache'))
+    first = run(tmp_path, cache)
+    report = (tmp_path / 'a.txt').read_text()
+    (tmp_path / 'a.txt').unlink()
+    assert run(tmp_path, cache) == dict(first, cached=True)
+    assert (tmp_path / 'a.txt').read_text() == report
+
+
+def test_changed_capture_or_settings_miss(tmp_path):
+    generate(str(tmp_path / 'a.pcap'), 2000)
+    cache = ResultCache(str(tmp_path / 'cache'))
+    run(tmp_path, cache)
+    assert 'cached' not in run(tmp_path, cache, stats=True)
+    assert run(tmp_path, cache, stats=True)['cached']
+    assert run(tmp_path, cache)['cached']
+    generate(str(tmp_path / 'a.pcap'), 2000, seed=2)
+    assert 'cached' not in run(tmp_path, cache)
+
+
+def test_key_follows_size_mtime_and_content(tmp_path):
+    capture = tmp_path / 'a.pcap'
+    capture.write_bytes(b'x' * 5000)
+    cache = ResultCache(str(tmp_path / 'cache'))
+    key = cache.key(str(capture), {'backend': 'native'})
+    assert cache.key(str(capture), {'backend': 'native'}) == key
+    assert cache.key(str(capture), {'backend': 'pyshark'}) != key
+    stat = capture.stat()
+    capture.write_bytes(b'x' * 2500 + b'y' + b'x' * 2499)
+    os.utime(capture, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.key(str(capture), {'backend': 'native'}) != key
+    capture.write_bytes(b'x' * 5000)
+    os.utime(capture, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cache.key(str(capture), {'backend': 'native'}) != key
+
+
+def test_incomplete_entry_is_a_miss(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    report = tmp_path / 'a.txt'
+    report.write_text('report')
+    cache.put('k', {'total_packets': 1}, {'report': str(report)})
+    assert cache.get('k', {'report': str(tmp_path / 'b.txt')}) == {'total_packets': 1}
+    assert cache.get('k', {'report': str(report), 'columnar': str(tmp_path / 'a.parquet')}) is None
+    (tmp_path / 'cache' / 'k' / SUMMARY_NAME).write_text('{')
+    assert cache.get('k', {'report': str(report)}) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=2500)
+    report = tmp_path / 'a.txt'
+    report.write_text('x' * 1000)
+    outputs = {'report': str(report)}
+    for number, key in enumerate(('old', 'used', 'new')):
+        cache.put(key, {}, outputs)
+        os.utime(tmp_path / 'cache' / key, (number, number))
+    assert sorted(os.listdir(tmp_path / 'cache')) == ['new', 'used']
+    # Serving an entry makes it the most recently used
+    assert cache.get('used', outputs) == {}
+    cache.put('newest', {}, outputs)
+    assert sorted(os.listdir(tmp_path / 'cache')) == ['newest', 'used']
@@ -0,0 +1,102 @@
+import os
+import time
+
+import pytest
+
+import sip_analyzer
+from benchmarks.synthetic_pcap import BASE_TIME, generate
+from sip_checkpoint import Checkpoint
+
+
+def report(path):
+    # Everything but the time the report was written
+    return [line for line in open(path).read().splitlines() if not line.startswith('Analysis Date:')]
+
+
+def test_state_is_only_loaded_for_the_same_capture_and_settings(tmp_path):
+    capture = tmp_path / 'a.pcap'
+    capture.write_bytes(b'\0' * 100)
+    path = str(tmp_path / 'a.txt.checkpoint')
+    Checkpoint(path, str(capture), {'backend': 'native'}).save({'frame': 10})
+    assert Checkpoint(path, str(capture), {'backend': 'native'}).load() == {'frame': 10}
+    assert Checkpoint(path, str(capture), {'backend': 'pyshark'}).load() is None
+    capture.write_bytes(b'\0' * 200)
+    assert Checkpoint(path, str(capture), {'backend': 'native'}).load() is None
+    Checkpoint(path, str(capture), {}).remove()
+    assert not os.path.exists(path)
+
+
+def crash_after(monkeypatch, messages):
+    # Checkpoint after every message, and fail the capture walk after a number of SIP messages
+    monkeypatch.setattr(Checkpoint, 'due', lambda self: True)
+    parse = sip_analyzer._native_message
+    parsed = 0
+
+    def failing(*args):
+        nonlocal parsed
+        parsed += 1
+        if parsed > messages:
+            raise OSError("disk went away")
+        return parse(*args)
+    monkeypatch.setattr(sip_analyzer, '_native_message', failing)
+
+
+def test_resume_after_a_crash(tmp_path, monkeypatch, capsys):
+    capture = str(tmp_path / 'a.pcap')
+    generate(capture, 3000)
+    clean = sip_analyzer.extract_sip_info(capture, str(tmp_path / 'clean.txt'), 'native', progress=False, stats=True)
+
+    output_file = str(tmp_path / 'a.txt')
+    with monkeypatch.context() as patch:
+        crash_after(patch, 1000)
+        with pytest.raises(SystemExit):
+            sip_analyzer.extract_sip_info(capture, output_file, 'native', progress=False, stats=True)
+    assert os.path.exists(output_file + '.checkpoint')
+    assert not os.path.exists(output_file)
+
+    resumed = sip_analyzer.extract_sip_info(capture, output_file, 'native', progress=False, stats=True)
+    assert "Resuming after frame" in capsys.readouterr().out
+    assert resumed == clean
+    assert report(output_file) == report(str(tmp_path / 'clean.txt'))
+    assert not os.path.exists(output_file + '.checkpoint')
+    assert not os.path.exists(output_file + '.temp')
+
+
+def test_resume_chunks_after_a_crash(tmp_path, monkeypatch, capsys):
+    capture = str(tmp_path / 'a.pcap')
+    generate(capture, 3000)
+    clean = sip_analyzer.extract_sip_info(capture, str(tmp_path / 'clean.txt'), 'native', progress=False)
+
+    output_file = str(tmp_path / 'a.txt')
+    parse = sip_analyzer._native_message
+
+    def failing(number, timestamp, *args):
+        # Only the last chunk fails, once the others have had time to finish
+        if timestamp > BASE_TIME + 2.9:
+            time.sleep(1)
+            raise OSError("disk went away")
+        return parse(number, timestamp, *args)
+    with monkeypatch.context() as patch:
+        # The pool is forked with the patch in place
+        patch.setattr(sip_analyzer, '_native_message', failing)
+        with pytest.raises(SystemExit):
+            sip_analyzer.extract_sip_info(capture, output_file, 'native', progress=False, chunks=4)
+    assert os.path.exists(output_file + '.checkpoint')
+
+    resumed = sip_analyzer.extract_sip_info(capture, output_file, 'native', progress=False, chunks=4)
+    assert "Resuming: 3 of 4 chunk(s) already analyzed" in capsys.readouterr().out
+    assert resumed == clean
+    assert report(output_file) == report(str(tmp_path / 'clean.txt'))
+    assert sorted(os.listdir(tmp_path)) == ['a.pcap', 'a.txt', 'clean.txt']
+
+
+def test_settings_change_starts_over(tmp_path, monkeypatch, capsys):
+    capture = str(tmp_path / 'a.pcap')
+    generate(capture, 3000)
+    output_file = str(tmp_path / 'a.txt')
+    with monkeypatch.context() as patch:
+        crash_after(patch, 1000)
+        with pytest.raises(SystemExit):
+            sip_analyzer.extract_sip_info(capture, output_file, 'native', progress=False)
+    sip_analyzer.extract_sip_info(capture, output_file, 'native', progress=False, stats=True)
+    assert "Resuming" not in capsys.readouterr().out
@@ -0,0 +1,36 @@
+import sqlite3
+
+from benchmarks.synthetic_pcap import generate
+from sip_analyzer import extract_sip_info
+
+
+def report(path):
+    # Everything but the time the report was written
+    return [line for line in path.read_text().splitlines() if not line.startswith('Analysis Date:')]
+
+
+def test_multi_section_capture_falls_back_to_one_pass(tmp_path, capsys):
+    first, second = tmp_path / 'a.pcapng', tmp_path / 'b.pcapng'
+    generate(str(first), 2000, seed=1, capture_format='pcapng')
+    generate(str(second), 2000, seed=2, capture_format='pcapng')
+    capture = tmp_path / 'both.pcapng'
+    capture.write_bytes(first.read_bytes() + second.read_bytes())
+    db = str(tmp_path / 'store.db')
+
+    sequential = extract_sip_info(str(capture), str(tmp_path / 'sequential.txt'), 'native', progress=False)
+    chunked = extract_sip_info(str(capture), str(tmp_path / 'chunked.txt'), 'native', progress=False, chunks=4)
+    # With a store the chunks are walked to count their frames before anything is stored
+    stored = extract_sip_info(str(capture), str(tmp_path / 'stored.txt'), 'native', progress=False, chunks=4,
+                              store=db)
+    assert capsys.readouterr().out.count("Chunking skipped") == 2
+    assert chunked == stored == sequential
+    for name in ('chunked.txt', 'stored.txt'):
+        assert report(tmp_path / name) == report(tmp_path / 'sequential.txt')
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'a.pcapng', 'b.pcapng', 'both.pcapng', 'chunked.txt', 'sequential.txt', 'store.db', 'stored.txt']
+    connection = sqlite3.connect(db)
+    try:
+        count, frames = connection.execute('SELECT COUNT(*), COUNT(DISTINCT frame) FROM messages').fetchone()
+    finally:
+        connection.close()
+    assert count == frames == chunked['register_count'] + chunked['invite_count']
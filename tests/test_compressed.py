@@ -0,0 +1,37 @@
+import gzip
+
+import pytest
+
+from benchmarks.synthetic_pcap import generate
+from sip_analyzer import extract_sip_info
+
+
+def report(path):
+    # Everything but the time the report was written and the input name
+    return [line for line in open(path).read().splitlines()
+            if not line.startswith(('Analysis Date:', 'Input File:'))]
+
+
+def compress(path, extension):
+    data = path.read_bytes()
+    target = path.with_name(path.name + extension)
+    if extension == '.gz':
+        target.write_bytes(gzip.compress(data))
+    else:
+        zstandard = pytest.importorskip('zstandard')
+        target.write_bytes(zstandard.ZstdCompressor().compress(data))
+    return target
+
+
+@pytest.mark.parametrize('extension', ['.gz', '.zst'])
+@pytest.mark.parametrize('capture_format', ['pcap', 'pcapng'])
+def test_compressed_capture_matches_plain(tmp_path, capture_format, extension):
+    capture = tmp_path / ('a.' + capture_format)
+    generate(str(capture), 2000, capture_format=capture_format)
+    compressed = compress(capture, extension)
+    plain = extract_sip_info(str(capture), str(tmp_path / 'plain.txt'), 'native', progress=False, stats=True)
+    # Chunks need random access, so a compressed capture is read in one pass
+    streamed = extract_sip_info(str(compressed), str(tmp_path / 'streamed.txt'), 'native', progress=False,
+                                stats=True, chunks=4)
+    assert streamed == {**plain, 'file': compressed.name}
+    assert report(tmp_path / 'streamed.txt') == report(tmp_path / 'plain.txt')
@@ -0,0 +1,46 @@
+from sip_dedup import Deduplicator
+
+INVITE = b'INVITE sip:+15550001234@ims.example.com SIP/2.0\r\nCall-ID: a84b4c76e66710\r\n\r\n'
+BYE = b'BYE sip:+15550001234@ims.example.com SIP/2.0\r\nCall-ID: a84b4c76e66710\r\n\r\n'
+
+
+def test_copies_within_window():
+    dedup = Deduplicator(window=0.05)
+    assert not dedup.is_duplicate(100.0, INVITE)
+    assert dedup.is_duplicate(100.0002, INVITE)
+    assert not dedup.is_duplicate(100.0003, BYE)
+    # Taps are not in lockstep: a copy may carry an earlier timestamp
+    assert dedup.is_duplicate(99.999, BYE)
+    assert dedup.dropped == 2
+
+
+def test_retransmission_outside_window():
+    dedup = Deduplicator(window=0.05)
+    assert not dedup.is_duplicate(100.0, INVITE)
+    # A UDP retransmission after T1 is a message of its own
+    assert not dedup.is_duplicate(100.5, INVITE)
+    assert dedup.is_duplicate(100.52, INVITE)
+    assert dedup.dropped == 1
+
+
+def test_entries_leave_the_window():
+    dedup = Deduplicator(window=0.05)
+    for number in range(100):
+        dedup.is_duplicate(100.0 + number * 0.01, b'OPTIONS %d' % number)
+    assert len(dedup._seen) <= 6
+
+
+def test_max_entries():
+    dedup = Deduplicator(window=10, max_entries=2)
+    for payload in (INVITE, BYE, b'ACK'):
+        assert not dedup.is_duplicate(100.0, payload)
+    # INVITE was forgotten early to stay within max_entries
+    assert not dedup.is_duplicate(100.0, INVITE)
+    assert dedup.is_duplicate(100.0, b'ACK')
+
+
+def test_dropped_continues_when_resuming():
+    dedup = Deduplicator(dropped=7)
+    dedup.is_duplicate(100.0, INVITE)
+    dedup.is_duplicate(100.0, INVITE)
+    assert dedup.dropped == 8
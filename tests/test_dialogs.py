@@ -0,0 +1,89 @@
+from sip_dialogs import TRANSACTION_COLUMNS, TransactionCorrelator
+from sip_parser import SipMessage
+
+
+def request(frame, time, method='INVITE', call_id='call-1', cseq=1):
+    message = SipMessage(frame, method)
+    message.time = time
+    message.call_id = call_id
+    message.cseq = cseq
+    return message
+
+
+def response(frame, time, status, method='INVITE', call_id='call-1', cseq=1):
+    message = SipMessage(frame)
+    message.time = time
+    message.call_id = call_id
+    message.cseq = cseq
+    message.cseq_method = method
+    message.status = status
+    return message
+
+
+def test_timeout_advances_on_responses():
+    correlator = TransactionCorrelator(timeout=10)
+    correlator.add(request(1, 100.0, call_id='lost'))
+    # Only responses of other transactions follow
+    for frame in range(2, 30):
+        correlator.add(response(frame, 100.0 + frame, 401, method='REGISTER', call_id=f'other-{frame}'))
+    assert not correlator.table
+    stats = correlator.result()
+    assert stats['counters']['timed_out'] == 1
+    assert stats['counters']['unfinished'] == 0
+
+
+def test_invite_latencies():
+    correlator = TransactionCorrelator()
+    correlator.add(request(1, 100.0))
+    correlator.add(response(2, 100.010, 100))
+    correlator.add(response(3, 100.150, 180))
+    correlator.add(response(4, 100.200, 183))
+    # A retransmitted INVITE does not restart the clock
+    correlator.add(request(5, 100.500))
+    correlator.add(response(6, 102.000, 200))
+    stats = correlator.result()
+    assert stats['counters']['invite_transactions'] == 1
+    assert stats['counters']['invite_answered'] == 1
+    assert stats['latency']['invite_ringing'] == {'150': 1}
+    assert stats['latency']['invite_answer'] == {'2000': 1}
+
+
+def test_register_outcomes():
+    correlator = TransactionCorrelator()
+    correlator.add(request(1, 100.0, 'REGISTER', cseq=1))
+    correlator.add(response(2, 100.040, 401, 'REGISTER', cseq=1))
+    correlator.add(request(3, 100.100, 'REGISTER', cseq=2))
+    correlator.add(response(4, 100.130, 200, 'REGISTER', cseq=2))
+    # Answered already, and a response to a request never seen
+    correlator.add(response(5, 100.140, 200, 'REGISTER', cseq=2))
+    correlator.add(response(6, 100.150, 200, 'REGISTER', call_id='call-2'))
+    counters = correlator.result()['counters']
+    assert counters['register_transactions'] == 2
+    assert counters['register_challenged'] == 1
+    assert counters['register_ok'] == 1
+    assert counters['unmatched_responses'] == 2
+    assert correlator.stats['latency']['register'] == {'40': 1, '30': 1}
+
+
+def test_table_size_bounds_open_transactions():
+    correlator = TransactionCorrelator(max_transactions=2)
+    for frame in range(1, 5):
+        correlator.add(request(frame, 100.0 + frame, call_id=f'call-{frame}'))
+    assert list(correlator.table) == [('call-3', 1, 'INVITE'), ('call-4', 1, 'INVITE')]
+    counters = correlator.result()['counters']
+    assert counters['evicted'] == 2
+    assert counters['unfinished'] == 2
+    assert counters['invite_transactions'] == 4
+
+
+def test_records(tmp_path):
+    path = tmp_path / 'transactions.csv'
+    correlator = TransactionCorrelator(str(path))
+    correlator.add(request(1, 100.0))
+    correlator.add(response(2, 100.25, 486))
+    correlator.result()
+    correlator.close()
+    header, row = path.read_text(encoding='utf-8').splitlines()
+    assert header.split(',') == list(TRANSACTION_COLUMNS)
+    assert row.split(',')[:4] == ['call-1', 'INVITE', '1', '1']
+    assert row.split(',')[5:] == ['', '', '486', '250', 'failed']
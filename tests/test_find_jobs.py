@@ -0,0 +1,22 @@
+import os
+
+from sip_analyzer import find_jobs, report_paths
+
+
+def test_compressed_and_pcapng_captures(tmp_path):
+    for name in ('a.pcap', 'b.pcapng.gz', 'c.CAP.zst', 'notes.txt', '.pcap'):
+        (tmp_path / name).write_bytes(b'')
+    jobs = find_jobs(str(tmp_path), 'out')
+    assert [(os.path.basename(capture), report) for capture, report in jobs] == [
+        ('a.pcap', os.path.join('out', 'a.txt')),
+        ('b.pcapng.gz', os.path.join('out', 'b.txt')),
+        ('c.CAP.zst', os.path.join('out', 'c.txt')),
+    ]
+
+
+def test_shared_stems_keep_the_full_name():
+    assert report_paths(['in/trace.pcap', 'in/trace.pcapng.gz', 'in/other.pcap'], 'out') == [
+        os.path.join('out', 'trace.pcap.txt'),
+        os.path.join('out', 'trace.pcapng.gz.txt'),
+        os.path.join('out', 'other.txt'),
+    ]
@@ -0,0 +1,78 @@
+import shutil
+import sqlite3
+import threading
+
+import pytest
+
+from benchmarks.synthetic_pcap import generate
+from sip_analyzer import AnalysisCancelled, iter_merged_messages, iter_native_messages, merge_sip_info
+from sip_dedup import Deduplicator
+
+
+def test_merged_in_timestamp_order(tmp_path):
+    first, second = str(tmp_path / 'a.pcap'), str(tmp_path / 'b.pcapng')
+    generate(first, 500, seed=1)
+    generate(second, 500, seed=2, capture_format='pcapng')
+    merged = list(iter_merged_messages([first, second]))
+    # Each message keeps its capture and its frame number there
+    assert sorted((message.source, message.frame) for message in merged) == sorted(
+        [('a.pcap', message.frame) for message in iter_native_messages(first)]
+        + [('b.pcapng', message.frame) for message in iter_native_messages(second)])
+    # Only REGISTER/INVITE requests carry their time unless transactions are on
+    times = [message.time for message in merged if message.time is not None]
+    assert times == sorted(times)
+
+
+def test_dedup_across_captures(tmp_path):
+    first, copy = str(tmp_path / 'a.pcap'), str(tmp_path / 'copy.pcap')
+    generate(first, 500)
+    shutil.copy(first, copy)
+    dedup = Deduplicator()
+    merged = list(iter_merged_messages([first, copy], dedup=dedup))
+    # Equal timestamps keep capture order, so the first capture's copy is the one kept
+    assert {message.source for message in merged} == {'a.pcap'}
+    assert dedup.dropped == len(merged)
+
+
+def test_store_and_columnar_rows_lead_back_to_their_capture(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    first, second = str(tmp_path / 'a.pcap'), str(tmp_path / 'b.pcap')
+    generate(first, 500, seed=1)
+    generate(second, 500, seed=2)
+    db = str(tmp_path / 'store.db')
+    merge_sip_info([first, second], str(tmp_path / 'merged.txt'), progress=False, store=db, columnar='parquet')
+    connection = sqlite3.connect(db)
+    try:
+        rows = connection.execute('SELECT c.name, m.frame, m.time FROM messages m '
+                                  'JOIN captures c ON c.id = m.capture_id ORDER BY c.name, m.frame').fetchall()
+    finally:
+        connection.close()
+    expected = [('a.pcap', message.frame, message.time) for message in iter_native_messages(first)
+                if message.method in ('REGISTER', 'INVITE')]
+    expected += [('b.pcap', message.frame, message.time) for message in iter_native_messages(second)
+                 if message.method in ('REGISTER', 'INVITE')]
+    assert rows == expected
+    files = pq.read_table(str(tmp_path / 'merged.parquet'), columns=['file']).column('file').to_pylist()
+    assert sorted(files) == [name for name, _, _ in expected]
+
+
+def test_cancelled_merge_leaves_no_output(tmp_path):
+    pytest.importorskip('pyarrow')
+    first, second = str(tmp_path / 'a.pcap'), str(tmp_path / 'b.pcap')
+    generate(first, 3000, seed=1)
+    generate(second, 3000, seed=2)
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    db = str(tmp_path / 'store.db')
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(AnalysisCancelled):
+        merge_sip_info([first, second], str(output_dir / 'merged.txt'), progress=False, cancel=cancel,
+                       columnar='parquet', transactions=1000, store=db)
+    assert list(output_dir.iterdir()) == []
+    connection = sqlite3.connect(db)
+    try:
+        assert connection.execute('SELECT COUNT(*) FROM messages').fetchone()[0] == 0
+        assert connection.execute('SELECT COUNT(*) FROM captures').fetchone()[0] == 0
+    finally:
+        connection.close()
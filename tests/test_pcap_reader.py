@@ -0,0 +1,72 @@
+import struct
+
+import pytest
+
+from benchmarks.synthetic_pcap import _pcapng_writer, generate, udp_frame
+from pcap_reader import MultiSectionCapture, iter_records, split_capture
+
+
+@pytest.fixture(params=['pcap', 'pcapng'])
+def capture(request, tmp_path):
+    path = tmp_path / ('sip.' + request.param)
+    generate(str(path), 2000, capture_format=request.param)
+    return path.read_bytes()
+
+
+def test_no_split(capture):
+    assert split_capture(capture, 1) == [(None, None)]
+    assert split_capture(b'', 4) == [(None, None)]
+
+
+@pytest.mark.parametrize('chunks', [2, 3, 7, 16])
+def test_chunks_cover_every_frame_once(capture, chunks):
+    frames = [(offset, caplen) for _, _, _, offset, caplen in iter_records(capture)]
+    ranges = split_capture(capture, chunks)
+    assert len(ranges) == chunks
+    assert ranges[-1][1] == len(capture)
+    # Contiguous, and each split point moved forward to the start of a record
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+    walked = []
+    for start, end in ranges:
+        records = list(iter_records(capture, start, end))
+        assert records[0][0] == 1
+        walked.extend((offset, caplen) for _, _, _, offset, caplen in records)
+    assert walked == frames
+
+
+def test_resync_skips_decoy_headers():
+    # Every payload opens with a plausible record header that leads into bytes no header can start with
+    decoy = struct.pack('<IIII', 1700000000, 0, 100, 100) + b'\xff' * 184
+    records = [struct.pack('<IIII', 1700000000 + number, 0, len(decoy), len(decoy)) + decoy for number in range(64)]
+    buf = struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1) + b''.join(records)
+    record_size = len(records[0])
+    for start, end in split_capture(buf, 5):
+        assert (start - 24) % record_size == 0
+        assert all(caplen == len(decoy) for _, _, _, _, caplen in iter_records(buf, start, end))
+    assert sum(len(list(iter_records(buf, start, end))) for start, end in split_capture(buf, 5)) == 64
+
+
+def test_section_header_bytes_in_packet_data(tmp_path):
+    # Frames carrying what looks like a pcapng section header do not stop the split
+    path = tmp_path / 'shb.pcapng'
+    with open(path, 'wb') as f:
+        write = _pcapng_writer(f)
+        for number in range(400):
+            write(1700000000 + number / 1000, udp_frame(b'\x0a\x0d\x0d\x0a\x1c\x00\x00\x00\x4d\x3c\x2b\x1a' * 8))
+    buf = path.read_bytes()
+    ranges = split_capture(buf, 4)
+    assert len(ranges) == 4
+    assert sum(len(list(iter_records(buf, start, end))) for start, end in ranges) == 400
+
+
+def test_chunks_of_a_multi_section_capture(tmp_path):
+    first, second = tmp_path / 'a.pcapng', tmp_path / 'b.pcapng'
+    generate(str(first), 500, seed=1, capture_format='pcapng')
+    generate(str(second), 500, seed=2, capture_format='pcapng')
+    buf = first.read_bytes() + second.read_bytes()
+    assert len(list(iter_records(buf))) == 1000
+    ranges = split_capture(buf, 4)
+    with pytest.raises(MultiSectionCapture):
+        for start, end in ranges:
+            list(iter_records(buf, start, end))
@@ -0,0 +1,55 @@
+import pytest
+
+objectify = pytest.importorskip('lxml.objectify')
+xml_layer = pytest.importorskip('pyshark.packet.layers.xml_layer')
+
+from sip_analyzer import _pyshark_message
+
+# SIP layer of a REGISTER as tshark -T pdml prints it
+REGISTER_PDML = b'''<proto name="sip" showname="Session Initiation Protocol (REGISTER)">
+  <field name="sip.Request-Line" showname="Request-Line: REGISTER sip:ims.example.com SIP/2.0"
+         show="REGISTER sip:ims.example.com SIP/2.0" value=""/>
+  <field name="sip.Method" showname="Method: REGISTER" show="REGISTER" value=""/>
+  <field name="sip.To" showname="To: &lt;sip:+15550001234@ims.example.com&gt;"
+         show="&lt;sip:+15550001234@ims.example.com&gt;" value=""/>
+  <field name="sip.From" showname="From: &lt;sip:+15550001234@ims.example.com&gt;;tag=4711"
+         show="&lt;sip:+15550001234@ims.example.com&gt;;tag=4711" value=""/>
+  <field name="sip.Call-ID" showname="Call-ID: a84b4c76e66710@ue.example.com"
+         show="a84b4c76e66710@ue.example.com" value=""/>
+  <field name="sip.P-Access-Network-Info"
+         showname="P-Access-Network-Info: 3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=310410000ABC123"
+         show="3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=310410000ABC123" value=""/>
+  <field name="sip.CSeq.seq" showname="Sequence Number: 1" show="1" value=""/>
+  <field name="sip.CSeq.method" showname="Method: REGISTER" show="REGISTER" value=""/>
+</proto>'''
+
+
+class FakePacket:
+    """The parts of a pyshark packet _pyshark_message reads"""
+
+    number = '12'
+    sniff_timestamp = '1700000000.123456'
+
+    def __init__(self, pdml):
+        self.sip = xml_layer.XmlLayer(objectify.fromstring(pdml))
+
+    def __contains__(self, layer):
+        return layer == 'SIP'
+
+
+def test_register_headers():
+    message = _pyshark_message(FakePacket(REGISTER_PDML))
+    assert message.frame == 12
+    assert message.method == 'REGISTER'
+    assert message.time == 1700000000.123456
+    assert message.to == '<sip:+15550001234@ims.example.com>'
+    assert message.from_ == '<sip:+15550001234@ims.example.com>;tag=4711'
+    assert message.pani == '3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=310410000ABC123'
+    assert message.route is None
+    assert message.cni is None
+    assert message.call_id == 'a84b4c76e66710@ue.example.com'
+
+
+def test_register_transaction_fields():
+    message = _pyshark_message(FakePacket(REGISTER_PDML), transactions=True)
+    assert (message.cseq, message.cseq_method, message.status) == (1, 'REGISTER', None)
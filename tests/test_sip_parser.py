@@ -0,0 +1,76 @@
+from sip_parser import access_type, header_params, parse_cseq, parse_headers, request_method, response_status, uri_user
+
+REGISTER = (
+    b'REGISTER sip:ims.example.com SIP/2.0\r\n'
+    b'Via: SIP/2.0/UDP 10.0.0.1:5060;branch=z9hG4bK776asdhds\r\n'
+    b't: <sip:+15550001234@ims.example.com>\r\n'
+    b'From: <sip:+15550001234@ims.example.com>;tag=4711\r\n'
+    b'Route: <sip:pcscf1.ims.example.com;lr>,\r\n'
+    b' <sip:scscf.ims.example.com;lr>\r\n'
+    b'P-Access-Network-Info: 3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=310410000ABC123\r\n'
+    b'Route: <sip:ignored.example.com;lr>\r\n'
+    b'i: a84b4c76e66710@ue.example.com\r\n'
+    b'CSeq: 7 REGISTER\r\n'
+    b'l: 14\r\n'
+    b'\r\n'
+    b'To: not-a-header'
+)
+
+
+def test_request_method():
+    assert request_method(REGISTER) == (True, 'REGISTER')
+    assert request_method(b'SIP/2.0 200 OK\r\n') == (True, None)
+    assert request_method(b'GET / HTTP/1.1\r\n') == (False, None)
+    assert request_method(b'\x80\x00\x12\x34') == (False, None)
+
+
+def test_response_status():
+    assert response_status(b'SIP/2.0 401 Unauthorized\r\n') == 401
+
+
+def test_parse_cseq():
+    assert parse_cseq('7 REGISTER') == (7, 'REGISTER')
+    assert parse_cseq(None) == (None, None)
+
+
+def test_parse_headers():
+    headers = parse_headers(REGISTER, {'to', 'from', 'route', 'p-access-network-info', 'call-id',
+                                       'cellular-network-info'})
+    # Compact forms map to their full names
+    assert headers['to'] == '<sip:+15550001234@ims.example.com>'
+    assert headers['call-id'] == 'a84b4c76e66710@ue.example.com'
+    assert headers['from'] == '<sip:+15550001234@ims.example.com>;tag=4711'
+    # Folded lines are joined, and only the first occurrence counts
+    assert headers['route'] == '<sip:pcscf1.ims.example.com;lr>, <sip:scscf.ims.example.com;lr>'
+    assert headers['p-access-network-info'] == '3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=310410000ABC123'
+    # Missing headers are absent, and the body is not parsed
+    assert 'cellular-network-info' not in headers
+    assert parse_headers(REGISTER, {'to'}) == {'to': '<sip:+15550001234@ims.example.com>'}
+
+
+def test_parse_headers_without_body_separator():
+    assert parse_headers(b'INVITE sip:x SIP/2.0\r\nTo: <sip:a@b>', {'to'}) == {'to': '<sip:a@b>'}
+
+
+def test_header_params():
+    assert header_params('<sip:+15550001234@ims.example.com>') == ()
+    assert header_params('<sip:a@b>;tag=4711;lr') == (('tag', '4711'), ('lr', None))
+    pani = '3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=310410000ABC123'
+    assert header_params(pani) == (('utran-cell-id-3gpp', '310410000ABC123'),)
+    # Untagged headers come from the cache the second time
+    assert header_params(pani) is header_params(pani)
+
+
+def test_uri_user():
+    assert uri_user('<sip:+15550001234@ims.example.com>;tag=1') == '+15550001234'
+    assert uri_user('"Alice" <sips:alice@example.com>') == 'alice'
+    assert uri_user('sip:bob@example.com;tag=2') == 'bob'
+    assert uri_user('<sip:+15550001234;phone-context=ims.example.com@ims.example.com;user=phone>') == '+15550001234'
+    assert uri_user('<tel:+15550001234>') == '+15550001234'
+    assert uri_user('<sip:ims.example.com>') is None
+    assert uri_user('<http://example.com>') is None
+
+
+def test_access_type():
+    assert access_type('3GPP-NR-FDD; nrcgi=001010000123456789') == '3GPP-NR-FDD'
+    assert access_type('IEEE-802.11') == 'IEEE-802.11'
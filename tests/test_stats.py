@@ -0,0 +1,98 @@
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from benchmarks.synthetic_pcap import BASE_TIME, generate
+from sip_analyzer import extract_sip_info
+from sip_parser import SipMessage
+from sip_stats import StatsCollector, cell_id, empty_stats, format_stats, merge_stats
+
+
+def message(time, pani=None, cni=None):
+    result = SipMessage(1, 'REGISTER')
+    result.time = time
+    result.pani = pani
+    result.cni = cni
+    return result
+
+
+def minute(time):
+    return datetime.fromtimestamp(time // 60 * 60).strftime('%Y-%m-%d %H:%M')
+
+
+MESSAGES = [
+    message(BASE_TIME, pani='3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=A1',
+            cni='3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=B1'),
+    message(BASE_TIME + 1, pani='3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=A1'),
+    message(BASE_TIME + 2, cni='3GPP-NR-FDD;Utran-Cell-Id-3gpp=B2;cell-info-age=4'),
+    message(BASE_TIME + 90, pani='IEEE-802.11n'),
+    message(BASE_TIME + 91),
+]
+
+
+def test_cell_id():
+    assert cell_id('3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=310410000000ABC') == '310410000000ABC'
+    assert cell_id('IEEE-802.11n; i-wlan-node-id=ffeeddccbbaa') == ''
+    assert cell_id('3GPP-E-UTRAN-FDD; utran-cell-id-3gpp') == ''
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 1000])
+def test_histograms(batch_size):
+    collector = StatsCollector(batch_size=batch_size)
+    for item in MESSAGES:
+        collector.add(item)
+    assert collector.result() == {
+        'pani_access_types': {'3GPP-E-UTRAN-FDD': 2, 'IEEE-802.11n': 1},
+        'cni_access_types': {'3GPP-E-UTRAN-FDD': 1, '3GPP-NR-FDD': 1},
+        # B1 only appears next to a P-Access-Network-Info cell, which wins
+        'cells': {'A1': 2, 'B2': 1},
+        'minutes': dict(Counter(minute(item.time) for item in MESSAGES)),
+    }
+
+
+def test_seeded_collector_continues_the_counts():
+    whole = StatsCollector()
+    for item in MESSAGES:
+        whole.add(item)
+    first = StatsCollector()
+    for item in MESSAGES[:2]:
+        first.add(item)
+    resumed = StatsCollector(first.result())
+    for item in MESSAGES[2:]:
+        resumed.add(item)
+    assert resumed.result() == whole.result()
+
+
+def test_merge_stats():
+    totals = merge_stats(empty_stats(), {**empty_stats(), 'cells': {'A1': 2}, 'minutes': {'x': 1}})
+    stats = {**empty_stats(), 'cells': {'A1': 1, 'B2': 4}, 'pani_access_types': {'NR': 3}}
+    assert merge_stats(totals, stats) is totals
+    assert totals == {'pani_access_types': {'NR': 3}, 'cni_access_types': {},
+                      'cells': {'A1': 3, 'B2': 4}, 'minutes': {'x': 1}}
+    # The added histograms are left alone
+    assert stats['cells'] == {'A1': 1, 'B2': 4}
+
+
+def test_format_stats_lists_top_entries():
+    stats = {**empty_stats(), 'cells': {f'C{number:02d}': number for number in range(12)},
+             'minutes': {'2023-11-14 22:13': 5, '2023-11-14 22:14': 7}}
+    text = format_stats(stats)
+    assert "Top 10 Cell IDs (12 seen):\n  C11: 11\n" in text
+    assert "  C01: 1\n" not in text
+    assert "Messages per Minute:\n  2023-11-14 22:13: 5\n  2023-11-14 22:14: 7\n" in text
+    assert "Busiest 10 Minutes:\n  2023-11-14 22:14: 7\n  2023-11-14 22:13: 5\n" in format_stats(stats, False)
+
+
+def test_chunked_analysis_matches_sequential_stats(tmp_path):
+    capture = tmp_path / 'sip.pcap'
+    expected = generate(str(capture), 20000)
+    sequential = extract_sip_info(str(capture), str(tmp_path / 'sequential.txt'), 'native', progress=False,
+                                  stats=True)
+    chunked = extract_sip_info(str(capture), str(tmp_path / 'chunked.txt'), 'native', progress=False, stats=True,
+                               chunks=4)
+    assert chunked['stats'] == sequential['stats']
+    stats = sequential['stats']
+    assert sum(stats['minutes'].values()) == expected['register_count'] + expected['invite_count']
+    assert sum(stats['pani_access_types'].values()) == expected['pani_register_count'] + expected['pani_invite_count']
+    assert sum(stats['cni_access_types'].values()) == expected['cni_register_count'] + expected['cni_invite_count']
@@ -0,0 +1,100 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import sip_query
+from benchmarks.synthetic_pcap import BASE_TIME, generate
+from sip_analyzer import extract_sip_info
+from sip_store import QUERY_COLUMNS, MessageStore
+
+
+def stored_frames(db):
+    connection = sqlite3.connect(db)
+    try:
+        return [row[0] for row in connection.execute('SELECT frame FROM messages ORDER BY frame')]
+    finally:
+        connection.close()
+
+
+def test_chunked_run_stores_capture_frame_numbers(tmp_path):
+    capture = str(tmp_path / 'a.pcap')
+    generate(capture, 3000)
+    sequential, chunked = str(tmp_path / 'sequential.db'), str(tmp_path / 'chunked.db')
+    extract_sip_info(capture, str(tmp_path / 'a.txt'), 'native', progress=False, store=sequential)
+    extract_sip_info(capture, str(tmp_path / 'b.txt'), 'native', progress=False, chunks=4, store=chunked)
+    frames = stored_frames(sequential)
+    assert len(set(frames)) == len(frames)
+    assert stored_frames(chunked) == frames
+
+
+def test_analyzing_again_replaces_the_capture(tmp_path):
+    capture, db = str(tmp_path / 'a.pcap'), str(tmp_path / 'store.db')
+    other = str(tmp_path / 'b.pcap')
+    first = generate(capture, 2000)
+    second = generate(other, 1000, seed=2)
+    for path in (capture, other, capture):
+        extract_sip_info(path, str(tmp_path / 'report.txt'), 'native', progress=False, store=db)
+    store = MessageStore(db)
+    try:
+        names = [row[0] for row in store.connection.execute('SELECT name FROM captures ORDER BY name')]
+        counts = dict(store.connection.execute(
+            'SELECT c.name, COUNT(*) FROM messages m JOIN captures c ON c.id = m.capture_id GROUP BY c.name'))
+    finally:
+        store.close()
+    assert names == ['a.pcap', 'b.pcap']
+    assert counts == {'a.pcap': first['register_count'] + first['invite_count'],
+                      'b.pcap': second['register_count'] + second['invite_count']}
+
+
+@pytest.fixture
+def store(tmp_path):
+    capture, db = str(tmp_path / 'sip.pcap'), str(tmp_path / 'store.db')
+    expected = generate(capture, 3000)
+    extract_sip_info(capture, str(tmp_path / 'sip.txt'), 'native', progress=False, store=db)
+    return db, expected
+
+
+def query(capsys, *argv):
+    code = sip_query.main(list(argv))
+    lines = capsys.readouterr().out.splitlines()
+    return code, lines
+
+
+def test_query_filters(store, capsys):
+    db, expected = store
+    code, lines = query(capsys, db, '--count')
+    assert (code, lines) == (sip_query.EXIT_OK, [str(expected['register_count'] + expected['invite_count'])])
+    code, lines = query(capsys, db, '-m', 'INVITE', '--count')
+    assert lines == [str(expected['invite_count'])]
+
+    code, lines = query(capsys, db, '-n', '1')
+    assert lines[0].split('\t') == list(QUERY_COLUMNS)
+    row = dict(zip(QUERY_COLUMNS, lines[1].split('\t')))
+    assert row['capture'] == 'sip.pcap'
+    code, lines = query(capsys, db, '-u', row['to_user'], '-i', row['call_id'])
+    assert code == sip_query.EXIT_OK
+    assert [dict(zip(QUERY_COLUMNS, line.split('\t'))) for line in lines[1:]] == [row]
+
+    code, lines = query(capsys, db, '-c', row['cell_id'])
+    rows = [dict(zip(QUERY_COLUMNS, line.split('\t'))) for line in lines[1:]]
+    assert row in rows and all(item['cell_id'] == row['cell_id'] for item in rows)
+    assert [item['time'] for item in rows] == sorted(item['time'] for item in rows)
+
+
+def test_query_time_window(store, capsys):
+    db, expected = store
+    since = datetime.fromtimestamp(BASE_TIME + 1).strftime('%Y-%m-%d %H:%M:%S')
+    until = datetime.fromtimestamp(BASE_TIME + 2).strftime('%Y-%m-%d %H:%M:%S')
+    _, lines = query(capsys, db, '--since', since, '--until', until)
+    times = [datetime.fromisoformat(line.split('\t')[0]).timestamp() for line in lines[1:]]
+    assert times and all(BASE_TIME + 1 <= time < BASE_TIME + 2 for time in times)
+    _, lines = query(capsys, db, '--since', since, '--until', until, '--count')
+    assert lines == [str(len(times))]
+
+
+def test_query_exit_codes(store, tmp_path, capsys):
+    db, _ = store
+    assert query(capsys, db, '-u', '+10000000000') == (sip_query.EXIT_NO_MATCHES, ['\t'.join(QUERY_COLUMNS)])
+    assert sip_query.main([str(tmp_path / 'missing.db')]) == sip_query.EXIT_USAGE
+    assert "does not exist" in capsys.readouterr().err
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from benchmarks.synthetic_pcap import generate
+from sip_analyzer import extract_sip_info, stream_sip_info
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def report(path):
+    # Everything but the time the report was written and the input name
+    return [line for line in open(path).read().splitlines()
+            if not line.startswith(('Analysis Date:', 'Input File:'))]
+
+
+def feed(data, write_fd, size=1000):
+    # Small writes, as tcpdump -w - would deliver them
+    with open(write_fd, 'wb', buffering=0) as pipe:
+        for offset in range(0, len(data), size):
+            pipe.write(data[offset:offset + size])
+
+
+@pytest.mark.parametrize('capture_format', ['pcap', 'pcapng'])
+def test_pipe_matches_file(tmp_path, capture_format):
+    capture = tmp_path / ('a.' + capture_format)
+    generate(str(capture), 2000, capture_format=capture_format)
+    expected = extract_sip_info(str(capture), str(tmp_path / 'file.txt'), 'native', progress=False, stats=True)
+
+    read_fd, write_fd = os.pipe()
+    writer = threading.Thread(target=feed, args=(capture.read_bytes(), write_fd))
+    writer.start()
+    with open(read_fd, 'rb') as stream:
+        counters = stream_sip_info(stream, str(tmp_path / 'stream.txt'), stats=True)
+    writer.join()
+    assert counters == {**expected, 'file': 'stdin'}
+    assert report(tmp_path / 'stream.txt') == report(tmp_path / 'file.txt')
+
+
+def test_stream_cut_off_mid_record(tmp_path):
+    capture = tmp_path / 'a.pcap'
+    generate(str(capture), 2000)
+    data = capture.read_bytes()
+    half = tmp_path / 'half.pcap'
+    half.write_bytes(data[:len(data) // 2])
+    with open(half, 'rb') as stream:
+        counters = stream_sip_info(stream, str(tmp_path / 'stream.txt'))
+    expected = extract_sip_info(str(capture), str(tmp_path / 'file.txt'), 'native', progress=False)
+    assert 0 < counters['total_packets'] < expected['total_packets']
+    assert not os.path.exists(tmp_path / 'stream.txt.temp')
+
+
+def test_stop_ends_the_stream_with_a_report(tmp_path):
+    read_fd, write_fd = os.pipe()
+    capture = tmp_path / 'a.pcap'
+    generate(str(capture), 500)
+    header = capture.read_bytes()[:24]
+    stop = threading.Event()
+    with open(write_fd, 'wb', buffering=0) as pipe, open(read_fd, 'rb') as stream:
+        pipe.write(header)
+        # The writer stays open, as an idle tcpdump would; stop is checked per record
+        pipe.write(capture.read_bytes()[24:2000])
+        stop.set()
+        counters = stream_sip_info(stream, str(tmp_path / 'stream.txt'), stop=stop)
+    assert counters['total_packets'] == 0
+    assert os.path.exists(tmp_path / 'stream.txt')
+
+
+def test_cli_reads_stdin(tmp_path):
+    capture = tmp_path / 'a.pcapng'
+    generate(str(capture), 2000, capture_format='pcapng')
+    extract_sip_info(str(capture), str(tmp_path / 'file.txt'), 'native', progress=False)
+    with open(capture, 'rb') as stdin:
+        result = subprocess.run([sys.executable, os.path.join(REPO, 'sip_cli.py'), '-', str(tmp_path / 'out'), '-q'],
+                                stdin=stdin, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert report(tmp_path / 'out' / 'stdin.txt') == report(tmp_path / 'file.txt')
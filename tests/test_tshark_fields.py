@@ -0,0 +1,59 @@
+from sip_analyzer import TSHARK_FIELDS, _tshark_fields_message
+
+# Lines as printed by tshark -T fields -E separator=/t -E occurrence=f -E quote=n
+# with the -e fields of TSHARK_FIELDS
+REGISTER_LINE = (
+    b'12\t1700000000.123456000\tREGISTER\tREGISTER sip:ims.example.com SIP/2.0\t'
+    b'<sip:+15550001234@ims.example.com>\t<sip:+15550001234@ims.example.com>;tag=4711\t'
+    b'<sip:pcscf.ims.example.com;lr>\t3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=310410000ABC123\t\t'
+    b'a84b4c76e66710@ue.example.com\t1\tREGISTER\t\n'
+)
+RESPONSE_LINE = (
+    b'13\t1700000000.187654000\t\t\t'
+    b'<sip:+15550001234@ims.example.com>;tag=9\t<sip:+15550001234@ims.example.com>;tag=4711\t'
+    b'\t\t\ta84b4c76e66710@ue.example.com\t1\tREGISTER\t401\n'
+)
+
+
+def test_field_names_match_wireshark():
+    # tshark matches -e names case-sensitively; these are Wireshark's own spellings
+    assert TSHARK_FIELDS == (
+        'frame.number', 'frame.time_epoch', 'sip.Method', 'sip.Request-Line', 'sip.To', 'sip.From',
+        'sip.Route', 'sip.P-Access-Network-Info', 'sip.Cellular-Network-Info', 'sip.Call-ID',
+        'sip.CSeq.seq', 'sip.CSeq.method', 'sip.Status-Code',
+    )
+
+
+def test_request_line():
+    message = _tshark_fields_message(REGISTER_LINE)
+    assert message.frame == 12
+    assert message.method == 'REGISTER'
+    assert message.time == 1700000000.123456
+    assert message.to == '<sip:+15550001234@ims.example.com>'
+    assert message.from_ == '<sip:+15550001234@ims.example.com>;tag=4711'
+    assert message.route == '<sip:pcscf.ims.example.com;lr>'
+    assert message.pani == '3GPP-E-UTRAN-FDD; utran-cell-id-3gpp=310410000ABC123'
+    assert message.cni is None
+    assert message.call_id == 'a84b4c76e66710@ue.example.com'
+    assert message.cseq is None
+
+
+def test_request_line_with_transactions():
+    message = _tshark_fields_message(REGISTER_LINE, transactions=True)
+    assert (message.cseq, message.cseq_method, message.status) == (1, 'REGISTER', None)
+
+
+def test_method_from_request_line():
+    line = REGISTER_LINE.replace(b'\tREGISTER\tREGISTER sip:', b'\t\tREGISTER sip:', 1)
+    assert _tshark_fields_message(line).method == 'REGISTER'
+
+
+def test_response_line():
+    message = _tshark_fields_message(RESPONSE_LINE)
+    assert message.method is None
+    assert message.time is None
+
+    message = _tshark_fields_message(RESPONSE_LINE, transactions=True)
+    assert message.time == 1700000000.187654
+    assert message.call_id == 'a84b4c76e66710@ue.example.com'
+    assert (message.cseq, message.cseq_method, message.status) == (1, 'REGISTER', 401)
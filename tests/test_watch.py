@@ -0,0 +1,67 @@
+import gzip
+import shutil
+import threading
+
+from benchmarks.synthetic_pcap import generate
+from sip_watch import watch_directory
+
+
+def test_captures_sharing_a_stem(tmp_path):
+    input_dir, output_dir = tmp_path / 'in', tmp_path / 'out'
+    input_dir.mkdir()
+    generate(str(input_dir / 'trace.pcap'), 300, seed=1)
+    generate(str(tmp_path / 'trace.pcapng'), 300, seed=2, capture_format='pcapng')
+    with open(tmp_path / 'trace.pcapng', 'rb') as source, gzip.open(input_dir / 'trace.pcapng.gz', 'wb') as target:
+        shutil.copyfileobj(source, target)
+
+    finished = {}
+    cancel = threading.Event()
+
+    def callback(file_path, summary, error):
+        finished[file_path] = error
+        if len(finished) == 2:
+            cancel.set()
+
+    timer = threading.Timer(60, cancel.set)
+    timer.start()
+    try:
+        watch_directory(str(input_dir), str(output_dir), backend='native', callback=callback, cancel=cancel,
+                        stable_seconds=0)
+    finally:
+        timer.cancel()
+    assert finished == {str(input_dir / 'trace.pcap'): None, str(input_dir / 'trace.pcapng.gz'): None}
+    assert sorted(path.name for path in output_dir.iterdir()) == ['trace.pcap.txt', 'trace.pcapng.gz.txt']
+    assert 'trace.pcapng.gz' in (output_dir / 'trace.pcapng.gz.txt').read_text(encoding='utf-8')
+
+
+def test_new_captures_are_analyzed_and_old_reports_skipped(tmp_path):
+    input_dir, output_dir = tmp_path / 'in', tmp_path / 'out'
+    input_dir.mkdir()
+    output_dir.mkdir()
+    generate(str(input_dir / 'old.pcap'), 300, seed=1)
+    (output_dir / 'old.txt').write_text('analyzed before', encoding='utf-8')
+    generate(str(tmp_path / 'new.pcap'), 300, seed=2)
+
+    finished = []
+    cancel = threading.Event()
+
+    def callback(file_path, summary, error):
+        finished.append((file_path, error, summary['register_count'] if summary else None))
+        cancel.set()
+
+    # Moved in once complete, as a capture rotator would
+    arrival = threading.Timer(0.5, (tmp_path / 'new.pcap').rename, [input_dir / 'new.pcap'])
+    timeout = threading.Timer(60, cancel.set)
+    arrival.start()
+    timeout.start()
+    try:
+        watch_directory(str(input_dir), str(output_dir), backend='native', callback=callback, cancel=cancel,
+                        stable_seconds=0)
+    finally:
+        arrival.cancel()
+        timeout.cancel()
+    assert len(finished) == 1
+    assert finished[0][:2] == (str(input_dir / 'new.pcap'), None)
+    assert finished[0][2] > 0
+    assert (output_dir / 'old.txt').read_text(encoding='utf-8') == 'analyzed before'
+    assert 'Input File: new.pcap' in (output_dir / 'new.txt').read_text(encoding='utf-8')